@@ -4,10 +4,10 @@
  * Course joining page - allows students to join via code/URL
  */
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useRouter, useSearchParams } from 'next/navigation';
 import { Download, CheckCircle, AlertCircle } from 'lucide-react';
-import { parseCourseCode, getCourseInfoFromCode } from '@/lib/courseSharing';
+import { parseAnyCourseCode, getCourseInfoFromCode } from '@/lib/courseSharing';
 import { saveCourse } from '@/lib/lessonData';
 
 export default function JoinPage() {
@@ -16,6 +16,7 @@ export default function JoinPage() {
   const [success, setSuccess] = useState(false);
   const [courseInfo, setCourseInfo] = useState<{ name: string; lessons: number } | null>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const previewRequest = useRef(0);
   const router = useRouter();
   const searchParams = useSearchParams();
 
@@ -28,8 +29,11 @@ export default function JoinPage() {
     }
   }, [searchParams]);
 
-  const handlePreview = (code: string) => {
-    const info = getCourseInfoFromCode(code);
+  const handlePreview = async (code: string) => {
+    // Compact codes decode asynchronously; ignore previews overtaken by newer input
+    const request = ++previewRequest.current;
+    const info = await getCourseInfoFromCode(code);
+    if (request !== previewRequest.current) return;
     if (info) {
       setCourseInfo(info);
       setError('');
@@ -45,7 +49,7 @@ export default function JoinPage() {
     setIsLoading(true);
 
     try {
-      const shareData = parseCourseCode(courseCode);
+      const shareData = await parseAnyCourseCode(courseCode);
 
       if (!shareData) {
         setError('Invalid course code. Please check and try again.');
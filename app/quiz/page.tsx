@@ -13,6 +13,7 @@ import { getStudentSession } from '@/lib/storage';
 import { getReviewData, saveReviewData, getAllReviewData, getStory } from '@/lib/storage';
 import { calculateNextReview, isDue, getPreviewIntervals, getIntervalDisplay } from '@/lib/srsAlgorithm';
 import { getActiveLessons } from '@/lib/lessonData';
+import { getAllKanjiIds, shuffle } from '@/lib/quizTables';
 
 type QuizType = 'kanji-to-meaning' | 'meaning-to-kanji' | 'meaning-to-primitives' | 'kanji-to-story';
 type FilterType = 'all' | 'due' | 'new';
@@ -47,45 +48,46 @@ export default function QuizPage() {
       return;
     }
 
-    // Load active lessons or all kanji
+    // Candidate ids: active lessons, or every kanji from the precomputed lesson arrays
     const activeLessons = getActiveLessons();
-    let allKanji: Kanji[] = [];
+    let candidateIds: number[] | null = null;
 
     if (activeLessons.length > 0) {
       const allKanjiIds = new Set<number>();
       activeLessons.forEach((lesson) => {
         lesson.kanjiIds.forEach((id) => allKanjiIds.add(id));
       });
-      allKanji = await getKanjiByIds(Array.from(allKanjiIds));
+      candidateIds = Array.from(allKanjiIds);
     } else {
-      allKanji = await loadKanjiData();
+      candidateIds = await getAllKanjiIds();
     }
 
     // Filter based on filter type
     const reviewData = getAllReviewData(session.userId);
-    let filtered: Kanji[] = [];
-
-    switch (filterType) {
-      case 'due':
-        filtered = allKanji.filter((k) => {
-          const review = reviewData[k.id];
+    const matchesFilter = (id: number) => {
+      const review = reviewData[id];
+      switch (filterType) {
+        case 'due':
           return !review || isDue(review);
-        });
-        break;
-      case 'new':
-        filtered = allKanji.filter((k) => {
-          const review = reviewData[k.id];
+        case 'new':
           return !review || review.totalReviews === 0;
-        });
-        break;
-      case 'all':
-      default:
-        filtered = allKanji;
-        break;
+        case 'all':
+        default:
+          return true;
+      }
+    };
+
+    // Filter ids before loading, so only the data packs holding them are fetched
+    let filtered: Kanji[] = [];
+    if (candidateIds) {
+      const ids = candidateIds.filter(matchesFilter);
+      filtered = ids.length > 0 ? await getKanjiByIds(ids) : [];
+    } else {
+      filtered = (await loadKanjiData()).filter((k) => matchesFilter(k.id));
     }
 
     // Shuffle the list
-    const shuffled = [...filtered].sort(() => Math.random() - 0.5);
+    const shuffled = shuffle([...filtered]);
 
     setKanjiList(shuffled);
     setCurrentIndex(0);
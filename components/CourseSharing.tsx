@@ -4,10 +4,15 @@
  * Course Sharing Component - Generate codes, URLs, and QR codes
  */
 
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import { Copy, Check, Download, QrCode, Link as LinkIcon } from 'lucide-react';
 import { Course } from '@/types/kanji';
-import { generateCourseCode, generateShareableURL, createStudentPackage } from '@/lib/courseSharing';
+import {
+  generateCourseCode,
+  generateCompactCourseCode,
+  createStudentPackage,
+  getShareableURLForCode,
+} from '@/lib/courseSharing';
 
 interface CourseSharingProps {
   course: Course;
@@ -17,8 +22,20 @@ export default function CourseSharing({ course }: CourseSharingProps) {
   const [copiedCode, setCopiedCode] = useState(false);
   const [copiedURL, setCopiedURL] = useState(false);
 
-  const courseCode = generateCourseCode(course);
-  const shareableURL = generateShareableURL(course);
+  // Start with the base64 code, then switch to the compact one once the kanji dictionary loads
+  const [courseCode, setCourseCode] = useState(() => generateCourseCode(course));
+
+  useEffect(() => {
+    let cancelled = false;
+    generateCompactCourseCode(course).then((code) => {
+      if (!cancelled) setCourseCode(code);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [course]);
+
+  const shareableURL = getShareableURLForCode(courseCode);
 
   const handleCopyCode = () => {
     navigator.clipboard.writeText(courseCode);
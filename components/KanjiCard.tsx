@@ -9,6 +9,7 @@ import { Save, Loader2, Play, Pause, RotateCcw, ChevronLeft, ChevronRight, Eye,
 import { Kanji } from '@/types/kanji';
 import { getStudentSession } from '@/lib/storage';
 import { getStory, saveStory } from '@/lib/storage';
+import { loadStrokeSvg } from '@/lib/strokeData';
 
 // Animation constants
 const STROKE_ANIMATION_DURATION = 500; // milliseconds
@@ -59,13 +60,20 @@ export default function KanjiCard({ kanji, showStory = true, editableStory = tru
 
   const loadStrokeOrderAnimation = async () => {
     try {
+      // Prefer the self-hosted stroke bundles built by the data pipeline
+      const bundledSvg = await loadStrokeSvg(kanji.kanji);
+      if (bundledSvg) {
+        displayStrokeOrder(bundledSvg);
+        return;
+      }
+      
       // Get Unicode code point for the kanji
       const unicode = kanji.kanji.codePointAt(0)?.toString(16).padStart(5, '0');
       if (!unicode) {
         throw new Error('Invalid kanji character');
       }
       
-      // Fetch SVG from KanjiVG CDN
+      // Fall back to the KanjiVG CDN for kanji missing from the bundles
       const svgUrl = `https://raw.githubusercontent.com/KanjiVG/kanjivg/master/kanji/${unicode}.svg`;
       const response = await fetch(svgUrl);
       
@@ -0,0 +1,80 @@
+/**
+ * Component graph lookups: which kanji use a component, and what a kanji is built from
+ */
+
+import { Kanji, KanjiComponentGraph } from '@/types/kanji';
+import { getKanjiByIds } from '@/lib/kanjiData';
+
+let graphPromise: Promise<KanjiComponentGraph | null> | null = null;
+let componentPosition: Map<string, number> | null = null;
+
+/**
+ * Load the prebuilt component graph (null if it is not available)
+ */
+export async function loadComponentGraph(): Promise<KanjiComponentGraph | null> {
+  if (!graphPromise) {
+    graphPromise = fetch('/data/components.json')
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return graphPromise;
+}
+
+/**
+ * Undo the delta encoding of a sorted id list
+ */
+function decodeDeltas(deltas: number[] | undefined): number[] {
+  const values: number[] = [];
+  let value = 0;
+  for (const delta of deltas ?? []) {
+    value += delta;
+    values.push(value);
+  }
+  return values;
+}
+
+/**
+ * Index of a component name in the graph (case-insensitive), or -1
+ */
+function findComponent(graph: KanjiComponentGraph, name: string): number {
+  if (!componentPosition) {
+    componentPosition = new Map();
+    graph.components.forEach((component, i) => {
+      const key = component.toLowerCase();
+      if (!componentPosition!.has(key)) componentPosition!.set(key, i);
+    });
+  }
+  return componentPosition.get(name.trim().toLowerCase()) ?? -1;
+}
+
+/**
+ * Get the kanji that use a component, directly or (with `transitive`)
+ * through any of their components
+ */
+export async function getKanjiUsingComponent(name: string, transitive = false): Promise<Kanji[]> {
+  const graph = await loadComponentGraph();
+  if (!graph) {
+    return [];
+  }
+
+  const component = findComponent(graph, name);
+  if (component < 0) {
+    return [];
+  }
+  const postings = transitive ? graph.closureUsedBy : graph.usedBy;
+  return getKanjiByIds(decodeDeltas(postings[component]));
+}
+
+/**
+ * Get the component names of a kanji, optionally including the components
+ * of components
+ */
+export async function getComponentsOfKanji(id: number, transitive = false): Promise<string[]> {
+  const graph = await loadComponentGraph();
+  if (!graph) {
+    return [];
+  }
+
+  const adjacency = transitive ? graph.closure : graph.uses;
+  return decodeDeltas(adjacency[id - 1]).map((component) => graph.components[component]);
+}
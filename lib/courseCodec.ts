@@ -0,0 +1,426 @@
+/**
+ * Compact course codes (the "k1." format from scripts/course_codec.py)
+ *
+ * Lesson kanji lists are stored in lesson order as codes from the append-only
+ * kanji dictionary, timestamps and generated ids relative to the share time,
+ * and text in a deduplicated, phrase-substituted, LZ-compressed string table.
+ */
+
+import { Course, CourseShareData, KanjiDictionary, Lesson } from '@/types/kanji';
+
+export const COURSE_CODE_PREFIX = 'k1.';
+
+const ISO_TIMESTAMP = /^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z$/;
+const GENERATED_ID = /^(\d{13})-([0-9a-z]{1,10})$/;
+const MIN_MATCH = 4;
+const MATCH_CANDIDATES = 16;
+const SET_DELTAS = 0;
+const SET_RUNS = 1;
+const SET_ORDERED = 2;
+
+let dictionaryPromise: Promise<KanjiDictionary | null> | null = null;
+
+/**
+ * Load the kanji dictionary (null if it is not available)
+ */
+export async function loadKanjiDictionary(): Promise<KanjiDictionary | null> {
+  if (!dictionaryPromise) {
+    dictionaryPromise = fetch('/data/kanji-dictionary.json')
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return dictionaryPromise;
+}
+
+/**
+ * Check whether a code uses the compact format
+ */
+export function isCompactCourseCode(code: string): boolean {
+  return code.trim().startsWith(COURSE_CODE_PREFIX);
+}
+
+// Varints use arithmetic instead of bit operations: timestamps exceed 32 bits
+function writeVarint(out: number[], value: number): void {
+  while (value >= 0x80) {
+    out.push((value % 0x80) + 0x80);
+    value = Math.floor(value / 0x80);
+  }
+  out.push(value);
+}
+
+class Reader {
+  constructor(private data: Uint8Array, public pos = 0) {}
+
+  byte(): number {
+    if (this.pos >= this.data.length) throw new Error('truncated course code');
+    return this.data[this.pos++];
+  }
+
+  varint(): number {
+    let value = 0;
+    let scale = 1;
+    for (;;) {
+      const byte = this.byte();
+      value += (byte % 0x80) * scale;
+      if (byte < 0x80) return value;
+      scale *= 0x80;
+    }
+  }
+
+  bytes(length: number): Uint8Array {
+    if (this.pos + length > this.data.length) throw new Error('truncated course code');
+    const slice = this.data.subarray(this.pos, this.pos + length);
+    this.pos += length;
+    return slice;
+  }
+}
+
+function zigzag(value: number): number {
+  return value >= 0 ? value * 2 : -value * 2 - 1;
+}
+
+function unzigzag(value: number): number {
+  return value % 2 === 0 ? value / 2 : -(value + 1) / 2;
+}
+
+function compressString(text: string, phrases: string[]): number[] {
+  const encoder = new TextEncoder();
+  const data = encoder.encode(text);
+  const encodedPhrases = phrases
+    .slice(0, 31)
+    .map((phrase, index) => ({ bytes: encoder.encode(phrase), marker: index + 1 }))
+    .sort((a, b) => b.bytes.length - a.bytes.length);
+  const out: number[] = [];
+  let pos = 0;
+  while (pos < data.length) {
+    const phrase = encodedPhrases.find(({ bytes }) =>
+      bytes.length > 0 && bytes.every((byte, i) => data[pos + i] === byte)
+    );
+    if (phrase) {
+      out.push(phrase.marker);
+      pos += phrase.bytes.length;
+    } else {
+      if (data[pos] < 0x20) out.push(0);
+      out.push(data[pos++]);
+    }
+  }
+  return out;
+}
+
+function expandString(data: Uint8Array, phrases: string[]): string {
+  const encoder = new TextEncoder();
+  const out: number[] = [];
+  for (let pos = 0; pos < data.length; pos++) {
+    const byte = data[pos];
+    if (byte === 0) {
+      out.push(data[++pos]);
+    } else if (byte < 0x20) {
+      out.push(...encoder.encode(phrases[byte - 1]));
+    } else {
+      out.push(byte);
+    }
+  }
+  return new TextDecoder('utf-8', { fatal: true }).decode(new Uint8Array(out));
+}
+
+function lzCompress(data: number[]): number[] {
+  const out: number[] = [];
+  const recent = new Map<string, number[]>();
+  let literals: number[] = [];
+
+  const keyAt = (pos: number) =>
+    pos + MIN_MATCH <= data.length ? data.slice(pos, pos + MIN_MATCH).join(',') : null;
+  const remember = (key: string, pos: number) => {
+    const positions = recent.get(key) ?? [];
+    positions.push(pos);
+    if (positions.length > MATCH_CANDIDATES) positions.shift();
+    recent.set(key, positions);
+  };
+  const flushLiterals = () => {
+    if (literals.length) {
+      writeVarint(out, literals.length * 2);
+      out.push(...literals);
+      literals = [];
+    }
+  };
+
+  let pos = 0;
+  while (pos < data.length) {
+    const key = keyAt(pos);
+    let bestLength = 0;
+    let bestDistance = 0;
+    if (key !== null) {
+      const candidates = recent.get(key) ?? [];
+      for (let i = candidates.length - 1; i >= 0; i--) {
+        const start = candidates[i];
+        let length = 0;
+        while (pos + length < data.length && data[start + length] === data[pos + length]) length++;
+        if (length > bestLength) {
+          bestLength = length;
+          bestDistance = pos - start;
+        }
+      }
+      remember(key, pos);
+    }
+    if (bestLength >= MIN_MATCH) {
+      flushLiterals();
+      writeVarint(out, (bestLength - MIN_MATCH) * 2 + 1);
+      writeVarint(out, bestDistance);
+      for (let skipped = pos + 1; skipped < pos + bestLength; skipped++) {
+        const skippedKey = keyAt(skipped);
+        if (skippedKey !== null) remember(skippedKey, skipped);
+      }
+      pos += bestLength;
+    } else {
+      literals.push(data[pos++]);
+    }
+  }
+  flushLiterals();
+  return out;
+}
+
+function lzDecompress(reader: Reader, size: number): Uint8Array {
+  const out: number[] = [];
+  while (out.length < size) {
+    const op = reader.varint();
+    if (op % 2 === 0) {
+      out.push(...reader.bytes(op / 2));
+    } else {
+      const distance = reader.varint();
+      if (distance <= 0 || distance > out.length) throw new Error('bad back-reference in course code');
+      for (let i = 0; i < (op - 1) / 2 + MIN_MATCH; i++) out.push(out[out.length - distance]);
+    }
+  }
+  return new Uint8Array(out);
+}
+
+function timestampMs(value: string | undefined): number | null {
+  return typeof value === 'string' && ISO_TIMESTAMP.test(value) ? Date.parse(value) : null;
+}
+
+// Strictly increasing codes as deltas or runs; any other order as signed deltas
+function encodeKanjiSet(out: number[], codes: number[]): void {
+  if (codes.some((code, i) => i > 0 && code <= codes[i - 1])) {
+    out.push(SET_ORDERED);
+    writeVarint(out, codes.length);
+    let previous = 0;
+    for (const code of codes) {
+      writeVarint(out, zigzag(code - previous));
+      previous = code;
+    }
+    return;
+  }
+
+  const deltas: number[] = [];
+  writeVarint(deltas, codes.length);
+  let previous = 0;
+  for (const code of codes) {
+    writeVarint(deltas, code - previous);
+    previous = code;
+  }
+
+  const runs: [number, number][] = [];
+  for (const code of codes) {
+    const last = runs[runs.length - 1];
+    if (last && code === last[1] + 1) last[1] = code;
+    else runs.push([code, code]);
+  }
+  const runBytes: number[] = [];
+  writeVarint(runBytes, runs.length);
+  previous = 0;
+  for (const [first, last] of runs) {
+    writeVarint(runBytes, first - previous);
+    writeVarint(runBytes, last - first);
+    previous = last;
+  }
+
+  if (runBytes.length < deltas.length) out.push(SET_RUNS, ...runBytes);
+  else out.push(SET_DELTAS, ...deltas);
+}
+
+function decodeKanjiSet(reader: Reader): number[] {
+  const mode = reader.byte();
+  const count = reader.varint();
+  const codes: number[] = [];
+  let previous = 0;
+  for (let i = 0; i < count; i++) {
+    if (mode === SET_RUNS) {
+      const first = previous + reader.varint();
+      const length = reader.varint();
+      for (let code = first; code <= first + length; code++) codes.push(code);
+      previous = first + length;
+    } else {
+      const delta = reader.varint();
+      previous += mode === SET_ORDERED ? unzigzag(delta) : delta;
+      codes.push(previous);
+    }
+  }
+  return codes;
+}
+
+function toBase64Url(bytes: number[]): string {
+  let binary = '';
+  for (const byte of bytes) binary += String.fromCharCode(byte);
+  return btoa(binary).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+}
+
+function fromBase64Url(text: string): Uint8Array {
+  const binary = atob(text.replace(/-/g, '+').replace(/_/g, '/'));
+  return Uint8Array.from(binary, (char) => char.charCodeAt(0));
+}
+
+/**
+ * Encode course share data as a compact course code.
+ * Throws if a lesson uses a kanji id the dictionary does not know.
+ */
+export function encodeCourseCode(shareData: CourseShareData, dictionary: KanjiDictionary): string {
+  const codeOf = new Map<number, number>();
+  dictionary.ids.forEach((kanjiId, index) => {
+    if (kanjiId) codeOf.set(kanjiId, index + 1);
+  });
+  const { course } = shareData;
+  const strings = new Map<string, number>();
+  const body: number[] = [];
+
+  // Timestamps are stored relative to when the course was shared
+  const reference = timestampMs(shareData.sharedAt) || timestampMs(course.createdAt) || 0;
+
+  const stringRef = (text: string | undefined) => {
+    const value = text || '';
+    if (!strings.has(value)) strings.set(value, strings.size);
+    writeVarint(body, strings.get(value)!);
+  };
+  const timestamp = (value: string | undefined) => {
+    // 0 = not a toISOString() value, stored as a string instead
+    const ms = timestampMs(value);
+    if (ms === null) {
+      body.push(0);
+      stringRef(value);
+    } else {
+      writeVarint(body, zigzag(ms - reference) + 1);
+    }
+  };
+  const generatedId = (text: string) => {
+    // Digits of the random part (0 = not a generateId() value, stored as a string)
+    const match = GENERATED_ID.exec(text || '');
+    if (!match) {
+      body.push(0);
+      stringRef(text);
+      return;
+    }
+    writeVarint(body, match[2].length);
+    writeVarint(body, zigzag(Number(match[1]) - reference));
+    writeVarint(body, parseInt(match[2], 36));
+  };
+
+  timestamp(shareData.sharedAt);
+  stringRef(shareData.sharedBy);
+  generatedId(course.id);
+  stringRef(course.name);
+  stringRef(course.description);
+  timestamp(course.createdAt);
+  timestamp(course.updatedAt);
+  writeVarint(body, course.lessons.length);
+  for (const lesson of course.lessons) {
+    generatedId(lesson.id);
+    stringRef(lesson.name);
+    stringRef(lesson.description);
+    writeVarint(body, lesson.order * 2 + (lesson.isActive ? 1 : 0));
+    timestamp(lesson.createdAt);
+    timestamp(lesson.updatedAt);
+    const codes = lesson.kanjiIds.map((kanjiId) => {
+      const code = codeOf.get(kanjiId);
+      if (code === undefined) throw new Error(`kanji id ${kanjiId} is not in the dictionary`);
+      return code;
+    });
+    encodeKanjiSet(body, codes);
+  }
+
+  const table: number[] = [];
+  strings.forEach((_, text) => {
+    const packed = compressString(text, dictionary.phrases);
+    writeVarint(table, packed.length);
+    table.push(...packed);
+  });
+  const out: number[] = [];
+  writeVarint(out, dictionary.version);
+  writeVarint(out, reference);
+  writeVarint(out, strings.size);
+  writeVarint(out, table.length);
+  out.push(...lzCompress(table), ...body);
+  return COURSE_CODE_PREFIX + toBase64Url(out);
+}
+
+/**
+ * Decode a compact course code (null if it is malformed or needs a newer dictionary)
+ */
+export function decodeCourseCode(code: string, dictionary: KanjiDictionary): CourseShareData | null {
+  const trimmed = code.trim();
+  if (!trimmed.startsWith(COURSE_CODE_PREFIX)) return null;
+
+  try {
+    const reader = new Reader(fromBase64Url(trimmed.slice(COURSE_CODE_PREFIX.length)));
+    const version = reader.varint();
+    if (version > dictionary.version) return null;
+    const reference = reader.varint();
+    const count = reader.varint();
+    const tableReader = new Reader(lzDecompress(reader, reader.varint()));
+    const strings: string[] = [];
+    for (let i = 0; i < count; i++) {
+      strings.push(expandString(tableReader.bytes(tableReader.varint()), dictionary.phrases));
+    }
+
+    const stringRef = () => {
+      const index = reader.varint();
+      if (index >= strings.length) throw new Error('bad string reference in course code');
+      return strings[index];
+    };
+    const timestamp = () => {
+      const value = reader.varint();
+      return value === 0 ? stringRef() : new Date(reference + unzigzag(value - 1)).toISOString();
+    };
+    const generatedId = () => {
+      const digits = reader.varint();
+      if (digits === 0) return stringRef();
+      const ms = reference + unzigzag(reader.varint());
+      return `${ms}-${reader.varint().toString(36).padStart(digits, '0')}`;
+    };
+
+    const sharedAt = timestamp();
+    const sharedBy = stringRef();
+    const id = generatedId();
+    const name = stringRef();
+    const description = stringRef();
+    const createdAt = timestamp();
+    const updatedAt = timestamp();
+    const lessons: Lesson[] = [];
+    const lessonCount = reader.varint();
+    for (let i = 0; i < lessonCount; i++) {
+      const lessonId = generatedId();
+      const lessonName = stringRef();
+      const lessonDescription = stringRef();
+      const flags = reader.varint();
+      const lessonCreatedAt = timestamp();
+      const lessonUpdatedAt = timestamp();
+      const kanjiIds = decodeKanjiSet(reader)
+        .map((kanjiCode) => dictionary.ids[kanjiCode - 1])
+        .filter((kanjiId) => kanjiId);
+      lessons.push({
+        id: lessonId,
+        name: lessonName,
+        description: lessonDescription,
+        order: Math.floor(flags / 2),
+        kanjiIds,
+        isActive: flags % 2 === 1,
+        createdAt: lessonCreatedAt,
+        updatedAt: lessonUpdatedAt,
+      });
+    }
+
+    const course: Course = { id, name, description, lessons, createdAt, updatedAt };
+    return { course, sharedAt, sharedBy };
+  } catch (error) {
+    console.error('Error decoding course code:', error);
+    return null;
+  }
+}
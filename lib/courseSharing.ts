@@ -4,6 +4,12 @@
 
 import { Course, CourseShareData } from '@/types/kanji';
 import { getCourse } from './lessonData';
+import {
+  decodeCourseCode,
+  encodeCourseCode,
+  isCompactCourseCode,
+  loadKanjiDictionary,
+} from './courseCodec';
 
 /**
  * Generate a shareable course code (base64 encoded)
@@ -19,6 +25,36 @@ export function generateCourseCode(course: Course): string {
   return btoa(encodeURIComponent(json));
 }
 
+/**
+ * Generate a compact course code (falls back to the base64 code if the
+ * kanji dictionary is unavailable or does not know a lesson's kanji)
+ */
+export async function generateCompactCourseCode(course: Course): Promise<string> {
+  const dictionary = await loadKanjiDictionary();
+  if (dictionary) {
+    try {
+      return encodeCourseCode(
+        { course, sharedAt: new Date().toISOString(), sharedBy: 'Instructor' },
+        dictionary
+      );
+    } catch (error) {
+      console.error('Error encoding compact course code:', error);
+    }
+  }
+  return generateCourseCode(course);
+}
+
+/**
+ * Parse a compact or base64 course code
+ */
+export async function parseAnyCourseCode(code: string): Promise<CourseShareData | null> {
+  if (!isCompactCourseCode(code)) {
+    return parseCourseCode(code);
+  }
+  const dictionary = await loadKanjiDictionary();
+  return dictionary ? decodeCourseCode(code, dictionary) : null;
+}
+
 /**
  * Parse a course code and extract course data
  */
@@ -38,13 +74,19 @@ export function parseCourseCode(code: string): CourseShareData | null {
   }
 }
 
+/**
+ * Build the join URL for an already generated course code (compact or base64)
+ */
+export function getShareableURLForCode(code: string, baseUrl: string = ''): string {
+  const url = baseUrl || (typeof window !== 'undefined' ? window.location.origin : '');
+  return `${url}/join?code=${encodeURIComponent(code)}`;
+}
+
 /**
  * Generate shareable URL with embedded course data
  */
 export function generateShareableURL(course: Course, baseUrl: string = ''): string {
-  const code = generateCourseCode(course);
-  const url = baseUrl || (typeof window !== 'undefined' ? window.location.origin : '');
-  return `${url}/join?code=${code}`;
+  return getShareableURLForCode(generateCourseCode(course), baseUrl);
 }
 
 /**
@@ -128,18 +170,20 @@ export function getCurrentCourseForSharing(): Course | null {
 }
 
 /**
- * Validate course code
+ * Validate a compact or base64 course code
  */
-export function validateCourseCode(code: string): boolean {
-  const shareData = parseCourseCode(code);
+export async function validateCourseCode(code: string): Promise<boolean> {
+  const shareData = await parseAnyCourseCode(code);
   return shareData !== null;
 }
 
 /**
  * Get course info from code without importing
  */
-export function getCourseInfoFromCode(code: string): { name: string; lessons: number } | null {
-  const shareData = parseCourseCode(code);
+export async function getCourseInfoFromCode(
+  code: string
+): Promise<{ name: string; lessons: number } | null> {
+  const shareData = await parseAnyCourseCode(code);
   if (!shareData) return null;
 
   return {
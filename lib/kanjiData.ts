@@ -2,9 +2,13 @@
  * Utility for loading and filtering kanji data
  */
 
-import { Kanji } from '@/types/kanji';
+import { Kanji, KanjiSearchIndex, KanjiShard, KanjiShardManifest } from '@/types/kanji';
 
 let cachedKanjiData: Kanji[] | null = null;
+let kanjiPosition: Map<number, number> | null = null;
+let searchIndexPromise: Promise<KanjiSearchIndex | null> | null = null;
+let shardManifestPromise: Promise<KanjiShardManifest | null> | null = null;
+const shardCache = new Map<string, Promise<Kanji[]>>();
 
 /**
  * Load kanji data from JSON file
@@ -29,11 +33,88 @@ export async function loadKanjiData(): Promise<Kanji[]> {
   }
 }
 
+/**
+ * Load the per-lesson data pack manifest (null if packs are not available)
+ */
+export async function loadShardManifest(): Promise<KanjiShardManifest | null> {
+  if (!shardManifestPromise) {
+    shardManifestPromise = fetch('/data/lessons/manifest.json')
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return shardManifestPromise;
+}
+
+/**
+ * Load a single data pack (shard URLs are content-hashed, so each is fetched once)
+ */
+function loadShard(shard: KanjiShard): Promise<Kanji[]> {
+  let promise = shardCache.get(shard.url);
+  if (!promise) {
+    promise = fetch(shard.url).then((response) => {
+      if (!response.ok) {
+        throw new Error(`Failed to load kanji shard ${shard.name}`);
+      }
+      return response.json();
+    });
+    promise.catch(() => shardCache.delete(shard.url));
+    shardCache.set(shard.url, promise);
+  }
+  return promise;
+}
+
+/**
+ * Find the shards holding the given ids through the manifest's id runs
+ */
+function shardsForIds(manifest: KanjiShardManifest, ids: number[]): KanjiShard[] {
+  const { idRuns } = manifest;
+  const wanted = new Set<number>();
+  for (const id of ids) {
+    // Last run starting at or before the id
+    let lo = 0;
+    let hi = idRuns.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (idRuns[mid][0] <= id) lo = mid + 1;
+      else hi = mid;
+    }
+    const shard = lo > 0 ? idRuns[lo - 1][1] : -1;
+    if (shard >= 0) wanted.add(shard);
+  }
+  return [...wanted].sort((a, b) => a - b).map((index) => manifest.shards[index]);
+}
+
+/**
+ * Load only the kanji in the shards picked from the manifest, falling back
+ * to the full kanji.json when data packs are unavailable
+ */
+async function loadFromShards(
+  pick: (manifest: KanjiShardManifest) => KanjiShard[]
+): Promise<Kanji[] | null> {
+  if (cachedKanjiData) {
+    return null;
+  }
+
+  const manifest = await loadShardManifest();
+  if (!manifest) {
+    return null;
+  }
+
+  try {
+    const shards = await Promise.all(pick(manifest).map(loadShard));
+    return shards.flat();
+  } catch (error) {
+    console.error('Error loading kanji shards:', error);
+    return null;
+  }
+}
+
 /**
  * Get a single kanji by ID
  */
 export async function getKanjiById(id: number): Promise<Kanji | null> {
-  const allKanji = await loadKanjiData();
+  const allKanji =
+    (await loadFromShards((manifest) => shardsForIds(manifest, [id]))) ?? (await loadKanjiData());
   return allKanji.find((k) => k.id === id) || null;
 }
 
@@ -41,13 +122,69 @@ export async function getKanjiById(id: number): Promise<Kanji | null> {
  * Get kanji by IDs
  */
 export async function getKanjiByIds(ids: number[]): Promise<Kanji[]> {
-  const allKanji = await loadKanjiData();
   const idSet = new Set(ids);
+  const allKanji =
+    (await loadFromShards((manifest) => shardsForIds(manifest, ids))) ??
+    (await loadKanjiData());
   return allKanji.filter((k) => idSet.has(k.id));
 }
 
 /**
- * Search kanji by character, keyword, or Heisig number
+ * Load the prebuilt search index (null if it is not available)
+ */
+export async function loadSearchIndex(): Promise<KanjiSearchIndex | null> {
+  if (!searchIndexPromise) {
+    searchIndexPromise = fetch('/data/search-index.json')
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return searchIndexPromise;
+}
+
+/**
+ * Normalize one query word the same way the index builder normalized tokens
+ */
+function normalizeSearchToken(word: string, index: KanjiSearchIndex): string {
+  const { from, to, strip } = index.normalize;
+  let token = '';
+  for (const ch of word.toLowerCase()) {
+    const pos = from.indexOf(ch);
+    token += pos >= 0 ? to[pos] : ch;
+  }
+  // Okurigana markers are only stripped from readings
+  if (/[\u3041-\u3096]/.test(token)) {
+    token = Array.from(token).filter((ch) => !strip.includes(ch)).join('');
+  }
+  return token.replace(/^[-'.!?:]+|[-'.!?:]+$/g, '');
+}
+
+/**
+ * Collect the ids of every term starting with `prefix` (terms are sorted)
+ */
+function idsForPrefix(index: KanjiSearchIndex, prefix: string): Set<number> {
+  const { terms, postings } = index;
+  let lo = 0;
+  let hi = terms.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (terms[mid] < prefix) lo = mid + 1;
+    else hi = mid;
+  }
+
+  const ids = new Set<number>();
+  for (let i = lo; i < terms.length && terms[i].startsWith(prefix); i++) {
+    let id = 0;
+    for (const delta of postings[i]) {
+      id += delta;
+      ids.add(id);
+    }
+  }
+  return ids;
+}
+
+/**
+ * Search kanji by character, keyword, reading, component, or Heisig number.
+ * Every query word must match the start of some indexed token.
  */
 export async function searchKanji(query: string): Promise<Kanji[]> {
   const allKanji = await loadKanjiData();
@@ -57,20 +194,51 @@ export async function searchKanji(query: string): Promise<Kanji[]> {
     return allKanji;
   }
 
-  return allKanji.filter((k) => {
-    return (
-      k.kanji.includes(lowerQuery) ||
-      k.keyword.toLowerCase().includes(lowerQuery) ||
-      k.heisig_number.includes(lowerQuery)
-    );
-  });
+  const index = await loadSearchIndex();
+  if (!index) {
+    return allKanji.filter((k) => {
+      return (
+        k.kanji.includes(lowerQuery) ||
+        k.keyword.toLowerCase().includes(lowerQuery) ||
+        k.heisig_number.includes(lowerQuery)
+      );
+    });
+  }
+
+  let matches: Set<number> | null = null;
+  for (const word of lowerQuery.split(/[\s/,;()[\]"]+/)) {
+    const token = normalizeSearchToken(word, index);
+    if (!token) continue;
+    const ids = idsForPrefix(index, token);
+    matches = matches ? new Set([...matches].filter((id) => ids.has(id))) : ids;
+    if (matches.size === 0) break;
+  }
+
+  if (!matches) {
+    return allKanji;
+  }
+
+  if (!kanjiPosition) {
+    kanjiPosition = new Map(allKanji.map((k, i) => [k.id, i]));
+  }
+  const positions = kanjiPosition;
+  return [...matches]
+    .map((id) => positions.get(id))
+    .filter((pos): pos is number => pos !== undefined)
+    .sort((a, b) => a - b)
+    .map((pos) => allKanji[pos]);
 }
 
 /**
  * Filter kanji by Heisig number range
  */
 export async function getKanjiByRange(start: number, end: number): Promise<Kanji[]> {
-  const allKanji = await loadKanjiData();
+  const allKanji =
+    (await loadFromShards((manifest) =>
+      manifest.shards.filter(
+        (s) => s.firstFrame !== null && s.lastFrame !== null && s.firstFrame <= end && start <= s.lastFrame
+      )
+    )) ?? (await loadKanjiData());
   return allKanji.filter((k) => {
     const num = parseInt(k.heisig_number);
     return num >= start && num <= end;
@@ -0,0 +1,82 @@
+/**
+ * Precomputed quiz tables: per-lesson id arrays and multiple-choice distractors
+ */
+
+import { KanjiQuizTables } from '@/types/kanji';
+
+const REASON_BITS = 5;
+
+let tablesPromise: Promise<KanjiQuizTables | null> | null = null;
+let bucketIds: number[][] | null = null;
+
+/**
+ * Load the prebuilt quiz tables (null if they are not available)
+ */
+export async function loadQuizTables(): Promise<KanjiQuizTables | null> {
+  if (!tablesPromise) {
+    tablesPromise = fetch('/data/quiz-tables.json')
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return tablesPromise;
+}
+
+/**
+ * Undo the delta encoding of a sorted id list
+ */
+function decodeDeltas(deltas: number[]): number[] {
+  const values: number[] = [];
+  let value = 0;
+  for (const delta of deltas) {
+    value += delta;
+    values.push(value);
+  }
+  return values;
+}
+
+/**
+ * Shuffle an array in place (Fisher-Yates, every order equally likely)
+ */
+export function shuffle<T>(items: T[]): T[] {
+  for (let i = items.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [items[i], items[j]] = [items[j], items[i]];
+  }
+  return items;
+}
+
+/**
+ * Kanji ids of every lesson bucket in book order (null without tables)
+ */
+export async function getLessonKanjiIds(): Promise<number[][] | null> {
+  const tables = await loadQuizTables();
+  if (!tables) {
+    return null;
+  }
+  if (!bucketIds) {
+    bucketIds = tables.buckets.map((bucket) => decodeDeltas(bucket.ids));
+  }
+  return bucketIds;
+}
+
+/**
+ * All kanji ids covered by the tables (null without tables)
+ */
+export async function getAllKanjiIds(): Promise<number[] | null> {
+  const buckets = await getLessonKanjiIds();
+  return buckets ? buckets.flat() : null;
+}
+
+/**
+ * Distractor kanji ids for a multiple-choice question, best candidates
+ * first; pass `reasons` (bits from tables.reasons) to keep only candidates
+ * related in those ways
+ */
+export async function getDistractorIds(id: number, count = 3, reasons = 0): Promise<number[]> {
+  const tables = await loadQuizTables();
+  const packed = tables?.distractors[id - 1] ?? [];
+  return packed
+    .filter((value) => !reasons || (value & ((1 << REASON_BITS) - 1) & reasons))
+    .slice(0, count)
+    .map((value) => value >> REASON_BITS);
+}
@@ -0,0 +1,81 @@
+/**
+ * Self-hosted stroke-order data for the kanji animation
+ */
+
+import { StrokeBundleManifest, StrokeData } from '@/types/kanji';
+
+let manifestPromise: Promise<StrokeBundleManifest | null> | null = null;
+const bundleCache = new Map<string, Promise<ArrayBuffer>>();
+
+/**
+ * Load the stroke bundle manifest (null if bundles have not been built)
+ */
+async function loadStrokeManifest(): Promise<StrokeBundleManifest | null> {
+  if (!manifestPromise) {
+    manifestPromise = fetch('/data/strokes/manifest.json')
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+/**
+ * Load one bundle (bundle URLs are content-hashed, so each is fetched once)
+ */
+function loadBundle(url: string): Promise<ArrayBuffer> {
+  let promise = bundleCache.get(url);
+  if (!promise) {
+    promise = fetch(url).then((response) => {
+      if (!response.ok) {
+        throw new Error('Failed to load stroke bundle');
+      }
+      return response.arrayBuffer();
+    });
+    promise.catch(() => bundleCache.delete(url));
+    bundleCache.set(url, promise);
+  }
+  return promise;
+}
+
+/**
+ * Get the stroke paths and stroke-number positions for a kanji
+ */
+export async function getStrokeData(kanji: string): Promise<StrokeData | null> {
+  const manifest = await loadStrokeManifest();
+  const entry = manifest?.index[kanji];
+  if (!manifest || !entry) {
+    return null;
+  }
+
+  const [bundleIndex, offset, length] = entry;
+  const buffer = await loadBundle(manifest.bundles[bundleIndex].url);
+  const record = new TextDecoder().decode(new Uint8Array(buffer, offset, length));
+  return JSON.parse(record);
+}
+
+/**
+ * Rebuild a KanjiVG-style SVG document from stroke data
+ */
+export function strokeDataToSvg(strokes: StrokeData): string {
+  const paths = strokes.d.map((d, i) => `<path id="s${i + 1}" d="${d}"/>`).join('');
+  const numbers = strokes.n
+    .map(([x, y], i) => `<text transform="matrix(1 0 0 1 ${x} ${y})">${i + 1}</text>`)
+    .join('');
+
+  return (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="109" height="109" viewBox="0 0 109 109">' +
+    '<g style="fill:none;stroke:#000000;stroke-width:3;stroke-linecap:round;stroke-linejoin:round;">' +
+    paths +
+    '</g>' +
+    `<g style="font-size:8px;fill:#808080">${numbers}</g>` +
+    '</svg>'
+  );
+}
+
+/**
+ * Get a stroke-order SVG for a kanji from the self-hosted bundles
+ */
+export async function loadStrokeSvg(kanji: string): Promise<string | null> {
+  const strokes = await getStrokeData(kanji);
+  return strokes ? strokeDataToSvg(strokes) : null;
+}
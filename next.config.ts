@@ -1,7 +1,20 @@
 import type { NextConfig } from "next";
 
 const nextConfig: NextConfig = {
-  /* config options here */
+  async headers() {
+    return [
+      {
+        // Per-lesson data packs have content-hashed names and never change
+        source: "/data/lessons/:shard([\\w-]+\\.[0-9a-f]{10}\\.json)",
+        headers: [{ key: "Cache-Control", value: "public, max-age=31536000, immutable" }],
+      },
+      {
+        // Stroke-order bundles are content-hashed too
+        source: "/data/strokes/:bundle([\\w-]+\\.[0-9a-f]{10}\\.bin)",
+        headers: [{ key: "Cache-Control", value: "public, max-age=31536000, immutable" }],
+      },
+    ];
+  },
 };
 
 export default nextConfig;
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+One entry point for the data pipeline, run from the repository root:
+
+    python3 -m scripts STAGE [options] [STAGE [options] ...]
+
+Stages run in the order given, all in one process. Each stage imports
+its modules only when it runs, so `--help` and short chains start fast.
+The stroke-count cache, the build manifest and the parsed kanji.json are
+opened once and shared by every stage in the chain. A stage that fails
+stops the chain with a non-zero exit status.
+
+    python3 -m scripts extract --kanjivg-archive kanjivg.zip pack validate
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# The pipeline modules import each other by their flat names
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from build_metrics import add_profile_arguments, profile_session
+
+KANJI_FILE = Path("public/data/kanji.json")
+INDEX_ZIPS = [Path("heisig-rtk-index.zip"), Path("heisig-rtk-index-4.zip")]
+LESSONS_ZIP = INDEX_ZIPS[1]
+
+STAGES = {
+    "extract": "build kanji.json, the search index and the component graph from the RTK index",
+    "strokes": "fill in missing stroke counts in the kanji store (see add_stroke_counts.py)",
+    "pack": "write the per-lesson data packs, the stroke bundles, the quiz tables and the kanji dictionary",
+    "validate": "check kanji.json against every other source and write the validation report",
+}
+
+
+class PipelineSession:
+    """
+    State shared by the stages of one run. The manifest and the stroke
+    count cache are opened on first use, so a chain that never needs the
+    cache never opens it.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._manifest = None
+        self._stroke_count_cache = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            from build_manifest import BuildManifest
+            self._manifest = BuildManifest()
+        return self._manifest
+
+    @property
+    def stroke_count_cache(self):
+        if self._stroke_count_cache is None:
+            from stroke_cache import StrokeCountCache
+            self._stroke_count_cache = StrokeCountCache()
+        return self._stroke_count_cache
+
+    def close(self):
+        if self._stroke_count_cache is not None:
+            self._stroke_count_cache.close()
+            self._stroke_count_cache = None
+
+
+def stage_parser(name):
+    """Argument parser for one stage."""
+    # No abbreviated options, so split_stages knows exactly which ones take a value
+    parser = argparse.ArgumentParser(prog=f"python3 -m scripts {name}", description=STAGES[name],
+                                     allow_abbrev=False)
+    if name in ("extract", "strokes", "pack"):
+        parser.add_argument("--workers", type=int, default=8,
+                            help="maximum concurrent KanjiVG requests (default: 8)")
+        parser.add_argument("--rate", type=float, default=10.0,
+                            help="maximum KanjiVG requests per second (default: 10)")
+        parser.add_argument("--kanjivg-archive", type=Path, metavar="PATH",
+                            help="read KanjiVG SVGs from a local release .zip/.tar.gz instead of the network")
+        parser.add_argument("--kanjivg-url", metavar="URL",
+                            help="base URL of the KanjiVG kanji/ directory (default: GitHub)")
+    if name in ("extract", "strokes"):
+        parser.add_argument("--refresh", action="store_true",
+                            help="revalidate cached stroke counts not checked for 30 days; counts without "
+                                 "stored validators need a full download, at most 100 per run")
+    if name in ("extract", "pack"):
+        parser.add_argument("--force", action="store_true",
+                            help="rebuild even if the build manifest says the output is up to date")
+    if name == "extract":
+        parser.add_argument("--resume", action="store_true",
+                            help="continue an interrupted run from its last checkpoint")
+    if name == "strokes":
+        parser.add_argument("--export", action="store_true",
+                            help="write the updated kanji store back to kanji.json")
+    if name == "validate":
+        parser.add_argument("--report", type=Path, metavar="PATH",
+                            help="where to write the JSON report (default: scripts/validation-report.json)")
+        parser.add_argument("--examples", type=int, default=3, metavar="N",
+                            help="examples to print per check (default: 3)")
+        parser.add_argument("--warnings-as-errors", action="store_true",
+                            help="also fail when there are only warnings")
+    return parser
+
+
+def value_options(parser):
+    """Option strings of a parser that take a value (`--report PATH`, not `--force`)."""
+    return {option for action in parser._actions if action.nargs != 0
+            for option in action.option_strings}
+
+
+def split_stages(argv, global_parser):
+    """
+    Split the command line into the global options and one argument list per stage.
+    A stage name only starts a new stage where it is not the value of the
+    option before it, so `validate --report extract` reports to ./extract.
+    """
+    chunks = [[]]
+    expects_value = value_options(global_parser)
+    previous = None
+    for arg in argv:
+        if arg in STAGES and previous not in expects_value:
+            chunks.append([arg])
+            expects_value = value_options(stage_parser(arg))
+            previous = None
+        else:
+            chunks[-1].append(arg)
+            # After a value (or `--opt=value`) the next token is free again
+            previous = None if previous in expects_value else arg
+    return chunks[0], chunks[1:]
+
+
+def require_kanji_file():
+    if not KANJI_FILE.exists():
+        print(f"❌ Error: {KANJI_FILE} not found, run the extract stage first")
+        sys.exit(1)
+
+
+def run_extract(args, session):
+    from extract_kanji_data import extract_kanji_data
+    from kanjivg_svg import KANJIVG_BASE_URL
+
+    if args.force or args.refresh:
+        session.manifest.invalidate("extract")
+    print("🚀 Starting kanji data extraction...\n")
+    try:
+        kanji_data = extract_kanji_data(INDEX_ZIPS, KANJI_FILE,
+                                        max_workers=args.workers, rate=args.rate,
+                                        kanjivg_archive=args.kanjivg_archive,
+                                        manifest=session.manifest, lessons_zip=LESSONS_ZIP,
+                                        kanjivg_url=args.kanjivg_url or KANJIVG_BASE_URL,
+                                        metrics=session.metrics, refresh=args.refresh,
+                                        resume=args.resume,
+                                        stroke_count_cache=session.stroke_count_cache)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted. Run again with --resume to continue from the last checkpoint")
+        sys.exit(130)
+    print(f"\n✅ Successfully extracted {len(kanji_data)} kanji characters")
+    print(f"📁 Output saved to: {KANJI_FILE}")
+
+
+def run_strokes(args, session):
+    from add_stroke_counts import add_stroke_counts
+    from kanjivg_svg import KANJIVG_BASE_URL
+
+    require_kanji_file()
+    try:
+        add_stroke_counts(KANJI_FILE, args.kanjivg_archive, max_workers=args.workers,
+                          rate=args.rate, kanjivg_url=args.kanjivg_url or KANJIVG_BASE_URL,
+                          metrics=session.metrics, refresh=args.refresh, export=args.export,
+                          stroke_count_cache=session.stroke_count_cache)
+    except ValueError as error:
+        print(f"❌ Error: {error}")
+        sys.exit(1)
+
+
+def run_pack(args, session):
+    from build_data_packs import build_data_packs
+    from build_manifest import load_json_file
+    from build_quiz_tables import QUIZ_TABLES_FILE, build_quiz_tables
+    from build_stroke_bundles import STROKE_BUNDLE_DIR, build_stroke_bundles, collect_strokes
+    from build_stroke_features import SIMILAR_KANJI_FILE, build_stroke_features
+    from course_codec import KANJI_DICTIONARY_FILE, update_kanji_dictionary
+    from kanjivg_svg import KANJIVG_BASE_URL
+
+    require_kanji_file()
+    metrics = session.metrics
+    if args.force:
+        for stage in ("packs", "quiz", "strokes", "stroke_features"):
+            session.manifest.invalidate(stage)
+
+    with metrics.stage("data_packs"):
+        pack_manifest = build_data_packs(KANJI_FILE, LESSONS_ZIP, manifest=session.manifest)
+    if pack_manifest:
+        metrics.wrote("data_packs", sum(shard["bytes"] for shard in pack_manifest["shards"]))
+        print(f"📦 Wrote {len(pack_manifest['shards'])} per-lesson data packs")
+
+    # Only kanji whose stripped strokes are not cached yet are looked up
+    try:
+        with metrics.stage("stroke_bundles"):
+            collect_strokes([entry['kanji'] for entry in load_json_file(KANJI_FILE)[1]],
+                            session.stroke_count_cache, args.kanjivg_archive, args.workers, args.rate,
+                            base_url=args.kanjivg_url or KANJIVG_BASE_URL)
+            bundle_manifest = build_stroke_bundles(KANJI_FILE, LESSONS_ZIP, session.stroke_count_cache,
+                                                   manifest=session.manifest)
+        # Visual neighbors from the same strokes, for the quiz distractors
+        with metrics.stage("stroke_features"):
+            features = build_stroke_features(KANJI_FILE, session.stroke_count_cache,
+                                             manifest=session.manifest)
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Interrupted. The SVGs fetched so far are cached; run again to finish {STROKE_BUNDLE_DIR}")
+        sys.exit(130)
+    if bundle_manifest:
+        metrics.wrote("stroke_bundles", sum(bundle["bytes"] for bundle in bundle_manifest["bundles"]))
+        print(f"✍️  Wrote {len(bundle_manifest['bundles'])} stroke bundles to {STROKE_BUNDLE_DIR}")
+    if features:
+        print(f"📐 Wrote visual neighbors to {SIMILAR_KANJI_FILE}")
+
+    with metrics.stage("quiz_tables"):
+        quiz_tables = build_quiz_tables(KANJI_FILE, LESSONS_ZIP, manifest=session.manifest,
+                                        similar_path=SIMILAR_KANJI_FILE)
+    if quiz_tables:
+        metrics.wrote("quiz_tables", QUIZ_TABLES_FILE)
+        print(f"🎯 Wrote quiz tables for {len(quiz_tables['distractors'])} kanji")
+
+    with metrics.stage("kanji_dictionary"):
+        dictionary = update_kanji_dictionary(load_json_file(KANJI_FILE)[1])
+    metrics.wrote("kanji_dictionary", KANJI_DICTIONARY_FILE)
+    print(f"📖 Kanji dictionary v{dictionary['version']}: {len(dictionary['kanji'])} kanji")
+
+
+def run_validate(args, session):
+    from validate_kanji_data import VALIDATION_REPORT_FILE, print_validation_summary, run_validation
+
+    require_kanji_file()
+    report_path = args.report or VALIDATION_REPORT_FILE
+    with session.metrics.stage("validate"):
+        report = run_validation(KANJI_FILE, INDEX_ZIPS, LESSONS_ZIP, report_path)
+    session.metrics.count("validation_errors", report["summary"]["errors"])
+    print_validation_summary(report, limit=args.examples)
+    print(f"📋 Validation report saved to: {report_path}")
+
+    summary = report["summary"]
+    if summary["errors"] or (args.warnings_as_errors and summary["warnings"]):
+        sys.exit(1)
+
+
+RUNNERS = {"extract": run_extract, "strokes": run_strokes, "pack": run_pack, "validate": run_validate}
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m scripts",
+        usage="%(prog)s [--profile ...] STAGE [options] [STAGE [options] ...]",
+        description="Run data pipeline stages in one process, sharing caches between them.",
+        epilog="stages:\n" + "\n".join(f"  {name:<10} {text}" for name, text in STAGES.items())
+               + "\n\nRun `%(prog)s STAGE --help` for the options of a stage.",
+        formatter_class=argparse.RawDescriptionHelpFormatter, allow_abbrev=False)
+    add_profile_arguments(parser)
+    global_argv, stage_argvs = split_stages(sys.argv[1:], parser)
+    args = parser.parse_args(global_argv)
+    if not stage_argvs:
+        parser.error("no stage given")
+
+    # Parse every stage up front so a typo fails before any work is done
+    stages = [(argv[0], stage_parser(argv[0]).parse_args(argv[1:])) for argv in stage_argvs]
+
+    with profile_session(args, "python3 -m scripts " + " ".join(name for name, _ in stages)) as metrics:
+        session = PipelineSession(metrics)
+        try:
+            for index, (name, stage_args) in enumerate(stages):
+                if index:
+                    print()
+                RUNNERS[name](stage_args, session)
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,152 @@
 #!/usr/bin/env python3
 """
 Add stroke counts to existing kanji.json file.
-This script reads the existing file and adds strokeCount field.
+Missing strokeCount fields are patched in place in the binary kanji
+store (see kanji_store.py); kanji.json is only rewritten with --export.
 """
 
-import json
+import argparse
 from pathlib import Path
-import urllib.request
-import xml.etree.ElementTree as ET
-import time
 
-STROKE_COUNT_CACHE_FILE = Path("scripts/stroke_count_cache.json")
+from kanjivg_svg import KANJIVG_BASE_URL
+from stroke_cache import StrokeCountCache
+from build_metrics import BuildMetrics, add_profile_arguments, profile_session
+from kanji_store import KANJI_STORE_FILE, open_store
 
-def load_stroke_count_cache():
-    """Load cached stroke counts from file."""
-    if STROKE_COUNT_CACHE_FILE.exists():
-        try:
-            with open(STROKE_COUNT_CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_stroke_count_cache(cache):
-    """Save stroke count cache to file."""
-    STROKE_COUNT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(STROKE_COUNT_CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
-
-def get_kanjivg_stroke_count(kanji_char, cache, retry_count=2):
+def add_stroke_counts(kanji_file, kanjivg_archive=None, max_workers=8, rate=10.0,
+                      kanjivg_url=KANJIVG_BASE_URL, metrics=None, refresh=False,
+                      store_path=KANJI_STORE_FILE, export=False, stroke_count_cache=None):
     """
-    Fetch stroke count from KanjiVG GitHub repository.
-    Returns the number of strokes, or None if unavailable.
+    Fill in missing stroke counts for `kanji_file` in the kanji store at
+    `store_path`. With `refresh`, every entry is revalidated against
+    KanjiVG with conditional requests. With `export`, the store is written
+    back to `kanji_file` afterwards.
+    Stage timings and counters are recorded on `metrics` (a BuildMetrics).
+    A `stroke_count_cache` passed in is left open for the caller.
     """
-    if kanji_char in cache:
-        return cache[kanji_char]
-    
-    unicode_hex = f"{ord(kanji_char):05x}"
-    url = f"https://raw.githubusercontent.com/KanjiVG/kanjivg/master/kanji/{unicode_hex}.svg"
-    
-    for attempt in range(retry_count):
-        try:
-            with urllib.request.urlopen(url, timeout=10) as response:
-                svg_data = response.read().decode('utf-8')
-            
-            root = ET.fromstring(svg_data)
-            paths = root.findall('.//{http://www.w3.org/2000/svg}path')
-            
-            if not paths:
-                paths = root.findall('.//path')
-            
-            count = len(paths) if paths else None
-            if count is not None:
-                cache[kanji_char] = count
-            return count
-        except Exception as e:
-            if attempt < retry_count - 1:
-                time.sleep(0.5)
-                continue
-            return None
-    
-    return None
+    if metrics is None:
+        metrics = BuildMetrics()
+    owns_cache = stroke_count_cache is None
+
+    print("📖 Opening the kanji store...")
+    with metrics.stage("load"):
+        store = open_store(kanji_file, store_path)
+
+    print(f"✓ Loaded {len(store)} kanji")
+    metrics.count("rows", len(store))
 
-def main():
-    """Main execution function."""
-    kanji_file = Path("public/data/kanji.json")
-    
-    if not kanji_file.exists():
-        print("❌ Error: kanji.json not found")
-        return
-    
-    print("📖 Loading existing kanji data...")
-    with open(kanji_file, 'r', encoding='utf-8') as f:
-        kanji_data = json.load(f)
-    
-    print(f"✓ Loaded {len(kanji_data)} kanji")
-    
     # Load cache
-    stroke_count_cache = load_stroke_count_cache()
+    if owns_cache:
+        stroke_count_cache = StrokeCountCache()
     print(f"📦 Loaded {len(stroke_count_cache)} cached stroke counts")
-    
+
     # Update kanji with stroke counts
     updated_count = 0
+    kept_count = 0
     failed_count = 0
-    
-    for i, entry in enumerate(kanji_data):
-        # Skip if already has strokeCount
-        if 'strokeCount' in entry and entry['strokeCount'] > 0:
-            continue
-        
-        kanji_char = entry['kanji']
-        stroke_count = get_kanjivg_stroke_count(kanji_char, stroke_count_cache)
-        
-        if stroke_count is not None:
-            entry['strokeCount'] = stroke_count
-            updated_count += 1
-            
-            # Show progress
-            if (i + 1) % 50 == 0:
-                print(f"  ✓ Processed {i + 1}/{len(kanji_data)} kanji... (updated: {updated_count})")
-                # Save cache periodically
-                save_stroke_count_cache(stroke_count_cache)
-        else:
-            # Use default for unavailable data
-            entry['strokeCount'] = 10
-            failed_count += 1
-            print(f"  ⚠️  No data for {kanji_char} (#{entry.get('heisig_number', '?')})")
-        
-        # Rate limiting
-        if kanji_char not in stroke_count_cache:
-            time.sleep(0.15)
-    
-    # Save updated data
-    print(f"\n💾 Saving updated kanji data...")
-    with open(kanji_file, 'w', encoding='utf-8') as f:
-        json.dump(kanji_data, f, ensure_ascii=False, indent=2)
-    
-    # Save final cache
-    save_stroke_count_cache(stroke_count_cache)
-    
+
+    pending = [(slot, store.field(slot, 'kanji')) for slot in range(len(store))
+               if refresh or not (store.field(slot, 'strokeCount') or 0) > 0]
+
+    if kanjivg_archive:
+        from kanjivg_archive import load_stroke_counts_from_archive
+        print(f"📦 Reading stroke counts from {kanjivg_archive}...")
+        wanted = {kanji_char for _, kanji_char in pending}
+        with metrics.stage("stroke_counts"):
+            added = load_stroke_counts_from_archive(kanjivg_archive, stroke_count_cache, wanted)
+        metrics.count("archive_added", added)
+        stroke_counts = {c: stroke_count_cache.get(c) for c in wanted}
+    else:
+        from kanjivg_fetch import StrokeCountFetcher
+
+        def report_progress(done, total):
+            # Show progress (the cache commits itself every 50 inserts)
+            if done % 50 == 0:
+                print(f"  ✓ Fetched {done}/{total} kanji...")
+
+        with metrics.stage("stroke_counts"), \
+                StrokeCountFetcher(stroke_count_cache, max_workers=max_workers, rate=rate,
+                                   retry_count=2, base_url=kanjivg_url, metrics=metrics,
+                                   refresh=refresh) as fetcher:
+            stroke_counts = fetcher.fetch_many((kanji_char for _, kanji_char in pending),
+                                               progress=report_progress)
+
+    # Patch the fixed-size records in place
+    with metrics.stage("store_update"):
+        for slot, kanji_char in pending:
+            stroke_count = stroke_counts.get(kanji_char)
+            previous = store.field(slot, 'strokeCount') or 0
+
+            if stroke_count is not None:
+                if stroke_count != previous:
+                    store.set_field(slot, 'strokeCount', stroke_count)
+                    updated_count += 1
+            elif previous > 0:
+                # A refresh that found nothing keeps the count from the frame lists or tables
+                kept_count += 1
+            else:
+                # Use default for unavailable data
+                store.set_field(slot, 'strokeCount', 10)
+                failed_count += 1
+                print(f"  ⚠️  No data for {kanji_char} (#{store.field(slot, 'heisig_number') or '?'})")
+        store.flush()
+    metrics.count("default_stroke_counts", failed_count)
+
+    if export:
+        print(f"\n💾 Exporting the kanji store to {kanji_file}...")
+        with metrics.stage("write_json"):
+            store.export_json(kanji_file)
+        metrics.wrote("kanji_json", kanji_file)
+    elif store.dirty:
+        print(f"\n💾 Updated {store_path}; run with --export to write {kanji_file}")
+    store.close()
+
+    # Commit final cache and refresh the JSON snapshot
+    with metrics.stage("cache_commit"):
+        stroke_count_cache.commit()
+        stroke_count_cache.export_json()
+
     print(f"\n✅ Complete!")
     print(f"   Updated: {updated_count}")
+    if refresh:
+        print(f"   Kept (no KanjiVG data): {kept_count}")
     print(f"   Failed (using default): {failed_count}")
     print(f"   Cache size: {len(stroke_count_cache)}")
+    if owns_cache:
+        stroke_count_cache.close()
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Add stroke counts to public/data/kanji.json.")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="maximum concurrent KanjiVG requests (default: 8)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="maximum KanjiVG requests per second (default: 10)")
+    parser.add_argument("--kanjivg-archive", type=Path, metavar="PATH",
+                        help="read stroke counts from a local KanjiVG release .zip/.tar.gz instead of the network")
+    parser.add_argument("--kanjivg-url", default=KANJIVG_BASE_URL, metavar="URL",
+                        help="base URL of the KanjiVG kanji/ directory (default: GitHub)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="revalidate cached stroke counts not checked for 30 days with conditional requests; "
+                             "counts without stored validators need a full download, at most 100 per run")
+    parser.add_argument("--export", action="store_true",
+                        help="write the updated kanji store back to kanji.json")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    kanji_file = Path("public/data/kanji.json")
+
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        return
+
+    with profile_session(args, "add_stroke_counts.py") as metrics:
+        try:
+            add_stroke_counts(kanji_file, args.kanjivg_archive, max_workers=args.workers,
+                              rate=args.rate, kanjivg_url=args.kanjivg_url, metrics=metrics,
+                              refresh=args.refresh, export=args.export)
+        except ValueError as error:
+            print(f"❌ Error: {error}")
 
 if __name__ == "__main__":
     main()
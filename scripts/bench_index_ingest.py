@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of the index merge used by extraction.
+Generates synthetic KANJI_INDEX-style ZIPs of growing size and runs each
+one through merge_index_sources in a fresh interpreter, so peak RSS for
+every size is measured independently. Rows are read lazily, but the merge
+keeps one record per distinct character (at most 20,000 here) until the
+last row, so memory follows the number of characters and the keyword
+variants they collect (every synthetic row adds one) rather than the
+number of rows.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+HEADER = "kanji,id_5th_ed,id_6th_ed,keyword_5th_ed,keyword_6th_ed,components,on_reading,kun_reading\n"
+
+
+def write_synthetic_index(zip_path, rows):
+    """Write a ZIP holding one KANJI_INDEX.csv with `rows` synthetic rows."""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        with zip_ref.open('synthetic/kanji/KANJI_INDEX.csv', 'w') as raw_file:
+            raw_file.write(HEADER.encode('utf-8'))
+            for i in range(rows):
+                kanji_char = chr(0x4E00 + i % 20000)
+                line = (f"{kanji_char},{i + 1},{i + 1},keyword {i},keyword {i},"
+                        f"one; two; {kanji_char},イチ; イツ,ひと-; ひと.つ\n")
+                raw_file.write(line.encode('utf-8'))
+
+
+def measure(zip_path):
+    """Merge one ZIP as extraction does and return record count, seconds and peak RSS in KB."""
+    from index_sources import merge_index_sources
+
+    start = time.perf_counter()
+    records = sum(1 for _ in merge_index_sources([zip_path], verbose=False))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"records": records, "seconds": round(elapsed, 3), "peak_rss_kb": peak_kb}
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark index merge memory.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3_000, 30_000, 300_000],
+                        help="synthetic row counts to benchmark")
+    parser.add_argument("--measure", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    print("🚀 Benchmarking the index merge...\n")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            zip_path = Path(tmp_dir) / f"index-{size}.zip"
+            write_synthetic_index(zip_path, size)
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", str(zip_path)],
+                check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rate = size / result["seconds"] if result["seconds"] else 0
+            print(f"  {size:>9,} rows: {result['seconds']:7.3f}s ({rate:,.0f} rows/s), "
+                  f"{result['records']:,} records, peak RSS {result['peak_rss_kb'] / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
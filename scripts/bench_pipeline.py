@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data-extraction pipeline end to end.
+Generates synthetic Heisig-style index ZIPs, serves fake KanjiVG SVGs from
+a local HTTP server with configurable latency and error rate, and times
+every stage with a cold and a warm stroke-count cache. Each stage runs in
+a fresh interpreter so peak RSS is measured independently. Results are
+written as JSON and can be compared against a stored baseline.
+"""
+
+import argparse
+import json
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from bench_index_ingest import write_synthetic_index
+
+BENCH_RESULTS_FILE = Path("scripts/bench-results.json")
+BENCH_BASELINE_FILE = Path("scripts/bench-baseline.json")
+
+STAGES = ["extract", "add_stroke_counts", "data_packs"]
+SCENARIOS = ["cold", "warm"]
+
+# Metrics compared against the baseline
+COMPARED_METRICS = ["seconds", "peak_rss_kb", "requests"]
+
+
+def fake_svg(kanji_char):
+    """A small KanjiVG-style SVG with a stroke count derived from the character."""
+    strokes = ord(kanji_char) % 20 + 1
+    paths = "".join(f'<path id="s{i}" d="M{i},10c1,2,3,4,5,6"/>' for i in range(1, strokes + 1))
+    numbers = "".join(f'<text transform="matrix(1 0 0 1 {i} 9)">{i}</text>'
+                      for i in range(1, strokes + 1))
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="109" height="109">'
+            f'<g>{paths}</g><g>{numbers}</g></svg>').encode('utf-8')
+
+
+class FakeKanjiVGServer:
+    """
+    Local stand-in for the KanjiVG CDN.
+
+    Every request sleeps for `latency` seconds. A deterministic fraction
+    `error_rate` of attempts answers 503 with Retry-After: 0, so repeated
+    runs see the same failures. Connections are kept alive and ETags are
+    honored like on the real CDN. `requests` counts every request served,
+    `connections` every connection accepted.
+    """
+
+    def __init__(self, latency=0.02, error_rate=0.02, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests = 0
+        self.connections = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/kanji"
+
+    def _should_fail(self, path):
+        with self._lock:
+            self.requests += 1
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+        roll = random.Random(zlib.crc32(f"{self.seed}:{path}:{attempt}".encode())).random()
+        return roll < self.error_rate
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _empty_response(self, status, **headers):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name.replace('_', '-'), value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                name = self.path.rsplit('/', 1)[-1]
+                if server._should_fail(self.path):
+                    self._empty_response(503, Retry_After="0")
+                    return
+                try:
+                    body = fake_svg(chr(int(name[:-len(".svg")], 16)))
+                except ValueError:
+                    self._empty_response(404)
+                    return
+                etag = f'"{zlib.crc32(body):08x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._empty_response(304, ETag=etag)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/svg+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def count_index_rows(zip_path):
+    """Number of data rows in every CSV member of an index ZIP."""
+    rows = 0
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for file_name in zip_ref.namelist():
+            with zip_ref.open(file_name) as raw_file:
+                rows += sum(1 for _ in raw_file) - 1
+    return rows
+
+
+def count_output_rows():
+    """Number of entries in the workspace kanji.json."""
+    with open("public/data/kanji.json", 'r', encoding='utf-8') as f:
+        return len(json.load(f))
+
+
+def measure(stage, zip_path, kanjivg_url, workers, rate):
+    """Run one stage in the current directory and return its metrics."""
+    start = time.perf_counter()
+    if stage == "extract":
+        from extract_kanji_data import extract_kanji_data
+
+        extract_kanji_data([zip_path], Path("public/data/kanji.json"), max_workers=workers,
+                           rate=rate, lessons_zip=zip_path, kanjivg_url=kanjivg_url)
+    elif stage == "add_stroke_counts":
+        import add_stroke_counts
+
+        sys.argv = ["add_stroke_counts.py", "--kanjivg-url", kanjivg_url,
+                    "--workers", str(workers), "--rate", str(rate)]
+        add_stroke_counts.main()
+    elif stage == "data_packs":
+        from build_data_packs import build_data_packs
+        from build_manifest import BuildManifest
+
+        build_data_packs(Path("public/data/kanji.json"), zip_path, manifest=BuildManifest())
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    rows = count_index_rows(zip_path) if stage == "extract" else count_output_rows()
+    return {"rows": rows, "seconds": round(elapsed, 3), "peak_rss_kb": peak_kb}
+
+
+def reset_workspace(workspace, stage, scenario):
+    """Put the workspace into the state a stage/scenario pair starts from."""
+    scripts_dir = workspace / "scripts"
+    if scenario == "cold":
+        if stage in ("extract", "add_stroke_counts"):
+            for path in scripts_dir.glob("stroke_count_cache.*"):
+                path.unlink()
+        elif stage == "data_packs":
+            (scripts_dir / ".build_manifest.json").unlink(missing_ok=True)
+            shutil.rmtree(workspace / "public/data/lessons", ignore_errors=True)
+
+    if stage == "add_stroke_counts":
+        # The kanji store holds the previous run's unexported counts; start from kanji.json
+        (scripts_dir / "kanji_store.bin").unlink(missing_ok=True)
+        # Make every entry pending again, as in a kanji.json without counts
+        kanji_path = workspace / "public/data/kanji.json"
+        with open(kanji_path, 'r', encoding='utf-8') as f:
+            kanji_list = json.load(f)
+        for entry in kanji_list:
+            entry.pop('strokeCount', None)
+        with open(kanji_path, 'w', encoding='utf-8') as f:
+            json.dump(kanji_list, f, ensure_ascii=False)
+
+
+def run_stage(workspace, zip_path, stage, server, workers, rate):
+    """Run one stage in a fresh interpreter and add the request count."""
+    requests_before = server.requests
+    output = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--measure", stage,
+         "--zip", str(zip_path), "--kanjivg-url", server.url,
+         "--workers", str(workers), "--rate", str(rate)],
+        cwd=workspace, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["requests"] = server.requests - requests_before
+    result["rows_per_sec"] = round(result["rows"] / result["seconds"]) if result["seconds"] else None
+    return result
+
+
+def result_key(result):
+    return f"{result['stage']}/{result['scenario']}/{result['size']}"
+
+
+def compare_results(results, baseline, tolerance, min_seconds=0.05, min_rss_kb=2048):
+    """
+    Return a list of regression messages. A metric regresses when it grows
+    by more than `tolerance` (relative) and by more than a small absolute
+    slack, so millisecond-scale stages do not flap.
+    """
+    slack = {"seconds": min_seconds, "peak_rss_kb": min_rss_kb, "requests": 0}
+    previous = {result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            new_value, old_value = result.get(metric), old.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            if new_value > old_value * (1 + tolerance) and new_value - old_value > slack[metric]:
+                regressions.append(f"{result_key(result)}: {metric} {old_value} -> {new_value}")
+    return regressions
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the data-extraction pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3_000, 30_000, 300_000],
+                        help="synthetic row counts to benchmark")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="stages to run (default: all)")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="fake KanjiVG response latency in seconds (default: 0.02)")
+    parser.add_argument("--error-rate", type=float, default=0.02,
+                        help="fraction of fake KanjiVG requests answered with 503 (default: 0.02)")
+    parser.add_argument("--workers", type=int, default=32,
+                        help="concurrent KanjiVG requests (default: 32)")
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="KanjiVG requests per second (default: 1000)")
+    parser.add_argument("--output", type=Path, default=BENCH_RESULTS_FILE,
+                        help=f"where to write results (default: {BENCH_RESULTS_FILE})")
+    parser.add_argument("--baseline", type=Path, default=BENCH_BASELINE_FILE,
+                        help=f"baseline to compare against (default: {BENCH_BASELINE_FILE})")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative growth per metric before failing (default: 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--zip", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--kanjivg-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.zip, args.kanjivg_url, args.workers, args.rate)))
+        return
+
+    print("🚀 Benchmarking the data-extraction pipeline...\n")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            FakeKanjiVGServer(args.latency, args.error_rate) as server:
+        for size in args.sizes:
+            zip_path = Path(tmp_dir) / f"index-{size}.zip"
+            write_synthetic_index(zip_path, size)
+            workspace = Path(tmp_dir) / f"workspace-{size}"
+            (workspace / "scripts").mkdir(parents=True)
+            (workspace / "public/data").mkdir(parents=True)
+
+            print(f"📦 {size:,} rows")
+            if "extract" not in args.stages:
+                # Later stages read the kanji.json that extraction writes
+                run_stage(workspace, zip_path, "extract", server, args.workers, args.rate)
+            for stage in (s for s in STAGES if s in args.stages):
+                for scenario in SCENARIOS:
+                    reset_workspace(workspace, stage, scenario)
+                    result = run_stage(workspace, zip_path, stage, server, args.workers, args.rate)
+                    result = {"stage": stage, "scenario": scenario, "size": size, **result}
+                    results.append(result)
+                    print(f"  {stage:<18} {scenario:<5} {result['seconds']:8.3f}s "
+                          f"({result['rows_per_sec'] or 0:>9,} rows/s), "
+                          f"peak RSS {result['peak_rss_kb'] / 1024:6.1f} MB, "
+                          f"{result['requests']:>6,} requests")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "workers": args.workers,
+            "rate": args.rate,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results saved to: {args.output}")
+
+    if args.update_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"ℹ️  No baseline at {args.baseline}, run with --update-baseline to store one")
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare_results(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regressions against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print(f"✅ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
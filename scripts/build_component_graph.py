@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Build a component graph over the kanji index.
+Every component name in KANJI_INDEX.csv is resolved to the kanji (by
+keyword) or primitive frame (from primitives/INPUT.csv) it stands for.
+The graph is written as adjacency arrays, a reverse "used by" index and
+precomputed transitive closures, and every component that is used before
+the book introduces it is reported.
+"""
+
+import argparse
+import csv
+import io
+import json
+import re
+import zipfile
+from pathlib import Path
+
+from build_data_packs import frame_number, load_lesson_boundaries
+from build_search_index import delta_encode
+
+COMPONENT_GRAPH_FILE = Path("public/data/components.json")
+COMPONENT_GRAPH_VERSION = 1
+PRIMITIVES_MEMBER = "primitives/INPUT.csv"
+
+# Primitive SVG paths look like <n>-strokes/p<page>.<part>-<keyword>-<modifier>.svg
+PRIMITIVE_PATH = re.compile(
+    r'^(?:.*/)?\d+-strokes/p\d+(?:\.\d+)?-(?P<keyword>[^-]*)(?:-(?P<modifier>.*))?\.svg$')
+# parent_frame "^" means "same group as the row above"
+PARENT_FRAME_CHAIN = "^"
+
+
+def component_key(name):
+    """Case-insensitive lookup key for a component or keyword name."""
+    return name.strip().casefold()
+
+
+def load_primitive_frames(zip_path):
+    """
+    Read primitives/INPUT.csv from the Heisig RTK Index ZIP.
+    Returns [{"name", "parent_frame", "next_frame", "real_heisig"}, ...];
+    a primitive is introduced just before `next_frame`, and stands for the
+    kanji at `parent_frame` or `real_heisig` when those are set.
+    """
+    primitives = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for file_name in zip_ref.namelist():
+            if not file_name.endswith(PRIMITIVES_MEMBER):
+                continue
+            with zip_ref.open(file_name) as raw_file:
+                with io.TextIOWrapper(raw_file, encoding='utf-8', newline='') as data_file:
+                    previous = None
+                    for row in csv.DictReader(data_file):
+                        match = PRIMITIVE_PATH.match(row['old_path'])
+                        if not match or not row['next_frame'].isdigit():
+                            continue
+                        parent_frame = row['parent_frame'].strip()
+                        if parent_frame == PARENT_FRAME_CHAIN and previous:
+                            parent_frame = previous["parent_frame"]
+                        else:
+                            parent_frame = int(parent_frame) if parent_frame.isdigit() else None
+                        previous = {
+                            "name": match.group('keyword').replace('_', ' '),
+                            "parent_frame": parent_frame,
+                            "next_frame": int(row['next_frame']),
+                            "real_heisig": int(row['real_heisig']) if row['real_heisig'].isdigit() else None,
+                        }
+                        primitives.append(previous)
+            break
+    return primitives
+
+
+def introduction_order(frame, primitive=False):
+    """
+    Position in the book at which something is introduced. A primitive
+    listed with next_frame N comes right before kanji N.
+    """
+    return frame * 2 if primitive else frame * 2 + 1
+
+
+def resolve_components(docs, primitives):
+    """
+    Map every component name to (kanji id or None, introduction order or None).
+    A name can match a kanji keyword and several primitive frames; the
+    earliest introduction wins, since that is when a learner first knows it.
+    """
+    ids_by_frame = {}
+    definitions = {}
+
+    def define(name, kanji_id, order):
+        key = component_key(name)
+        current = definitions.get(key)
+        if current is None or (order is not None and (current[1] is None or order < current[1])):
+            definitions[key] = (kanji_id, order)
+
+    for kanji_id, record in docs:
+        frame = frame_number(record)
+        if frame is not None:
+            ids_by_frame.setdefault(frame, kanji_id)
+        order = introduction_order(frame) if frame is not None else None
+        for keyword in record.get("keywords", [record["keyword"]]):
+            define(keyword, kanji_id, order)
+
+    for primitive in primitives:
+        stands_for = primitive["real_heisig"] or primitive["parent_frame"]
+        define(primitive["name"], ids_by_frame.get(stands_for),
+               introduction_order(primitive["next_frame"], primitive=True))
+
+    return definitions
+
+
+def transitive_closures(uses, resolves):
+    """
+    For every kanji, all components reachable through components that are
+    kanji themselves. `uses` maps kanji id -> direct component indices and
+    `resolves` maps component index -> kanji id (or None). Cycles are safe.
+    """
+    closures = {}
+    for kanji_id in uses:
+        reached = set()
+        seen = {kanji_id}
+        stack = [kanji_id]
+        while stack:
+            for component in uses.get(stack.pop(), ()):
+                reached.add(component)
+                target = resolves[component]
+                if target is not None and target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        closures[kanji_id] = sorted(reached)
+    return closures
+
+
+def invert(adjacency, size):
+    """Reverse kanji id -> component indices into component -> sorted kanji ids."""
+    reverse = [[] for _ in range(size)]
+    for kanji_id in sorted(adjacency):
+        for component in adjacency[kanji_id]:
+            reverse[component].append(kanji_id)
+    return reverse
+
+
+def find_order_violations(docs, definitions, lessons):
+    """
+    Report every kanji that uses a component before the book introduces it.
+    One pass over the kanji and their component lists, so linear in the
+    size of the graph. Returns (violations, unplaced component names).
+    """
+    max_frame = max((last_frame for _, last_frame in lessons), default=0)
+    lesson_of = [None] * (max_frame + 1)
+    first_frame = 1
+    for lesson_id, last_frame in lessons:
+        for frame in range(first_frame, last_frame + 1):
+            lesson_of[frame] = lesson_id
+        first_frame = last_frame + 1
+
+    def lesson_for(frame):
+        return lesson_of[frame] if frame is not None and frame < len(lesson_of) else None
+
+    violations = []
+    unplaced = set()
+    for kanji_id, record in docs:
+        frame = frame_number(record)
+        if frame is None:
+            continue
+        order = introduction_order(frame)
+        for name in dict.fromkeys(record["primitives"]):
+            component_id, introduced = definitions.get(component_key(name), (None, None))
+            if introduced is None:
+                unplaced.add(name)
+                continue
+            if introduced <= order or component_id == kanji_id:
+                continue
+            introduced_frame = introduced // 2
+            violations.append({
+                "kanji": record["kanji"],
+                "frame": frame,
+                "lesson": lesson_for(frame),
+                "component": name,
+                "introducedFrame": introduced_frame,
+                "introducedLesson": lesson_for(introduced_frame),
+            })
+    return violations, sorted(unplaced)
+
+
+def build_component_graph(docs, primitives):
+    """
+    Build the component graph from (kanji_id, record) pairs.
+
+    `uses`, `closure` and `usedBy`/`closureUsedBy` are delta-encoded sorted
+    lists: component indices per kanji (indexed by kanji id - 1) and kanji
+    ids per component (parallel to `components`).
+    """
+    definitions = resolve_components(docs, primitives)
+
+    components = sorted({name for _, record in docs for name in record["primitives"]})
+    component_index = {name: i for i, name in enumerate(components)}
+    resolves = [definitions.get(component_key(name), (None, None))[0] for name in components]
+    introduced = [definitions.get(component_key(name), (None, None))[1] for name in components]
+
+    uses = {kanji_id: sorted({component_index[name] for name in record["primitives"]})
+            for kanji_id, record in docs}
+    closures = transitive_closures(uses, resolves)
+    max_id = max(uses, default=0)
+
+    return {
+        "version": COMPONENT_GRAPH_VERSION,
+        "components": components,
+        "resolves": [kanji_id or 0 for kanji_id in resolves],
+        "introducedFrame": [order // 2 if order is not None else 0 for order in introduced],
+        "uses": [delta_encode(uses.get(i, [])) for i in range(1, max_id + 1)],
+        "usedBy": [delta_encode(ids) for ids in invert(uses, len(components))],
+        "closure": [delta_encode(closures.get(i, [])) for i in range(1, max_id + 1)],
+        "closureUsedBy": [delta_encode(ids) for ids in invert(closures, len(components))],
+    }, definitions
+
+
+def write_component_graph(docs, lessons_zip, path=COMPONENT_GRAPH_FILE):
+    """
+    Build the graph, write it as minified JSON and check lesson order.
+    Returns (graph, violations, unplaced component names).
+    """
+    primitives = load_primitive_frames(lessons_zip)
+    graph, definitions = build_component_graph(docs, primitives)
+    violations, unplaced = find_order_violations(docs, definitions,
+                                                 load_lesson_boundaries(lessons_zip))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_path.replace(path)
+    return graph, violations, unplaced
+
+
+def print_order_report(violations, unplaced, limit=20):
+    """Print a short summary of components used before their introduction."""
+    across = [v for v in violations if v["lesson"] != v["introducedLesson"]]
+    print(f"🧩 {len(violations)} components used before they are introduced "
+          f"({len(across)} across lessons), {len(unplaced)} component names without a frame")
+    for v in across[:limit]:
+        print(f"  ⚠️  {v['kanji']} (#{v['frame']}, lesson {v['lesson']}) uses '{v['component']}', "
+              f"introduced at #{v['introducedFrame']} (lesson {v['introducedLesson']})")
+    if len(across) > limit:
+        print(f"  ... and {len(across) - limit} more")
+
+
+def main():
+    """Main execution function."""
+    from extract_kanji_data import iter_index_records
+
+    parser = argparse.ArgumentParser(description="Build the component graph and check lesson order.")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="number of lesson-order violations to list (default: 20)")
+    parser.add_argument("--report", type=Path, metavar="PATH",
+                        help="also write every violation to this JSON file")
+    args = parser.parse_args()
+
+    zip_files = [
+        Path("heisig-rtk-index.zip"),
+        Path("heisig-rtk-index-4.zip")
+    ]
+    docs = list(enumerate(iter_index_records(zip_files), start=1))
+
+    graph, violations, unplaced = write_component_graph(docs, zip_files[1])
+    print(f"✅ Wrote {len(graph['components'])} components to {COMPONENT_GRAPH_FILE}")
+    print_order_report(violations, unplaced, args.limit)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"violations": violations, "unplaced": unplaced}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"📁 Report saved to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
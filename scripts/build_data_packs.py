@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Split kanji.json into per-lesson data packs.
+Uses LESSONS.csv from the Heisig RTK Index ZIP to cut the frame range into
+lessons, writes one minified, content-hashed shard per lesson and a small
+manifest the client uses to fetch only the shards it needs. Compression is
+left to the server, which negotiates it per request.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import zipfile
+from pathlib import Path
+
+from build_manifest import BuildManifest, fingerprint_file, fingerprint_zip_members, load_json_file
+
+PACKS_DIR = Path("public/data/lessons")
+LESSONS_MEMBER = "LESSONS.csv"
+
+# Frames past the last lesson (RTK 3 and supplements) are cut into
+# shards of roughly this many frames
+SUPPLEMENT_SHARD_FRAMES = 100
+
+
+def load_lesson_boundaries(zip_path):
+    """Return [(lesson_id, last_frame), ...] from LESSONS.csv, sorted by frame."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for file_name in zip_ref.namelist():
+            if file_name.endswith(LESSONS_MEMBER):
+                with zip_ref.open(file_name) as raw_file:
+                    with io.TextIOWrapper(raw_file, encoding='utf-8', newline='') as data_file:
+                        lessons = [(int(row['lesson_id']), int(row['last_frame']))
+                                   for row in csv.DictReader(data_file)]
+                return sorted(lessons, key=lambda lesson: lesson[1])
+    return []
+
+
+def frame_number(entry):
+    """Numeric Heisig frame of an entry, or None if it has none."""
+    num_str = entry['heisig_number'].split('-')[-1]
+    return int(num_str) if num_str.isdigit() else None
+
+
+def plan_shards(kanji_list, lessons):
+    """
+    Group entries into shards: one per lesson, then fixed-size supplement
+    shards for frames past the last lesson. Returns a list of
+    (name, lesson_id, first_frame, last_frame, entries).
+    """
+    shards = []
+    first_frame = 1
+    for lesson_id, last_frame in lessons:
+        shards.append([f"lesson-{lesson_id:02d}", lesson_id, first_frame, last_frame, []])
+        first_frame = last_frame + 1
+
+    max_frame = max((frame_number(e) or 0 for e in kanji_list), default=0)
+    while first_frame <= max_frame:
+        last_frame = first_frame + SUPPLEMENT_SHARD_FRAMES - 1
+        shards.append([f"frames-{first_frame:04d}-{last_frame:04d}", None, first_frame, last_frame, []])
+        first_frame = last_frame + 1
+
+    unnumbered = []
+    for entry in kanji_list:
+        frame = frame_number(entry)
+        if frame is None or not shards:
+            unnumbered.append(entry)
+            continue
+        # Shards are contiguous, so the index can be found by bisection
+        lo, hi = 0, len(shards) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if shards[mid][3] < frame:
+                lo = mid + 1
+            else:
+                hi = mid
+        shards[lo][4].append(entry)
+
+    if unnumbered:
+        shards.append(["unnumbered", None, None, None, unnumbered])
+
+    return [tuple(shard) for shard in shards if shard[4]]
+
+
+def id_runs(shard_of_id):
+    """
+    Run-length encode an {id: shard index} map as [[first id, shard index], ...]
+    sorted by id; each run lasts until the next one starts and -1 marks ids
+    that are in no shard. Ids follow the index order, not frame order, so a
+    shard's ids are not one contiguous range.
+    """
+    runs = []
+    for kanji_id in range(1, max(shard_of_id, default=0) + 1):
+        shard = shard_of_id.get(kanji_id, -1)
+        if not runs or runs[-1][1] != shard:
+            runs.append([kanji_id, shard])
+    return runs
+
+
+def build_data_packs(kanji_path, lessons_zip, packs_dir=PACKS_DIR, manifest=None):
+    """
+    Write per-lesson shards and manifest.json into `packs_dir`. The
+    manifest's `idRuns` (see id_runs) map every kanji id to its shard.
+    Returns the manifest dict, or None if the build manifest says the packs
+    are already up to date.
+    """
+    inputs = {
+        "kanji": fingerprint_file(kanji_path),
+        "lessons": fingerprint_zip_members([lessons_zip]),
+    }
+    if manifest is not None and manifest.is_fresh("packs", inputs) \
+            and (packs_dir / "manifest.json").exists():
+        print("✨ Data packs are up to date")
+        return None
+
+    _, kanji_list = load_json_file(kanji_path)
+
+    lessons = load_lesson_boundaries(lessons_zip)
+    packs_dir.mkdir(parents=True, exist_ok=True)
+
+    shard_records = []
+    shard_of_id = {}
+    written = set()
+    for name, lesson_id, first_frame, last_frame, entries in plan_shards(kanji_list, lessons):
+        data = json.dumps(entries, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        file_name = f"{name}.{digest[:10]}.json"
+        path = packs_dir / file_name
+        if not path.exists():
+            path.write_bytes(data)
+        written.add(file_name)
+
+        for entry in entries:
+            shard_of_id[entry['id']] = len(shard_records)
+        shard_records.append({
+            "name": name,
+            "lesson": lesson_id,
+            "firstFrame": first_frame,
+            "lastFrame": last_frame,
+            "count": len(entries),
+            "url": f"/data/lessons/{file_name}",
+            "bytes": len(data),
+            "sha256": digest,
+        })
+
+    pack_manifest = {"version": 2, "total": len(kanji_list), "shards": shard_records,
+                     "idRuns": id_runs(shard_of_id)}
+    with open(packs_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(pack_manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    # Remove shards (and the old .gz/.br variants) left over from earlier builds
+    for path in packs_dir.glob("*.json*"):
+        if path.name != "manifest.json" and path.name not in written:
+            path.unlink()
+
+    if manifest is not None:
+        manifest.record("packs", inputs)
+        manifest.save()
+
+    return pack_manifest
+
+
+def main():
+    """Main execution function."""
+    kanji_file = Path("public/data/kanji.json")
+    lessons_zip = Path("heisig-rtk-index-4.zip")
+
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        return
+
+    print("📦 Building per-lesson data packs...")
+    pack_manifest = build_data_packs(kanji_file, lessons_zip, manifest=BuildManifest())
+    if pack_manifest:
+        total_bytes = sum(shard["bytes"] for shard in pack_manifest["shards"])
+        print(f"✅ Wrote {len(pack_manifest['shards'])} shards ({total_bytes / 1024:.0f} KB) to {PACKS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Build manifest for incremental data rebuilds.
+Records fingerprints of every pipeline input and output so stages whose
+inputs have not changed can be skipped on the next run.
+"""
+
+import hashlib
+import json
+import zipfile
+from pathlib import Path
+
+BUILD_MANIFEST_FILE = Path("scripts/.build_manifest.json")
+MANIFEST_VERSION = 1
+
+
+def fingerprint_zip_members(zip_paths):
+    """
+    Fingerprint every member of the given ZIP files.
+    Uses the CRC-32 and size stored in the central directory, so no member
+    is decompressed and the check takes milliseconds.
+    """
+    fingerprints = {}
+    for zip_path in zip_paths:
+        zip_path = Path(zip_path)
+        if not zip_path.exists():
+            continue
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    continue
+                fingerprints[f"{zip_path.name}:{info.filename}"] = f"{info.CRC:08x}:{info.file_size}"
+    return fingerprints
+
+
+def fingerprint_file(path):
+    """Cheap fingerprint of an output file (size and mtime), or None if missing."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# JSON files already parsed in this process: resolved path -> (fingerprint, bytes, value)
+_loaded_json = {}
+
+
+def load_json_file(path):
+    """
+    Return (raw bytes, parsed value) of a JSON file, parsed at most once per
+    process for as long as its fingerprint stays the same. Stages chained
+    in one `python -m scripts` run share kanji.json this way, so callers
+    must treat the value as read-only.
+    """
+    path = Path(path)
+    key = path.resolve()
+    fingerprint = fingerprint_file(path)
+    cached = _loaded_json.get(key)
+    if cached is None or cached[0] != fingerprint:
+        data = path.read_bytes()
+        cached = _loaded_json[key] = (fingerprint, data, json.loads(data))
+    return cached[1], cached[2]
+
+
+def remember_json_file(path, data, value):
+    """Tell load_json_file that `path` was just written with `data`, which parses to `value`."""
+    path = Path(path)
+    _loaded_json[path.resolve()] = (fingerprint_file(path), data, value)
+
+
+def record_hash(record):
+    """Stable content hash of one JSON-serializable record."""
+    data = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+class BuildManifest:
+    """
+    Per-stage record of input fingerprints and outputs from the last build.
+
+    Each stage entry holds the `inputs` it was built from plus any extra
+    state the stage wants to keep (for example which rows fell back to a
+    default value and must be retried).
+    """
+
+    def __init__(self, path=BUILD_MANIFEST_FILE):
+        self.path = Path(path)
+        self.stages = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.stages = data.get("stages", {})
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def get(self, stage):
+        """Return the recorded state of a stage (empty dict if never built)."""
+        return self.stages.get(stage, {})
+
+    def is_fresh(self, stage, inputs):
+        """True if the stage was last built from exactly these inputs."""
+        recorded = self.stages.get(stage)
+        return recorded is not None and recorded.get("inputs") == inputs
+
+    def record(self, stage, inputs, **state):
+        """Record a successful stage build."""
+        self.stages[stage] = {"inputs": inputs, **state}
+
+    def invalidate(self, stage):
+        """Forget a stage so it is rebuilt next time."""
+        self.stages.pop(stage, None)
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "stages": self.stages}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        tmp_path.replace(self.path)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Stage timers and counters for the data scripts.
+A BuildMetrics collector is threaded through the pipeline; with --profile
+its contents are written as a JSON report and a one-screen summary,
+optionally together with cProfile and tracemalloc captures.
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_REPORT_FILE = Path("scripts/build-profile.json")
+REPORT_VERSION = 1
+
+# Upper bounds (ms) of the HTTP latency histogram buckets
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class BuildMetrics:
+    """
+    Thread-safe collector of stage timings, counters and latency samples.
+
+    `stage()` times sequential top-level stages (wall clock). `timer()`
+    sums the time of an operation that may run on many worker threads at
+    once, so its total can exceed the wall time of the stage around it.
+    Collecting is cheap enough to stay on when no report is requested.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.timers = {}
+        self.counters = {}
+        self.bytes_written = {}
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def _add_time(self, table, name, seconds):
+        with self._lock:
+            entry = table.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Time one top-level pipeline stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_time(self.stages, name, time.perf_counter() - start)
+
+    @contextmanager
+    def timer(self, name):
+        """Time one occurrence of an operation (summed across threads)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_time(self.timers, name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        """Increase a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe_latency(self, name, seconds):
+        """Record one latency sample (e.g. an HTTP request)."""
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+
+    def wrote(self, label, path_or_bytes):
+        """Record bytes written for an output (a path or a byte count)."""
+        if isinstance(path_or_bytes, int):
+            size = path_or_bytes
+        else:
+            try:
+                size = Path(path_or_bytes).stat().st_size
+            except FileNotFoundError:
+                return
+        with self._lock:
+            self.bytes_written[label] = self.bytes_written.get(label, 0) + size
+
+    def latency_summary(self, name):
+        """Count, mean, percentiles and histogram (ms) for one latency series."""
+        samples_ms = sorted(s * 1000 for s in self.latencies.get(name, []))
+        histogram = {}
+        lower = 0
+        index = 0
+        for upper in LATENCY_BUCKETS_MS + [None]:
+            count = 0
+            while index < len(samples_ms) and (upper is None or samples_ms[index] <= upper):
+                count += 1
+                index += 1
+            histogram[f"{lower}-{upper}" if upper is not None else f">{lower}"] = count
+            lower = upper
+        return {
+            "count": len(samples_ms),
+            "mean_ms": round(sum(samples_ms) / len(samples_ms), 2) if samples_ms else None,
+            "p50_ms": round(percentile(samples_ms, 0.50), 2) if samples_ms else None,
+            "p95_ms": round(percentile(samples_ms, 0.95), 2) if samples_ms else None,
+            "p99_ms": round(percentile(samples_ms, 0.99), 2) if samples_ms else None,
+            "max_ms": round(samples_ms[-1], 2) if samples_ms else None,
+            "histogram_ms": histogram,
+        }
+
+    def to_dict(self):
+        """Machine-readable snapshot of everything collected."""
+        def rounded(table):
+            return {name: {"seconds": round(entry["seconds"], 4), "calls": entry["calls"]}
+                    for name, entry in table.items()}
+
+        with self._lock:
+            return {
+                "wall_seconds": round(time.perf_counter() - self.started, 4),
+                "stages": rounded(self.stages),
+                "timers": rounded(self.timers),
+                "counters": dict(self.counters),
+                "bytes_written": dict(self.bytes_written),
+                "latency": {name: self.latency_summary(name) for name in self.latencies},
+            }
+
+
+def format_bytes(size):
+    """Human-readable byte count."""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def print_summary(report):
+    """Print a one-screen summary of a profile report."""
+    wall = report["wall_seconds"] or 1e-9
+    print(f"\n📈 Profile of {report['script']} ({report['wall_seconds']:.2f}s)")
+    for name, entry in report["stages"].items():
+        print(f"  {name:<20} {entry['seconds']:8.3f}s  {entry['seconds'] / wall:6.1%}")
+    if report["timers"]:
+        print("  summed over workers:")
+        for name, entry in report["timers"].items():
+            print(f"    {name:<18} {entry['seconds']:8.3f}s  ({entry['calls']} calls)")
+    if report["counters"]:
+        print("  " + ", ".join(f"{name}={value}" for name, value in sorted(report["counters"].items())))
+    for name, latency in report["latency"].items():
+        print(f"  {name} latency: n={latency['count']} p50={latency['p50_ms']}ms "
+              f"p95={latency['p95_ms']}ms p99={latency['p99_ms']}ms max={latency['max_ms']}ms")
+        buckets = [(label, count) for label, count in latency["histogram_ms"].items() if count]
+        print("    " + "  ".join(f"{label}ms:{count}" for label, count in buckets))
+    if report["bytes_written"]:
+        print("  wrote " + ", ".join(f"{label} {format_bytes(size)}"
+                                     for label, size in report["bytes_written"].items()))
+    if "tracemalloc" in report:
+        print(f"  peak traced memory {format_bytes(report['tracemalloc']['peak_bytes'])}")
+    if "cprofile" in report:
+        print(f"  cProfile stats: {report['cprofile']['stats_file']}")
+        for line in report["cprofile"]["top"][:5]:
+            print(f"    {line}")
+
+
+def add_profile_arguments(parser):
+    """Add the --profile family of options to a script's argument parser."""
+    parser.add_argument("--profile", action="store_true",
+                        help=f"write stage timings and counters to {PROFILE_REPORT_FILE}")
+    parser.add_argument("--profile-output", type=Path, default=PROFILE_REPORT_FILE, metavar="PATH",
+                        help="where --profile writes its JSON report")
+    parser.add_argument("--profile-cpu", action="store_true",
+                        help="also capture cProfile stats of the main thread (implies --profile)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="also trace allocations with tracemalloc (implies --profile)")
+
+
+@contextmanager
+def profile_session(args, script_name):
+    """
+    Yield a BuildMetrics for one script run. When profiling was requested,
+    write the JSON report and print the summary once the run finishes.
+    """
+    metrics = BuildMetrics()
+    enabled = args.profile or args.profile_cpu or args.profile_memory
+    # The profilers are only imported when asked for; they add to every startup
+    profiler = None
+    if args.profile_cpu:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.profile_memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+        if enabled:
+            import platform
+            report = {"version": REPORT_VERSION, "script": script_name,
+                      "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      "python": platform.python_version(), "argv": sys.argv[1:],
+                      **metrics.to_dict()}
+            if args.profile_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+                tracemalloc.stop()
+                report["tracemalloc"] = {
+                    "peak_bytes": peak,
+                    "top": [f"{stat.traceback} {format_bytes(stat.size)} ({stat.count} blocks)"
+                            for stat in top],
+                }
+            if profiler:
+                stats_file = args.profile_output.with_suffix(".prof")
+                stats_file.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(stats_file)
+                import pstats
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+                top = [line.strip() for line in stream.getvalue().splitlines()
+                       if line.strip()[:1].isdigit() and "function calls" not in line]
+                report["cprofile"] = {"stats_file": str(stats_file), "top": top}
+
+            args.profile_output.parent.mkdir(parents=True, exist_ok=True)
+            with open(args.profile_output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print_summary(report)
+            print(f"📁 Profile saved to: {args.profile_output}")
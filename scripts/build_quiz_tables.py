@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Build the quiz lookup tables from kanji.json.
+For every kanji a short ranked list of multiple-choice distractors is
+precomputed from five signals: similar stroke count, shared primitives,
+similar keywords, the same lesson and, when build_stroke_features.py has
+written its neighbor table, a visually similar shape. Per-lesson id arrays are emitted
+too, so the quiz samples from small precomputed arrays instead of
+filtering all of kanji.json on every session.
+"""
+
+import hashlib
+import json
+import math
+import re
+from pathlib import Path
+
+from build_data_packs import load_lesson_boundaries, plan_shards
+from build_manifest import BuildManifest, fingerprint_file, fingerprint_zip_members, load_json_file
+from build_search_index import delta_encode
+
+QUIZ_TABLES_FILE = Path("public/data/quiz-tables.json")
+QUIZ_TABLES_VERSION = 2
+MAX_DISTRACTORS = 6
+# Stroke counts within this many strokes are in the same band
+STROKE_BAND = 1
+
+# Reason bits stored in the low bits of each distractor entry
+REASON_STROKES = 1
+REASON_PRIMITIVES = 2
+REASON_KEYWORD = 4
+REASON_LESSON = 8
+REASON_SHAPE = 16
+REASON_BITS = 5
+
+# Score of each signal; shared primitives are further weighted by rarity
+PRIMITIVE_WEIGHT = 4.0
+KEYWORD_WEIGHT = 2.0
+STROKES_WEIGHT = 1.0
+LESSON_WEIGHT = 1.0
+# Given to the closest visual neighbor, falling off linearly down the list
+SHAPE_WEIGHT = 3.0
+
+KEYWORD_WORD = re.compile(r"[a-z]+")
+KEYWORD_STOPWORDS = {"a", "an", "and", "as", "at", "by", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+
+def keyword_keys(keyword):
+    """Words of a keyword plus their 4-letter stems ('sunshine' ~ 'sun', 'sunset')."""
+    keys = set()
+    for word in KEYWORD_WORD.findall(keyword.lower()):
+        if word in KEYWORD_STOPWORDS or len(word) < 3:
+            continue
+        keys.add(word)
+        if len(word) >= 4:
+            keys.add("~" + word[:4])
+    return keys
+
+
+def build_reverse_index(keys_by_id):
+    """Map key -> sorted ids from id -> iterable of keys."""
+    reverse = {}
+    for kanji_id in sorted(keys_by_id):
+        for key in keys_by_id[kanji_id]:
+            reverse.setdefault(key, []).append(kanji_id)
+    return reverse
+
+
+def rank_distractors(kanji_list, bucket_of, limit=MAX_DISTRACTORS, similar=None):
+    """
+    Rank distractor candidates for every kanji.
+
+    Candidates come from the reverse indexes (shared primitive, keyword
+    word or stem, same bucket) and from `similar`, {id: [visually closest
+    ids, closest first]}, so only related pairs are ever scored.
+    Rare primitives count for more than common ones. Kanji with fewer
+    than `limit` related candidates are topped up with the nearest ids in
+    the same stroke band. Returns {id: [(candidate id, reason bits), ...]}.
+    """
+    by_id = {entry['id']: entry for entry in kanji_list}
+    # A kanji's own keyword counts as a primitive, so 品 and 口 share 'mouth'
+    primitives = {kanji_id: {name.casefold() for name in entry['primitives'] + [entry['keyword']]}
+                  for kanji_id, entry in by_id.items()}
+    keywords = {kanji_id: keyword_keys(entry['keyword']) for kanji_id, entry in by_id.items()}
+    # Unknown stroke counts (0) are never in anyone's band
+    strokes = {kanji_id: entry.get('strokeCount') or 0 for kanji_id, entry in by_id.items()}
+
+    users = build_reverse_index(primitives)
+    keyword_users = build_reverse_index(keywords)
+    bucket_members = build_reverse_index({kanji_id: [bucket_of[kanji_id]] for kanji_id in by_id})
+    stroke_members = build_reverse_index({kanji_id: [strokes[kanji_id]] for kanji_id in by_id})
+    rarity = {name: 1.0 / math.log2(1 + len(ids)) for name, ids in users.items()}
+
+    distractors = {}
+    for kanji_id in sorted(by_id):
+        scores = {}
+        reasons = {}
+
+        def add(candidate, weight, reason):
+            if candidate != kanji_id:
+                scores[candidate] = scores.get(candidate, 0.0) + weight
+                reasons[candidate] = reasons.get(candidate, 0) | reason
+
+        for name in primitives[kanji_id]:
+            for candidate in users[name]:
+                add(candidate, PRIMITIVE_WEIGHT * rarity[name], REASON_PRIMITIVES)
+        for key in keywords[kanji_id]:
+            for candidate in keyword_users[key]:
+                if not reasons.get(candidate, 0) & REASON_KEYWORD:
+                    add(candidate, KEYWORD_WEIGHT, REASON_KEYWORD)
+        for candidate in bucket_members[bucket_of[kanji_id]]:
+            add(candidate, LESSON_WEIGHT, REASON_LESSON)
+        neighbors = [c for c in (similar or {}).get(kanji_id, ()) if c in by_id]
+        for rank, candidate in enumerate(neighbors):
+            add(candidate, SHAPE_WEIGHT * (1 - rank / len(neighbors)), REASON_SHAPE)
+        for candidate in scores:
+            if strokes[kanji_id] and strokes[candidate] \
+                    and abs(strokes[candidate] - strokes[kanji_id]) <= STROKE_BAND:
+                scores[candidate] += STROKES_WEIGHT
+                reasons[candidate] |= REASON_STROKES
+
+        ranked = sorted(scores, key=lambda c: (-scores[c], abs(c - kanji_id), c))[:limit]
+        if len(ranked) < limit and strokes[kanji_id]:
+            band = [c for count in range(strokes[kanji_id] - STROKE_BAND,
+                                         strokes[kanji_id] + STROKE_BAND + 1)
+                    if count > 0 for c in stroke_members.get(count, ())
+                    if c != kanji_id and c not in scores]
+            band.sort(key=lambda c: (abs(c - kanji_id), c))
+            for candidate in band[:limit - len(ranked)]:
+                ranked.append(candidate)
+                reasons[candidate] = REASON_STROKES
+        distractors[kanji_id] = [(candidate, reasons[candidate]) for candidate in ranked]
+    return distractors
+
+
+def load_similar_kanji(similar_path, kanji_hash):
+    """
+    Read the neighbor table written by build_stroke_features.py as
+    {id: [neighbor ids]}. Returns None if it is missing or was built from
+    a different kanji.json.
+    """
+    if similar_path is None or not Path(similar_path).exists():
+        return None
+    similar = load_json_file(similar_path)[1]
+    if similar.get("kanji") != kanji_hash:
+        print(f"  ⚠️  {similar_path} is from another kanji.json, skipping visual similarity")
+        return None
+    return {kanji_id: ids for kanji_id, ids in enumerate(similar["neighbors"], start=1) if ids}
+
+
+def build_quiz_tables(kanji_path, lessons_zip, path=QUIZ_TABLES_FILE, manifest=None,
+                      limit=MAX_DISTRACTORS, similar_path=None):
+    """
+    Write the quiz tables for `kanji_path` as minified JSON.
+
+    `buckets` follow the data packs (one per lesson, then supplements) and
+    hold delta-encoded ids. `distractors[id - 1]` lists candidates, best
+    first, each packed as (candidate id << 5) | reason bits. `kanji` is a
+    hash of the kanji.json the tables were built from. Visual neighbors
+    are read from `similar_path` (see build_stroke_features.py) if given.
+    Returns the tables, or None if the build manifest says they are current.
+    """
+    inputs = {
+        "kanji": fingerprint_file(kanji_path),
+        "lessons": fingerprint_zip_members([lessons_zip]),
+        "similar": fingerprint_file(similar_path) if similar_path else None,
+        "limit": limit,
+    }
+    if manifest is not None and manifest.is_fresh("quiz", inputs) and path.exists():
+        print("✨ Quiz tables are up to date")
+        return None
+
+    data, kanji_list = load_json_file(kanji_path)
+    kanji_hash = hashlib.sha256(data).hexdigest()[:16]
+
+    buckets = []
+    bucket_of = {}
+    for name, lesson_id, first_frame, last_frame, entries in \
+            plan_shards(kanji_list, load_lesson_boundaries(lessons_zip)):
+        ids = sorted(entry['id'] for entry in entries)
+        for kanji_id in ids:
+            bucket_of[kanji_id] = len(buckets)
+        buckets.append({"name": name, "lesson": lesson_id, "ids": delta_encode(ids)})
+
+    similar = load_similar_kanji(similar_path, kanji_hash)
+    distractors = rank_distractors(kanji_list, bucket_of, limit, similar)
+    max_id = max(distractors, default=0)
+    tables = {
+        "version": QUIZ_TABLES_VERSION,
+        "kanji": kanji_hash,
+        "reasons": {"strokes": REASON_STROKES, "primitives": REASON_PRIMITIVES,
+                    "keyword": REASON_KEYWORD, "lesson": REASON_LESSON, "shape": REASON_SHAPE},
+        "buckets": buckets,
+        "distractors": [[(candidate << REASON_BITS) | reasons
+                         for candidate, reasons in distractors.get(kanji_id, [])]
+                        for kanji_id in range(1, max_id + 1)],
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(tables, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_path.replace(path)
+
+    if manifest is not None:
+        manifest.record("quiz", inputs)
+        manifest.save()
+
+    return tables
+
+
+def main():
+    """Main execution function."""
+    kanji_file = Path("public/data/kanji.json")
+    lessons_zip = Path("heisig-rtk-index-4.zip")
+
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        return
+
+    from build_stroke_features import SIMILAR_KANJI_FILE
+
+    print("🎯 Building quiz tables...")
+    tables = build_quiz_tables(kanji_file, lessons_zip, manifest=BuildManifest(),
+                               similar_path=SIMILAR_KANJI_FILE)
+    if tables:
+        print(f"✅ Wrote distractors for {len(tables['distractors'])} kanji and "
+              f"{len(tables['buckets'])} lesson buckets to {QUIZ_TABLES_FILE} "
+              f"({QUIZ_TABLES_FILE.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Build a compact inverted search index over the kanji index fields.
+Tokens come from the character, Heisig frame, 5th/6th edition keywords,
+on/kun readings and components. Terms are stored sorted so the client can
+answer prefix queries with a binary search, and every posting list holds
+delta-encoded kanji ids.
+"""
+
+import json
+import re
+from pathlib import Path
+
+SEARCH_INDEX_FILE = Path("public/data/search-index.json")
+SEARCH_INDEX_VERSION = 1
+
+# Katakana -> hiragana, so "イチ" and "いち" are the same reading
+KATAKANA = "".join(chr(c) for c in range(0x30A1, 0x30F7))
+HIRAGANA = "".join(chr(c - 0x60) for c in range(0x30A1, 0x30F7))
+KANA_TABLE = str.maketrans(KATAKANA, HIRAGANA)
+
+# Okurigana and prefix/suffix markers in KANJIDIC-style readings
+READING_MARKERS = "-.・"
+READING_STRIP_TABLE = str.maketrans("", "", READING_MARKERS)
+
+WORD_SPLIT = re.compile(r"[\s/,;()\[\]\"]+")
+WORD_EDGE_PUNCTUATION = "-'.!?:"
+
+
+def normalize_reading(reading):
+    """Normalize a reading: katakana to hiragana, drop okurigana markers."""
+    return reading.translate(KANA_TABLE).translate(READING_STRIP_TABLE).strip()
+
+
+def keyword_tokens(text):
+    """Lowercased words of a keyword or component name."""
+    words = (word.strip(WORD_EDGE_PUNCTUATION) for word in WORD_SPLIT.split(text.lower()))
+    return [word for word in words if word]
+
+
+def record_tokens(record):
+    """Every search token for one index record."""
+    tokens = {record["kanji"]}
+    if record["heisig_number"]:
+        tokens.add(record["heisig_number"])
+    for keyword in record.get("keywords", [record["keyword"]]):
+        tokens.update(keyword_tokens(keyword))
+    for reading in record.get("on_reading", []) + record.get("kun_reading", []):
+        normalized = normalize_reading(reading)
+        if normalized:
+            tokens.add(normalized)
+    for component in record["primitives"]:
+        tokens.update(keyword_tokens(component))
+    return tokens
+
+
+def delta_encode(ids):
+    """Encode a sorted id list as its first id followed by gaps."""
+    encoded = []
+    previous = 0
+    for kanji_id in ids:
+        encoded.append(kanji_id - previous)
+        previous = kanji_id
+    return encoded
+
+
+def build_search_index(docs):
+    """
+    Build the index from (kanji_id, record) pairs.
+    Returns a dict with sorted `terms` and matching delta-encoded `postings`.
+    """
+    postings = {}
+    for kanji_id, record in docs:
+        for token in record_tokens(record):
+            postings.setdefault(token, set()).add(kanji_id)
+
+    terms = sorted(postings)
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "normalize": {"from": KATAKANA, "to": HIRAGANA, "strip": READING_MARKERS},
+        "terms": terms,
+        "postings": [delta_encode(sorted(postings[term])) for term in terms],
+    }
+
+
+def write_search_index(docs, path=SEARCH_INDEX_FILE):
+    """Build the index and write it as minified JSON. Returns the index."""
+    index = build_search_index(docs)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_path.replace(path)
+    return index
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Build self-hosted stroke-order bundles for the KanjiCard animation.
+Each KanjiVG SVG is stripped down to its stroke paths and stroke-number
+positions, then packed into one content-hashed bundle per lesson. A
+manifest maps every character to (bundle, byte offset, byte length), so
+the client can slice a single record out of a cached bundle.
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+from build_data_packs import load_lesson_boundaries, plan_shards
+from build_manifest import BuildManifest, fingerprint_file, fingerprint_zip_members, load_json_file
+from kanjivg_svg import KANJIVG_BASE_URL
+from stroke_cache import StrokeCountCache
+
+STROKE_BUNDLE_DIR = Path("public/data/strokes")
+
+
+def encode_strokes(strokes):
+    """Compact UTF-8 JSON record for one character's strokes."""
+    return json.dumps(strokes, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def collect_strokes(kanji_chars, cache, kanjivg_archive=None, max_workers=8, rate=10.0,
+                    base_url=KANJIVG_BASE_URL):
+    """
+    Make sure stripped strokes are cached for every character. Only
+    characters without cached strokes are looked up, so after an
+    extraction (which keeps the strokes it downloads) this is usually a no-op.
+    """
+    missing = [kanji_char for kanji_char in kanji_chars if not cache.has_strokes(kanji_char)]
+    if not missing:
+        return
+    if kanjivg_archive:
+        from kanjivg_archive import load_stroke_counts_from_archive
+        print(f"📦 Reading stroke paths for {len(missing)} kanji from {kanjivg_archive}...")
+        load_stroke_counts_from_archive(kanjivg_archive, cache, set(missing), keep_strokes=True)
+    else:
+        from kanjivg_fetch import StrokeCountFetcher
+
+        def report_progress(done, total):
+            if done % 50 == 0 or done == total:
+                print(f"  ✓ Fetched {done}/{total} SVGs...")
+
+        with StrokeCountFetcher(cache, max_workers=max_workers, rate=rate,
+                                base_url=base_url, require_strokes=True) as fetcher:
+            fetcher.fetch_many(missing, progress=report_progress)
+    cache.commit()
+
+
+def build_stroke_bundles(kanji_path, lessons_zip, cache, bundle_dir=STROKE_BUNDLE_DIR,
+                         manifest=None):
+    """
+    Write per-lesson stroke bundles and manifest.json into `bundle_dir`.
+    Returns the bundle manifest, or None if it was already up to date.
+    """
+    inputs = {
+        "kanji": fingerprint_file(kanji_path),
+        "lessons": fingerprint_zip_members([lessons_zip]),
+        "strokes": cache.strokes_fingerprint(),
+    }
+    if manifest is not None and manifest.is_fresh("strokes", inputs) \
+            and (bundle_dir / "manifest.json").exists():
+        print("✨ Stroke bundles are up to date")
+        return None
+
+    _, kanji_list = load_json_file(kanji_path)
+
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    bundles = []
+    index = {}
+    missing = []
+    for name, lesson_id, first_frame, last_frame, entries in \
+            plan_shards(kanji_list, load_lesson_boundaries(lessons_zip)):
+        chunks = []
+        offset = 0
+        for entry in entries:
+            strokes = cache.get_strokes(entry['kanji'])
+            if strokes is None:
+                missing.append(entry['kanji'])
+                continue
+            record = encode_strokes(strokes)
+            index[entry['kanji']] = [len(bundles), offset, len(record)]
+            chunks.append(record)
+            offset += len(record)
+        if not chunks:
+            continue
+
+        data = b"".join(chunks)
+        digest = hashlib.sha256(data).hexdigest()
+        file_name = f"{name}.{digest[:10]}.bin"
+        (bundle_dir / file_name).write_bytes(data)
+        bundles.append({
+            "name": name,
+            "lesson": lesson_id,
+            "url": f"/data/strokes/{file_name}",
+            "bytes": len(data),
+            "sha256": digest,
+        })
+
+    bundle_manifest = {"version": 1, "bundles": bundles, "index": index}
+    with open(bundle_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(bundle_manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    # Remove bundles left over from earlier builds
+    current = {Path(bundle["url"]).name for bundle in bundles}
+    for path in bundle_dir.glob("*.bin"):
+        if path.name not in current:
+            path.unlink()
+
+    if missing:
+        print(f"  ⚠️  No stroke data for {len(missing)} kanji, they will load from KanjiVG")
+
+    if manifest is not None:
+        manifest.record("strokes", inputs)
+        manifest.save()
+
+    return bundle_manifest
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build self-hosted stroke-order bundles.")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="maximum concurrent KanjiVG requests (default: 8)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="maximum KanjiVG requests per second (default: 10)")
+    parser.add_argument("--kanjivg-archive", type=Path, metavar="PATH",
+                        help="read SVGs from a local KanjiVG release .zip/.tar.gz instead of the network")
+    args = parser.parse_args()
+
+    kanji_file = Path("public/data/kanji.json")
+    lessons_zip = Path("heisig-rtk-index-4.zip")
+
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        return
+
+    kanji_chars = [entry['kanji'] for entry in load_json_file(kanji_file)[1]]
+
+    print("✍️  Building stroke-order bundles...")
+    with StrokeCountCache() as cache:
+        collect_strokes(kanji_chars, cache, args.kanjivg_archive, args.workers, args.rate)
+        bundle_manifest = build_stroke_bundles(kanji_file, lessons_zip, cache,
+                                               manifest=BuildManifest())
+
+    if bundle_manifest:
+        total_bytes = sum(bundle["bytes"] for bundle in bundle_manifest["bundles"])
+        print(f"✅ Wrote {len(bundle_manifest['bundles'])} bundles "
+              f"({len(bundle_manifest['index'])} kanji, {total_bytes / 1024:.0f} KB) to {STROKE_BUNDLE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Build stroke-geometry features and visual nearest neighbors.
+The cached KanjiVG stroke paths of every kanji are parsed in a process
+pool into per-stroke direction, length and bounding boxes plus a low-res
+raster signature. The features are written as a fixed-width float32 .npy
+matrix (row = kanji id - 1) and the top-k most similar kanji of each
+character are precomputed with batched distance computation. The quiz
+tables use these neighbors as visually similar distractors.
+
+Requires NumPy.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # optional, only this stage needs it
+    np = None
+
+from build_manifest import BuildManifest, fingerprint_file, load_json_file
+from build_stroke_bundles import collect_strokes
+from stroke_cache import StrokeCountCache
+
+STROKE_FEATURES_FILE = Path("scripts/stroke_features.npy")
+# Read by build_quiz_tables.py, which folds it into quiz-tables.json, so it is not served itself
+SIMILAR_KANJI_FILE = Path("scripts/similar.json")
+SIMILAR_KANJI_VERSION = 2
+
+# KanjiVG draws on a 109x109 canvas
+CANVAS_SIZE = 109.0
+# Strokes beyond this are dropped from the per-stroke block
+MAX_STROKES = 30
+# Features per stroke: direction (dx, dy), length, bounding box (x0, y0, x1, y1)
+STROKE_FEATURES = 7
+RASTER_SIZE = 16
+# Points sampled along each path segment
+SEGMENT_SAMPLES = 8
+
+FEATURE_WIDTH = 1 + MAX_STROKES * STROKE_FEATURES + RASTER_SIZE * RASTER_SIZE
+STROKE_BLOCK = slice(1, 1 + MAX_STROKES * STROKE_FEATURES)
+RASTER_BLOCK = slice(1 + MAX_STROKES * STROKE_FEATURES, FEATURE_WIDTH)
+
+PATH_TOKEN = re.compile(r'[MmCcSsLlHhVvZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+# Number of arguments taken by each path command
+PATH_ARITY = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Z': 0}
+
+
+def cubic_points(p0, p1, p2, p3, samples=SEGMENT_SAMPLES):
+    """Points along a cubic Bezier segment, excluding the start point."""
+    points = []
+    for i in range(1, samples + 1):
+        t = i / samples
+        u = 1 - t
+        points.append((u * u * u * p0[0] + 3 * u * u * t * p1[0] + 3 * u * t * t * p2[0] + t * t * t * p3[0],
+                       u * u * u * p0[1] + 3 * u * u * t * p1[1] + 3 * u * t * t * p2[1] + t * t * t * p3[1]))
+    return points
+
+
+def path_points(d):
+    """
+    Sample an SVG path (the subset KanjiVG uses: M, L, H, V, C, S, Z and
+    their relative forms) into a polyline. Returns [(x, y), ...].
+    """
+    tokens = PATH_TOKEN.findall(d or '')
+    points = []
+    x = y = 0.0
+    start = (0.0, 0.0)
+    control = None
+    command = None
+    i = 0
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            command = tokens[i]
+            i += 1
+            if command in 'Zz':
+                x, y = start
+                points.append(start)
+                control = None
+                continue
+        if command is None:
+            break
+        arity = PATH_ARITY[command.upper()]
+        args = [float(value) for value in tokens[i:i + arity]]
+        if len(args) < arity:
+            break
+        i += arity
+        relative = command.islower()
+        if command in 'Mm':
+            x, y = (x + args[0], y + args[1]) if relative else (args[0], args[1])
+            start = (x, y)
+            points.append(start)
+            control = None
+            # Further coordinate pairs after a moveto are linetos
+            command = 'l' if relative else 'L'
+            continue
+        if command in 'Ll':
+            x, y = (x + args[0], y + args[1]) if relative else (args[0], args[1])
+            points.append((x, y))
+            control = None
+        elif command in 'Hh':
+            x = x + args[0] if relative else args[0]
+            points.append((x, y))
+            control = None
+        elif command in 'Vv':
+            y = y + args[0] if relative else args[0]
+            points.append((x, y))
+            control = None
+        else:
+            ox, oy = (x, y) if relative else (0.0, 0.0)
+            if command in 'Cc':
+                p1 = (ox + args[0], oy + args[1])
+                p2 = (ox + args[2], oy + args[3])
+                end = (ox + args[4], oy + args[5])
+            else:
+                # Smooth curve: first control point mirrors the previous one
+                p1 = (2 * x - control[0], 2 * y - control[1]) if control else (x, y)
+                p2 = (ox + args[0], oy + args[1])
+                end = (ox + args[2], oy + args[3])
+            points.extend(cubic_points((x, y), p1, p2, end))
+            control = p2
+            x, y = end
+    return points
+
+
+def stroke_feature_row(strokes):
+    """
+    Feature vector (float32, FEATURE_WIDTH) for one kanji's stroke paths:
+    stroke count, then per stroke the unit direction from first to last
+    point, the arc length and the bounding box (all on a 0-1 canvas), then
+    a RASTER_SIZE x RASTER_SIZE ink signature scaled to unit length.
+    """
+    row = np.zeros(FEATURE_WIDTH, dtype=np.float32)
+    polylines = [np.asarray(path_points(d), dtype=np.float64) / CANVAS_SIZE for d in strokes]
+    polylines = [points for points in polylines if len(points)]
+    row[0] = len(polylines)
+    if not polylines:
+        return row
+
+    per_stroke = row[STROKE_BLOCK].reshape(MAX_STROKES, STROKE_FEATURES)
+    for index, points in enumerate(polylines[:MAX_STROKES]):
+        steps = np.diff(points, axis=0)
+        vector = points[-1] - points[0]
+        norm = math.hypot(vector[0], vector[1])
+        if norm > 0:
+            per_stroke[index, 0:2] = vector / norm
+        per_stroke[index, 2] = np.hypot(steps[:, 0], steps[:, 1]).sum()
+        per_stroke[index, 3:5] = points.min(axis=0)
+        per_stroke[index, 5:7] = points.max(axis=0)
+
+    # Rasterize every sampled point into a coarse ink grid
+    all_points = np.clip(np.concatenate(polylines), 0.0, 1.0 - 1e-9)
+    cells = (all_points * RASTER_SIZE).astype(np.int64)
+    grid = np.bincount(cells[:, 1] * RASTER_SIZE + cells[:, 0],
+                       minlength=RASTER_SIZE * RASTER_SIZE).astype(np.float32)
+    row[RASTER_BLOCK] = grid / (np.linalg.norm(grid) or 1.0)
+    return row
+
+
+def build_feature_matrix(kanji_list, cache, processes=None):
+    """
+    Parse the cached strokes of every kanji in a process pool.
+    Returns (matrix, missing) where matrix has one row per id (row id - 1)
+    and rows of kanji without cached strokes are all zeros.
+    """
+    max_id = max((entry['id'] for entry in kanji_list), default=0)
+    matrix = np.zeros((max_id, FEATURE_WIDTH), dtype=np.float32)
+    ids = []
+    strokes = []
+    missing = []
+    for entry in kanji_list:
+        cached = cache.get_strokes(entry['kanji'])
+        if cached is None:
+            missing.append(entry['kanji'])
+            continue
+        ids.append(entry['id'])
+        strokes.append(cached["d"])
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(strokes) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for kanji_id, row in zip(ids, executor.map(stroke_feature_row, strokes, chunksize=chunksize)):
+            matrix[kanji_id - 1] = row
+    return matrix, missing
+
+
+def similarity_space(matrix, stroke_weight=0.5, count_weight=0.05):
+    """
+    Project feature rows into the space neighbors are measured in: the
+    unit raster signature plus down-weighted stroke geometry and count.
+    """
+    return np.concatenate([
+        matrix[:, RASTER_BLOCK],
+        matrix[:, STROKE_BLOCK] * stroke_weight,
+        matrix[:, :1] * count_weight,
+    ], axis=1)
+
+
+def nearest_neighbors(matrix, k=10, batch_size=1024):
+    """
+    Top-k nearest rows (squared Euclidean) for every row with data.
+    Distances are computed batch by batch as |a|^2 + |b|^2 - 2ab, so the
+    memory use is batch_size x rows. Returns (indices, distances) with -1
+    for rows without data or when fewer than k candidates exist.
+    """
+    space = similarity_space(matrix)
+    valid = matrix[:, 0] > 0
+    candidates = np.flatnonzero(valid)
+    points = space[candidates]
+    norms = np.einsum('ij,ij->i', points, points)
+    k = min(k, max(len(candidates) - 1, 0))
+
+    indices = np.full((len(matrix), k), -1, dtype=np.int32)
+    distances = np.zeros((len(matrix), k), dtype=np.float32)
+    if k == 0:
+        return indices, distances
+    for start in range(0, len(candidates), batch_size):
+        batch = points[start:start + batch_size]
+        batch_rows = np.arange(start, start + len(batch))
+        squared = norms[batch_rows, None] + norms[None, :] - 2.0 * (batch @ points.T)
+        squared[np.arange(len(batch)), batch_rows] = np.inf  # never your own neighbor
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        nearest_distances = np.take_along_axis(squared, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1)
+        rows = candidates[batch_rows]
+        indices[rows] = candidates[np.take_along_axis(nearest, order, axis=1)]
+        distances[rows] = np.maximum(np.take_along_axis(nearest_distances, order, axis=1), 0.0)
+    return indices, distances
+
+
+def write_similar_kanji(indices, distances, kanji_hash, path=SIMILAR_KANJI_FILE):
+    """
+    Write the neighbor table as minified JSON: `neighbors[id - 1]` lists the
+    ids of the most similar kanji, closest first (empty without data).
+    `kanji` is the hash of the kanji.json the ids refer to, as in the quiz tables.
+    """
+    neighbors = [[int(i) + 1 for i in row if i >= 0] for row in indices]
+    scores = [[round(float(d), 4) for i, d in zip(row, dist) if i >= 0]
+              for row, dist in zip(indices, distances)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": SIMILAR_KANJI_VERSION, "kanji": kanji_hash, "k": indices.shape[1],
+                   "neighbors": neighbors, "distances": scores},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    tmp_path.replace(path)
+
+
+def build_stroke_features(kanji_path, cache, features_path=STROKE_FEATURES_FILE,
+                          similar_path=SIMILAR_KANJI_FILE, k=10, processes=None, manifest=None):
+    """
+    Write the feature matrix and the nearest-neighbor table.
+    Returns (matrix, indices, missing), or None if both were up to date or
+    NumPy is not installed.
+    """
+    if np is None:
+        print("  ℹ️  NumPy not installed, quiz distractors skip the visual-similarity signal")
+        return None
+    inputs = {
+        "kanji": fingerprint_file(kanji_path),
+        "strokes": cache.strokes_fingerprint(),
+        "k": k,
+        "width": FEATURE_WIDTH,
+    }
+    if manifest is not None and manifest.is_fresh("stroke_features", inputs) \
+            and features_path.exists() and similar_path.exists():
+        print("✨ Stroke features are up to date")
+        return None
+
+    data, kanji_list = load_json_file(kanji_path)
+
+    start = time.perf_counter()
+    matrix, missing = build_feature_matrix(kanji_list, cache, processes)
+    print(f"  ✓ Parsed {len(kanji_list) - len(missing)} stroke sets in {time.perf_counter() - start:.2f}s")
+
+    features_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = features_path.with_name(features_path.stem + ".tmp.npy")
+    np.save(tmp_path, matrix)
+    tmp_path.replace(features_path)
+
+    start = time.perf_counter()
+    indices, distances = nearest_neighbors(matrix, k)
+    print(f"  ✓ Found {indices.shape[1]} neighbors per kanji in {time.perf_counter() - start:.2f}s")
+    write_similar_kanji(indices, distances, hashlib.sha256(data).hexdigest()[:16], similar_path)
+
+    if manifest is not None:
+        manifest.record("stroke_features", inputs)
+        manifest.save()
+
+    return matrix, indices, missing
+
+
+def load_stroke_features(path=STROKE_FEATURES_FILE):
+    """Memory-map the feature matrix written by build_stroke_features."""
+    return np.load(path, mmap_mode='r')
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build stroke-geometry features and similar-kanji tables.")
+    parser.add_argument("-k", type=int, default=10,
+                        help="neighbors to keep per kanji (default: 10)")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes for SVG parsing (default: one per CPU)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="maximum concurrent KanjiVG requests (default: 8)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="maximum KanjiVG requests per second (default: 10)")
+    parser.add_argument("--kanjivg-archive", type=Path, metavar="PATH",
+                        help="read SVGs from a local KanjiVG release .zip/.tar.gz instead of the network")
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ Error: NumPy is required (pip install numpy)")
+        return
+
+    kanji_file = Path("public/data/kanji.json")
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        return
+
+    kanji_chars = [entry['kanji'] for entry in load_json_file(kanji_file)[1]]
+
+    print("📐 Building stroke features...")
+    with StrokeCountCache() as cache:
+        collect_strokes(kanji_chars, cache, args.kanjivg_archive, args.workers, args.rate)
+        result = build_stroke_features(kanji_file, cache, k=args.k, processes=args.processes,
+                                       manifest=BuildManifest())
+
+    if result:
+        matrix, indices, missing = result
+        if missing:
+            print(f"  ⚠️  No stroke data for {len(missing)} kanji, their rows are empty")
+        print(f"✅ Wrote {matrix.shape[0]}x{matrix.shape[1]} features to {STROKE_FEATURES_FILE}")
+        print(f"📁 Similar kanji saved to: {SIMILAR_KANJI_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+Compact course codes on top of a stable kanji dictionary.
+The pipeline keeps public/data/kanji-dictionary.json append-only: every
+kanji keeps its code forever and new kanji get new codes, so a course
+code stays valid across data rebuilds. Course codes are a small binary
+format (varints, lesson kanji lists in lesson order as deltas, frame runs
+or signed deltas, a deduplicated string table with phrase substitution)
+in URL-safe base64.
+
+This is the reference encoder/decoder for lib/courseCodec.ts; run the
+script for a size benchmark against the base64 JSON course codes.
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import random
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+from build_data_packs import frame_number
+
+KANJI_DICTIONARY_FILE = Path("public/data/kanji-dictionary.json")
+COURSE_CODE_PREFIX = "k1."
+
+# Common course-text fragments, replaced by one control byte each (at most 31).
+# Append only: the position of a phrase is part of the code format.
+COURSE_PHRASES = (
+    "Lesson ", "Frames ", "RTK Book ", " kanji", "Week ", "Heisig ", " - ",
+    "Remembering the Kanji", "primitives", "characters", "compound", "complex ",
+    "advanc", "mastering ", "building ", "covering ", "introducing ", "core ",
+    "patterns", "vocabulary", "Review", "Quiz", "Chapter ", "Instructor",
+    "Japanese ", "Course", "Spring ", "Fall ", " the ", " with ", " and ",
+)
+
+ISO_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z$')
+# Ids made by generateId() in lib/lessonData.ts: `${Date.now()}-${base-36 random}`
+GENERATED_ID = re.compile(r'^(\d{13})-([0-9a-z]{1,10})$')
+BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Back-references in the string table are at least this long
+MIN_MATCH = 4
+# Earlier positions tried per back-reference search
+MATCH_CANDIDATES = 16
+
+# Lesson kanji list encodings
+SET_DELTAS = 0
+SET_RUNS = 1
+SET_ORDERED = 2
+
+
+def update_kanji_dictionary(kanji_list, path=KANJI_DICTIONARY_FILE):
+    """
+    Bring the dictionary in line with `kanji_list` without renumbering.
+
+    Known kanji keep their code (position + 1) and get their current id
+    and frame; new kanji are appended in list order and bump `version`.
+    Kanji no longer in the data keep their code with id 0. Returns the
+    dictionary; the file is only rewritten when something changed.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (FileNotFoundError, ValueError):
+        previous = {"version": 0, "kanji": "", "ids": [], "frames": [], "phrases": []}
+
+    characters = list(previous["kanji"])
+    code_of = {kanji_char: code for code, kanji_char in enumerate(characters, start=1)}
+    phrases = list(previous["phrases"])
+    grew = False
+    for phrase in COURSE_PHRASES:
+        if phrase not in phrases:
+            phrases.append(phrase)
+            grew = True
+
+    ids = [0] * len(characters)
+    frames = [0] * len(characters)
+    for entry in kanji_list:
+        code = code_of.get(entry['kanji'])
+        if code is None:
+            characters.append(entry['kanji'])
+            ids.append(0)
+            frames.append(0)
+            code = code_of[entry['kanji']] = len(characters)
+            grew = True
+        ids[code - 1] = entry['id']
+        frames[code - 1] = frame_number(entry) or 0
+
+    dictionary = {
+        "version": previous["version"] + 1 if grew else previous["version"],
+        "kanji": "".join(characters),
+        "ids": ids,
+        "frames": frames,
+        "phrases": phrases,
+    }
+    if dictionary != previous:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dictionary, f, ensure_ascii=False, separators=(',', ':'))
+        tmp_path.replace(path)
+    return dictionary
+
+
+def write_varint(out, value):
+    """Append an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Read an unsigned LEB128 varint; returns (value, next position)."""
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated course code")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value):
+    """Map a signed integer to an unsigned one (0, -1, 1, -2 ... -> 0, 1, 2, 3 ...)."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    """Inverse of zigzag."""
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def compress_string(text, phrases):
+    """UTF-8 bytes with phrases replaced by bytes 0x01..0x1F (0x00 escapes literal control bytes)."""
+    data = text.encode('utf-8')
+    encoded_phrases = sorted(((p.encode('utf-8'), i + 1) for i, p in enumerate(phrases[:31])),
+                             key=lambda item: -len(item[0]))
+    out = bytearray()
+    pos = 0
+    while pos < len(data):
+        for phrase, marker in encoded_phrases:
+            if data.startswith(phrase, pos):
+                out.append(marker)
+                pos += len(phrase)
+                break
+        else:
+            if data[pos] < 0x20:
+                out.append(0)
+            out.append(data[pos])
+            pos += 1
+    return bytes(out)
+
+
+def expand_string(data, phrases):
+    """Inverse of compress_string."""
+    out = bytearray()
+    pos = 0
+    while pos < len(data):
+        byte = data[pos]
+        if byte == 0:
+            out.append(data[pos + 1])
+            pos += 2
+            continue
+        if byte < 0x20:
+            out += phrases[byte - 1].encode('utf-8')
+        else:
+            out.append(byte)
+        pos += 1
+    return out.decode('utf-8')
+
+
+def lz_compress(data):
+    """
+    Compress bytes with greedy LZ77 back-references, so strings that
+    repeat parts of earlier strings ("... 34 kanji ...") cost a few bytes.
+    Ops are a varint h: even h is a literal run of h/2 bytes, odd h a copy
+    of (h >> 1) + MIN_MATCH bytes from a varint distance back.
+    """
+    out = bytearray()
+    recent = {}
+    literals = bytearray()
+    pos = 0
+
+    def flush_literals():
+        if literals:
+            write_varint(out, len(literals) * 2)
+            out.extend(literals)
+            literals.clear()
+
+    while pos < len(data):
+        key = bytes(data[pos:pos + MIN_MATCH])
+        best_length = best_distance = 0
+        if len(key) == MIN_MATCH:
+            for start in reversed(recent.get(key, ())):
+                length = 0
+                while pos + length < len(data) and data[start + length] == data[pos + length]:
+                    length += 1
+                if length > best_length:
+                    best_length, best_distance = length, pos - start
+            recent.setdefault(key, []).append(pos)
+            del recent[key][:-MATCH_CANDIDATES]
+        if best_length >= MIN_MATCH:
+            flush_literals()
+            write_varint(out, (best_length - MIN_MATCH) * 2 + 1)
+            write_varint(out, best_distance)
+            for skipped in range(pos + 1, pos + best_length):
+                skipped_key = bytes(data[skipped:skipped + MIN_MATCH])
+                if len(skipped_key) == MIN_MATCH:
+                    recent.setdefault(skipped_key, []).append(skipped)
+                    del recent[skipped_key][:-MATCH_CANDIDATES]
+            pos += best_length
+        else:
+            literals.append(data[pos])
+            pos += 1
+    flush_literals()
+    return bytes(out)
+
+
+def lz_decompress(data, pos, size):
+    """Inverse of lz_compress for `size` output bytes; returns (bytes, next position)."""
+    out = bytearray()
+    while len(out) < size:
+        op, pos = read_varint(data, pos)
+        if op % 2 == 0:
+            out += data[pos:pos + op // 2]
+            pos += op // 2
+        else:
+            distance, pos = read_varint(data, pos)
+            if not 0 < distance <= len(out):
+                raise ValueError("bad back-reference in course code")
+            for _ in range(op // 2 + MIN_MATCH):
+                out.append(out[-distance])
+    return bytes(out), pos
+
+
+def timestamp_ms(value):
+    """Milliseconds since the epoch of a Date.toISOString() string, or None."""
+    if not isinstance(value, str) or not ISO_TIMESTAMP.match(value):
+        return None
+    moment = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+    return round(moment.timestamp() * 1000)
+
+
+def iso_timestamp(ms):
+    """Inverse of timestamp_ms (Date.toISOString format)."""
+    moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ms % 1000:03d}Z"
+
+
+def encode_kanji_set(out, codes):
+    """
+    Append a lesson's dictionary codes in lesson order. Strictly increasing
+    codes (the usual book-order lesson) are written as deltas or as runs,
+    whichever is shorter; any other order, or a repeated kanji, as signed
+    (zigzag) deltas from the previous code.
+    """
+    if any(code <= previous for previous, code in zip(codes, codes[1:])):
+        out.append(SET_ORDERED)
+        write_varint(out, len(codes))
+        previous = 0
+        for code in codes:
+            write_varint(out, zigzag(code - previous))
+            previous = code
+        return
+
+    deltas = bytearray()
+    write_varint(deltas, len(codes))
+    previous = 0
+    for code in codes:
+        write_varint(deltas, code - previous)
+        previous = code
+
+    runs = []
+    for code in codes:
+        if runs and code == runs[-1][1] + 1:
+            runs[-1][1] = code
+        else:
+            runs.append([code, code])
+    run_bytes = bytearray()
+    write_varint(run_bytes, len(runs))
+    previous = 0
+    for first, last in runs:
+        write_varint(run_bytes, first - previous)
+        write_varint(run_bytes, last - first)
+        previous = last
+
+    if len(run_bytes) < len(deltas):
+        out.append(SET_RUNS)
+        out += run_bytes
+    else:
+        out.append(SET_DELTAS)
+        out += deltas
+
+
+def decode_kanji_set(data, pos):
+    """Read a list written by encode_kanji_set; returns (codes, next position)."""
+    mode = data[pos]
+    count, pos = read_varint(data, pos + 1)
+    codes = []
+    previous = 0
+    for _ in range(count):
+        if mode == SET_RUNS:
+            gap, pos = read_varint(data, pos)
+            length, pos = read_varint(data, pos)
+            first = previous + gap
+            codes.extend(range(first, first + length + 1))
+            previous = first + length
+        else:
+            delta, pos = read_varint(data, pos)
+            previous += unzigzag(delta) if mode == SET_ORDERED else delta
+            codes.append(previous)
+    return codes, pos
+
+
+def encode_course(share_data, dictionary):
+    """
+    Encode a CourseShareData dict ({"course", "sharedAt", "sharedBy"}) as
+    a compact course code. Lesson kanji keep their order and repeats.
+    Raises ValueError for kanji ids missing from the dictionary.
+    """
+    code_of = {kanji_id: code for code, kanji_id in enumerate(dictionary["ids"], start=1) if kanji_id}
+    phrases = dictionary["phrases"]
+    course = share_data["course"]
+    strings = {}
+    body = bytearray()
+
+    def string_ref(text):
+        write_varint(body, strings.setdefault(text or "", len(strings)))
+
+    def generated_id(text):
+        # Digits of the random part (0 = not a generateId() value, stored as a string)
+        match = GENERATED_ID.match(text or "")
+        if not match:
+            body.append(0)
+            string_ref(text)
+            return
+        write_varint(body, len(match.group(2)))
+        write_varint(body, zigzag(int(match.group(1)) - reference))
+        write_varint(body, int(match.group(2), 36))
+
+    # Timestamps are stored relative to when the course was shared
+    reference = timestamp_ms(share_data.get("sharedAt")) or timestamp_ms(course["createdAt"]) or 0
+
+    def timestamp(value):
+        # 0 = not a toISOString() value, stored as a string instead
+        ms = timestamp_ms(value)
+        if ms is None:
+            body.append(0)
+            string_ref(value)
+        else:
+            write_varint(body, zigzag(ms - reference) + 1)
+
+    timestamp(share_data.get("sharedAt"))
+    string_ref(share_data.get("sharedBy"))
+    generated_id(course["id"])
+    string_ref(course["name"])
+    string_ref(course["description"])
+    timestamp(course["createdAt"])
+    timestamp(course["updatedAt"])
+    write_varint(body, len(course["lessons"]))
+    for lesson in course["lessons"]:
+        generated_id(lesson["id"])
+        string_ref(lesson["name"])
+        string_ref(lesson["description"])
+        write_varint(body, lesson["order"] * 2 + (1 if lesson["isActive"] else 0))
+        timestamp(lesson["createdAt"])
+        timestamp(lesson["updatedAt"])
+        try:
+            codes = [code_of[kanji_id] for kanji_id in lesson["kanjiIds"]]
+        except KeyError as error:
+            raise ValueError(f"kanji id {error.args[0]} is not in the dictionary") from None
+        encode_kanji_set(body, codes)
+
+    out = bytearray()
+    write_varint(out, dictionary["version"])
+    write_varint(out, reference)
+    table = bytearray()
+    for text in strings:
+        packed = compress_string(text, phrases)
+        write_varint(table, len(packed))
+        table += packed
+    write_varint(out, len(strings))
+    write_varint(out, len(table))
+    out += lz_compress(table)
+    out += body
+    return COURSE_CODE_PREFIX + base64.urlsafe_b64encode(bytes(out)).decode('ascii').rstrip("=")
+
+
+def decode_course(code, dictionary):
+    """
+    Decode a compact course code back into a CourseShareData dict.
+    Raises ValueError for malformed codes or codes made with a newer
+    dictionary than the one given.
+    """
+    if not code.startswith(COURSE_CODE_PREFIX):
+        raise ValueError("not a compact course code")
+    payload = code[len(COURSE_CODE_PREFIX):]
+    try:
+        return _decode_payload(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)),
+                               dictionary)
+    except (IndexError, UnicodeDecodeError, binascii.Error) as error:
+        raise ValueError(f"malformed course code: {error}") from None
+
+
+def _decode_payload(data, dictionary):
+    """Decode the binary payload of a course code."""
+
+    version, pos = read_varint(data, 0)
+    if version > dictionary["version"]:
+        raise ValueError(f"course code needs kanji dictionary version {version}")
+    reference, pos = read_varint(data, pos)
+    count, pos = read_varint(data, pos)
+    table_size, pos = read_varint(data, pos)
+    table, pos = lz_decompress(data, pos, table_size)
+    strings = []
+    offset = 0
+    for _ in range(count):
+        length, offset = read_varint(table, offset)
+        strings.append(expand_string(table[offset:offset + length], dictionary["phrases"]))
+        offset += length
+
+    def string_ref():
+        nonlocal pos
+        index, pos = read_varint(data, pos)
+        return strings[index]
+
+    def timestamp():
+        nonlocal pos
+        value, pos = read_varint(data, pos)
+        return string_ref() if value == 0 else iso_timestamp(reference + unzigzag(value - 1))
+
+    def generated_id():
+        nonlocal pos
+        digits, pos = read_varint(data, pos)
+        if digits == 0:
+            return string_ref()
+        ms, pos = read_varint(data, pos)
+        random_part, pos = read_varint(data, pos)
+        return f"{reference + unzigzag(ms)}-{base36(random_part).rjust(digits, '0')}"
+
+    shared_at = timestamp()
+    shared_by = string_ref()
+    course = {"id": generated_id(), "name": string_ref(), "description": string_ref(),
+              "lessons": []}
+    course["createdAt"] = timestamp()
+    course["updatedAt"] = timestamp()
+    lesson_count, pos = read_varint(data, pos)
+    for _ in range(lesson_count):
+        lesson = {"id": generated_id(), "name": string_ref(), "description": string_ref()}
+        flags, pos = read_varint(data, pos)
+        lesson["order"] = flags // 2
+        lesson["isActive"] = bool(flags & 1)
+        lesson["createdAt"] = timestamp()
+        lesson["updatedAt"] = timestamp()
+        codes, pos = decode_kanji_set(data, pos)
+        lesson["kanjiIds"] = [dictionary["ids"][code - 1] for code in codes
+                              if dictionary["ids"][code - 1]]
+        course["lessons"].append(lesson)
+    return {"course": course, "sharedAt": shared_at, "sharedBy": shared_by}
+
+
+def legacy_course_code(share_data):
+    """The current lib/courseSharing.ts code: btoa(encodeURIComponent(JSON.stringify(data)))."""
+    text = json.dumps(share_data, ensure_ascii=False, separators=(',', ':'))
+    return base64.b64encode(quote(text, safe="-_.!~*'()").encode('ascii')).decode('ascii')
+
+
+# Bytes a QR code holds in byte mode with medium error correction, versions 1-40
+QR_BYTE_CAPACITY_M = (14, 26, 42, 62, 84, 106, 122, 152, 180, 213, 251, 287, 331, 362, 412,
+                      450, 504, 560, 624, 666, 711, 779, 857, 911, 997, 1059, 1125, 1190,
+                      1264, 1370, 1452, 1538, 1628, 1722, 1809, 1911, 1989, 2099, 2213, 2331)
+
+
+def qr_version(size):
+    """Smallest QR version that holds `size` bytes (ECC level M), or None if too large."""
+    for version, capacity in enumerate(QR_BYTE_CAPACITY_M, start=1):
+        if size <= capacity:
+            return version
+    return None
+
+
+def base36(value):
+    """Base-36 digits of a non-negative integer, like Number.toString(36)."""
+    digits = ""
+    while True:
+        value, digit = divmod(value, 36)
+        digits = BASE36_DIGITS[digit] + digits
+        if not value:
+            return digits
+
+
+def sample_course(kanji_list, frame_ranges, name, description, started_ms):
+    """A CourseShareData shaped like the ones lib/lessonData.ts creates."""
+    ids_by_frame = {frame_number(entry): entry['id'] for entry in kanji_list}
+    created = iso_timestamp(started_ms)
+    lessons = []
+    for order, (first, last) in enumerate(frame_ranges, start=1):
+        lesson_ms = started_ms + order * 37
+        lessons.append({
+            "id": f"{lesson_ms}-{base36(lesson_ms * 7919 % 36 ** 9)}",
+            "name": f"Lesson {order}: Frames {first}-{last}",
+            "description": f"RTK Book 1 - {last - first + 1} kanji building on the previous lessons",
+            "order": order,
+            "kanjiIds": [ids_by_frame[f] for f in range(first, last + 1) if f in ids_by_frame],
+            "isActive": True,
+            "createdAt": iso_timestamp(lesson_ms),
+            "updatedAt": iso_timestamp(lesson_ms + 86_400_000 * order),
+        })
+    return {
+        "course": {"id": f"{started_ms}-a8k2m9x1q", "name": name, "description": description,
+                   "lessons": lessons, "createdAt": created,
+                   "updatedAt": iso_timestamp(started_ms + 86_400_000 * 90)},
+        "sharedAt": iso_timestamp(started_ms + 86_400_000 * 3),
+        "sharedBy": "Instructor",
+    }
+
+
+def benchmark_courses(kanji_list):
+    """
+    Realistic 10- and 15-lesson courses: the default lessons, a schedule,
+    a custom pick and a lesson in the instructor's own order.
+    """
+    default_lessons = [(1, 34), (35, 70), (71, 172), (173, 234), (235, 352), (353, 395),
+                       (396, 508), (509, 577), (578, 636), (637, 766)]
+    start = 1769731200000  # 2026-01-30
+    fifteen = [(1 + 100 * i, 100 * (i + 1)) for i in range(15)]
+    course = sample_course(kanji_list, fifteen, "Japan 370: Kanji", "Heisig RTK, 15 weeks", start)
+    # A hand-picked lesson: every third frame of a range, so runs do not help
+    picked = course["course"]["lessons"][-1]
+    picked["kanjiIds"] = picked["kanjiIds"][::3]
+    # A drill lesson: shuffled frames, so only the ordered encoding applies
+    reordered = sample_course(kanji_list, fifteen, "Japan 370: Kanji", "Heisig RTK, 15 weeks", start)
+    random.Random(7).shuffle(reordered["course"]["lessons"][1]["kanjiIds"])
+    return [
+        ("10 default lessons", sample_course(kanji_list, default_lessons, "Japan 370: Kanji",
+                                             "Remembering the Kanji, Book 1", start)),
+        ("15 weekly lessons", sample_course(kanji_list, fifteen, "Japan 370: Kanji",
+                                            "Heisig RTK, 15 weeks", start)),
+        ("15 lessons, 1 hand-picked", course),
+        ("15 lessons, 1 reordered", reordered),
+    ]
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Update the kanji dictionary and benchmark course codes.")
+    parser.add_argument("--no-update", action="store_true",
+                        help="use the committed dictionary as is instead of syncing it with kanji.json")
+    args = parser.parse_args()
+
+    kanji_file = Path("public/data/kanji.json")
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        return
+
+    with open(kanji_file, 'r', encoding='utf-8') as f:
+        kanji_list = json.load(f)
+
+    if args.no_update:
+        with open(KANJI_DICTIONARY_FILE, 'r', encoding='utf-8') as f:
+            dictionary = json.load(f)
+    else:
+        dictionary = update_kanji_dictionary(kanji_list)
+    print(f"📖 Kanji dictionary v{dictionary['version']}: {len(dictionary['kanji'])} kanji")
+
+    print(f"\n{'course':<28} {'json b64':>9} {'compact':>8} {'ratio':>6} {'QR (M)':>10}")
+    for name, share_data in benchmark_courses(kanji_list):
+        legacy = legacy_course_code(share_data)
+        compact = encode_course(share_data, dictionary)
+        decoded = decode_course(compact, dictionary)
+        expected = json.loads(json.dumps(share_data))
+        status = "✓" if decoded == expected else "❌ round trip failed"
+        legacy_qr = qr_version(len(legacy) + 30) or ">40"
+        compact_qr = qr_version(len(compact) + 30) or ">40"
+        print(f"{name:<28} {len(legacy):>9} {len(compact):>8} {len(legacy) / len(compact):>5.1f}x "
+              f"{legacy_qr:>4} -> {compact_qr:<3} {status}")
+    print("\n(QR versions include ~30 bytes for the https://…/join?code= prefix)")
+
+
+if __name__ == "__main__":
+    main()
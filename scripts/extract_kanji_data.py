@@ -5,190 +5,317 @@ Parses TSV files and generates structured JSON output.
 Includes stroke count extraction from KanjiVG data.
 """
 
-import zipfile
+import argparse
 import json
-import csv
 from pathlib import Path
-import urllib.request
-import xml.etree.ElementTree as ET
-import time
-import os
+import sys
 
-# Cache file for stroke counts
-STROKE_COUNT_CACHE_FILE = Path("scripts/stroke_count_cache.json")
+from kanjivg_svg import KANJIVG_BASE_URL
+from stroke_cache import StrokeCountCache
+from build_manifest import (BuildManifest, fingerprint_zip_members, fingerprint_file, load_json_file,
+                            record_hash, remember_json_file)
+from build_search_index import SEARCH_INDEX_FILE, write_search_index
+from build_component_graph import COMPONENT_GRAPH_FILE, print_order_report, write_component_graph
+from build_metrics import BuildMetrics, add_profile_arguments, profile_session
+from extract_staging import CHECKPOINT_EVERY, STAGING_FILE, ExtractStaging
+from index_sources import merge_index_sources
+
+def iter_index_records(zip_paths):
+    """Yield the merged record of every kanji in the index files, in id order."""
+    for _, record in merge_index_sources(zip_paths):
+        yield record
+
+
+def get_sort_key(entry):
+    """Sort key for kanji entries: numeric heisig_number, unnumbered entries last."""
+    num_str = entry['heisig_number']
+    # Handle both pure numbers and prefixed numbers (e.g., "RTK1-123")
+    try:
+        # Try to extract the numeric part
+        if '-' in num_str:
+            num_str = num_str.split('-')[-1]
+        return int(num_str) if num_str.isdigit() else 99999
+    except:
+        return 99999
+
+
+def load_previous_output(output_path):
+    """Load the kanji list from a previous build, or None if unavailable."""
+    try:
+        return load_json_file(output_path)[1]
+    except (FileNotFoundError, ValueError):
+        return None
 
-def load_stroke_count_cache():
-    """Load cached stroke counts from file."""
-    if STROKE_COUNT_CACHE_FILE.exists():
-        try:
-            with open(STROKE_COUNT_CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
 
-def save_stroke_count_cache(cache):
-    """Save stroke count cache to file."""
-    STROKE_COUNT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(STROKE_COUNT_CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+def diff_entries(previous, current):
+    """Return (changed, added, removed) kanji characters between two builds."""
+    old_by_kanji = {entry['kanji']: entry for entry in previous or []}
+    new_by_kanji = {entry['kanji']: entry for entry in current}
+    changed = [k for k, entry in new_by_kanji.items()
+               if k in old_by_kanji and old_by_kanji[k] != entry]
+    added = [k for k in new_by_kanji if k not in old_by_kanji]
+    removed = [k for k in old_by_kanji if k not in new_by_kanji]
+    return changed, added, removed
 
 
-def get_kanjivg_stroke_count(kanji_char, cache, retry_count=3):
+def extract_output_fingerprints(output_path, search_index_path, component_graph_path=None):
+    """Fingerprints of every file the extraction stage writes."""
+    outputs = {
+        "kanji": fingerprint_file(output_path),
+        "search_index": fingerprint_file(search_index_path),
+    }
+    if component_graph_path is not None:
+        outputs["component_graph"] = fingerprint_file(component_graph_path)
+    return outputs
+
+
+def extract_kanji_data(zip_paths, output_path, max_workers=8, rate=10.0, kanjivg_archive=None,
+                       manifest=None, search_index_path=SEARCH_INDEX_FILE,
+                       lessons_zip=None, component_graph_path=COMPONENT_GRAPH_FILE,
+                       kanjivg_url=KANJIVG_BASE_URL, metrics=None, refresh=False,
+                       staging_path=STAGING_FILE, resume=False, stroke_count_cache=None):
     """
-    Fetch stroke count from KanjiVG GitHub repository.
-    Returns the number of strokes, or None if unavailable.
-    Uses cache to avoid redundant requests.
+    Extract kanji data from one or more ZIP files containing TSV data.
+    The index files are merged per character (see merge_index_sources);
+    stroke counts from the RTK frame lists fill in where KanjiVG has none.
+    If `kanjivg_archive` is given, stroke counts come from that local KanjiVG
+    release archive and the network is never used. A search index over all
+    keyword, reading and component fields is written to `search_index_path`.
+    If `lessons_zip` is given, the component graph built from its primitive
+    frames and lessons is written to `component_graph_path`, and components
+    used before they are introduced are reported.
+
+    If a BuildManifest is given, the build is incremental: it is skipped when
+    the ZIP members, the stroke count cache and the output are all unchanged,
+    and the output is only rewritten when some entries actually changed.
+
+    Finished entries are streamed to an NDJSON staging file at
+    `staging_path`, with an fsynced checkpoint every CHECKPOINT_EVERY rows.
+    With `resume`, a run continues after the last checkpoint made from the
+    same ZIP members instead of starting over. The output is the sorted
+    staging file, written atomically.
+
+    With `refresh`, cached stroke counts are revalidated against KanjiVG with
+    conditional requests (see StrokeCountFetcher).
+
+    Stage timings and counters are recorded on `metrics` (a BuildMetrics).
+    A `stroke_count_cache` passed in is used and left open for the caller;
+    otherwise the default cache is opened and closed here.
     """
-    # Check cache first
-    if kanji_char in cache:
-        return cache[kanji_char]
-    
-    unicode_hex = f"{ord(kanji_char):05x}"
-    url = f"https://raw.githubusercontent.com/KanjiVG/kanjivg/master/kanji/{unicode_hex}.svg"
-    
-    for attempt in range(retry_count):
-        try:
-            with urllib.request.urlopen(url, timeout=10) as response:
-                svg_data = response.read().decode('utf-8')
-            
-            # Parse SVG and count path elements (each path = one stroke)
-            root = ET.fromstring(svg_data)
-            paths = root.findall('.//{http://www.w3.org/2000/svg}path')
-            
-            if not paths:
-                paths = root.findall('.//path')
-            
-            count = len(paths) if paths else None
-            if count is not None:
-                cache[kanji_char] = count
-            return count
-        except Exception as e:
-            if attempt < retry_count - 1:
-                time.sleep(0.5)  # Wait before retry
-                continue
-            return None
-    
-    return None
-
-
-def extract_kanji_data(zip_paths, output_path):
-    """Extract kanji data from one or more ZIP files containing TSV data."""
+    if metrics is None:
+        metrics = BuildMetrics()
+    owns_cache = stroke_count_cache is None
     kanji_list = []
-    seen_kanji = set()  # Track duplicates
+    positions = []
+    search_docs = []
+    # Stroke counts printed in the frame lists, used when KanjiVG has none
+    index_stroke_counts = {}
     
     # Load stroke count cache
-    stroke_count_cache = load_stroke_count_cache()
+    if owns_cache:
+        stroke_count_cache = StrokeCountCache()
+    
+    graph_path = component_graph_path if lessons_zip is not None else None
+    members = fingerprint_zip_members(zip_paths)
+    
+    if manifest is not None and not resume:
+        with metrics.stage("manifest_check"):
+            inputs = {"members": members, "stroke_counts": stroke_count_cache.fingerprint()}
+            state = manifest.get("extract")
+            outputs = extract_output_fingerprints(output_path, search_index_path, graph_path)
+        if (manifest.is_fresh("extract", inputs) and not state.get("defaulted")
+                and None not in outputs.values() and state.get("outputs") == outputs):
+            if owns_cache:
+                stroke_count_cache.close()
+            metrics.count("noop_builds")
+            print("✨ Inputs unchanged, kanji data is up to date")
+            return load_previous_output(output_path)
+    
     print(f"📦 Loaded {len(stroke_count_cache)} cached stroke counts")
     
-    for zip_path in zip_paths:
-        if not zip_path.exists():
-            print(f"⚠️  Warning: {zip_path} not found, skipping...")
-            continue
-            
-        print(f"📦 Processing {zip_path.name}...")
-        
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            for file_name in zip_ref.namelist():
-                if file_name.endswith('.tsv') or file_name.endswith('.csv'):
-                    print(f"  📄 Reading {file_name}")
-                    
-                    # Determine delimiter based on file extension
-                    delimiter = '\t' if file_name.endswith('.tsv') else ','
-                    
-                    with zip_ref.open(file_name) as data_file:
-                        content = data_file.read().decode('utf-8')
-                        reader = csv.DictReader(content.splitlines(), delimiter=delimiter)
-                        
-                        for row in reader:
-                            kanji_char = row.get('kanji', '').strip()
-                            
-                            # Skip empty entries or duplicates
-                            if not kanji_char or kanji_char in seen_kanji:
-                                continue
-                            
-                            seen_kanji.add(kanji_char)
-                            
-                            # Extract components/primitives (try multiple field names)
-                            components = row.get('components', '') or row.get('primitives', '')
-                            primitives = []
-                            if components:
-                                # Split on semicolon or comma and clean up
-                                separators = [';', ',']
-                                for sep in separators:
-                                    if sep in components:
-                                        primitives = [p.strip() for p in components.split(sep) if p.strip()]
-                                        break
-                                if not primitives:
-                                    primitives = [components.strip()]
-                            
-                            # Parse heisig number (try multiple field names)
-                            heisig_num = (row.get('index', '') or 
-                                         row.get('id_6th_ed', '') or 
-                                         row.get('id_5th_ed', '')).strip()
-                            
-                            # Get keyword (prefer 6th edition)
-                            keyword = (row.get('keyword_6th_ed', '') or 
-                                      row.get('keyword_5th_ed', '') or 
-                                      row.get('keyword', '')).strip()
-                            
-                            # Fetch stroke count from KanjiVG
-                            stroke_count = get_kanjivg_stroke_count(kanji_char, stroke_count_cache)
-                            if stroke_count is None:
-                                # Fallback: estimate based on character complexity
-                                # Most kanji have 8-12 strokes on average
-                                stroke_count = 10
-                                print(f"  ⚠️  Could not fetch stroke count for {kanji_char} (#{heisig_num}), using default: {stroke_count}")
-                            else:
-                                # Show progress every 50 kanji
-                                if len(kanji_list) % 50 == 0:
-                                    print(f"  ✓ Processed {len(kanji_list)} kanji...")
-                            
-                            # Add small delay to avoid rate limiting (only if fetching from web)
-                            if kanji_char not in stroke_count_cache:
-                                time.sleep(0.1)
-                            
-                            kanji_entry = {
-                                "id": len(kanji_list) + 1,
-                                "kanji": kanji_char,
-                                "keyword": keyword,
-                                "heisig_number": heisig_num,
-                                "strokeCount": stroke_count,
-                                "primitives": primitives,
-                                "user_story": "",
-                                "last_reviewed": None,
-                                "ease_factor": 2.5
-                            }
-                            kanji_list.append(kanji_entry)
-    
-    # Sort by heisig_number (numeric sort)
-    def get_sort_key(entry):
-        num_str = entry['heisig_number']
-        # Handle both pure numbers and prefixed numbers (e.g., "RTK1-123")
-        try:
-            # Try to extract the numeric part
-            if '-' in num_str:
-                num_str = num_str.split('-')[-1]
-            return int(num_str) if num_str.isdigit() else 99999
-        except:
-            return 99999
+    with metrics.stage("ingest"):
+        for position, record in merge_index_sources(zip_paths):
+            kanji_entry = {
+                "id": len(kanji_list) + 1,
+                "kanji": record["kanji"],
+                "keyword": record["keyword"],
+                "heisig_number": record["heisig_number"],
+                "strokeCount": None,
+                "primitives": record["primitives"],
+                "user_story": "",
+                "last_reviewed": None,
+                "ease_factor": 2.5
+            }
+            kanji_list.append(kanji_entry)
+            positions.append(position)
+            search_docs.append((kanji_entry["id"], record))
+            if record["stroke_count"]:
+                index_stroke_counts[record["kanji"]] = record["stroke_count"]
+    metrics.count("rows", len(kanji_list))
+    
+    # Build the search index while the full index fields are at hand
+    with metrics.stage("search_index"):
+        search_index = write_search_index(search_docs, search_index_path)
+    metrics.wrote("search_index", search_index_path)
+    print(f"🔎 Indexed {len(search_index['terms'])} search terms")
+    
+    if graph_path is not None:
+        with metrics.stage("component_graph"):
+            graph, violations, unplaced = write_component_graph(search_docs, lessons_zip, graph_path)
+        metrics.wrote("component_graph", graph_path)
+        metrics.count("order_violations", len(violations))
+        print(f"🧩 Linked {len(graph['components'])} components")
+        print_order_report(violations, unplaced, limit=5)
+    del search_docs
     
-    kanji_list.sort(key=get_sort_key)
+    # Pick up after the last checkpoint if it was made from the same inputs
+    staging = ExtractStaging(staging_path)
+    staging_inputs = record_hash(members)
+    checkpoint = staging.load_checkpoint(staging_inputs) if resume else None
+    done = checkpoint["entries"] if checkpoint else 0
+    if checkpoint and (done > len(positions) or (done and positions[done - 1] != {
+            "zip": checkpoint["zip"], "member": checkpoint["member"], "row": checkpoint["row"]})):
+        checkpoint, done = None, 0
+    if checkpoint:
+        print(f"⏯️  Resuming after {checkpoint['member']} row {checkpoint['row']} "
+              f"({done} entries already staged)")
+        metrics.count("resumed_rows", done)
+    elif resume:
+        print("⚠️  No usable checkpoint, starting from the first row")
+    defaulted = checkpoint["defaulted"] if checkpoint else []
+    staging.open(checkpoint)
+    remaining = kanji_list[done:]
     
-    # Save stroke count cache
-    save_stroke_count_cache(stroke_count_cache)
+    fetcher = None
+    if kanjivg_archive:
+        # Offline mode: one pass over the local KanjiVG release
+        from kanjivg_archive import load_stroke_counts_from_archive
+        print(f"📦 Reading stroke counts from {kanjivg_archive}...")
+        wanted = {entry['kanji'] for entry in remaining}
+        with metrics.stage("stroke_counts"):
+            added = load_stroke_counts_from_archive(kanjivg_archive, stroke_count_cache, wanted,
+                                                    keep_strokes=True)
+        metrics.count("archive_added", added)
+        print(f"  ✓ Added {added} stroke counts from archive")
+
+        def lookup_stroke_counts(batch):
+            return {entry['kanji']: stroke_count_cache.get(entry['kanji']) for entry in batch}
+    else:
+        # Fetch stroke counts from KanjiVG concurrently, one checkpoint batch at a time
+        # Downloaded SVGs are stripped and kept for the stroke-order bundles
+        from kanjivg_fetch import StrokeCountFetcher
+        fetcher = StrokeCountFetcher(stroke_count_cache, max_workers=max_workers, rate=rate,
+                                     base_url=kanjivg_url, keep_strokes=True, metrics=metrics,
+                                     refresh=refresh)
+
+        def lookup_stroke_counts(batch):
+            return fetcher.fetch_many(entry['kanji'] for entry in batch)
+    
+    # Stream finished entries to the staging file, checkpointing every batch
+    with metrics.stage("stroke_counts"):
+        for batch_start in range(0, len(remaining), CHECKPOINT_EVERY):
+            batch = remaining[batch_start:batch_start + CHECKPOINT_EVERY]
+            stroke_counts = lookup_stroke_counts(batch)
+            for entry in batch:
+                stroke_count = stroke_counts.get(entry['kanji'])
+                if stroke_count is None:
+                    stroke_count = index_stroke_counts.get(entry['kanji'])
+                if stroke_count is None:
+                    # Fallback: estimate based on character complexity
+                    # Most kanji have 8-12 strokes on average
+                    stroke_count = 10
+                    defaulted.append(entry['kanji'])
+                    print(f"  ⚠️  Could not fetch stroke count for {entry['kanji']} (#{entry['heisig_number']}), using default: {stroke_count}")
+                entry['strokeCount'] = stroke_count
+                staging.append(entry)
+            done += len(batch)
+            with metrics.timer("checkpoint"):
+                stroke_count_cache.commit()
+                staging.checkpoint(staging_inputs, positions[done - 1], done, defaulted)
+            print(f"  ✓ Staged {done}/{len(kanji_list)} entries...")
+    staging.close()
+    if fetcher is not None:
+        # One fetcher served every batch over the same kept-alive connections
+        fetcher.close()
+    metrics.count("default_stroke_counts", len(defaulted))
+
+    # Final stage: read back everything staged and sort by heisig_number
+    with metrics.stage("sort"):
+        kanji_list = sorted(staging.iter_entries(), key=get_sort_key)
+    
+    # Commit stroke count cache and refresh the JSON snapshot
+    with metrics.stage("cache_commit"):
+        stroke_count_cache.commit()
+        stroke_count_cache.export_json()
     print(f"\n💾 Saved stroke count cache with {len(stroke_count_cache)} entries")
     
-    # Write to JSON file
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as json_file:
-        json.dump(kanji_list, json_file, ensure_ascii=False, indent=2)
+    # Only rewrite the output when some entry actually changed
+    previous = load_previous_output(output_path) if manifest is not None else None
+    if previous == kanji_list:
+        print("✨ No entries changed, keeping existing output")
+    else:
+        if previous is not None:
+            changed, added, removed = diff_entries(previous, kanji_list)
+            print(f"🔁 {len(changed)} changed, {len(added)} added, {len(removed)} removed entries")
+        
+        # Write to JSON file (atomically, so readers never see a partial file)
+        with metrics.stage("write_json"):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+            data = json.dumps(kanji_list, ensure_ascii=False, indent=2).encode('utf-8')
+            tmp_path.write_bytes(data)
+            tmp_path.replace(output_path)
+            # Later stages in the same process reuse the list instead of re-parsing it
+            remember_json_file(output_path, data, kanji_list)
+        metrics.wrote("kanji_json", output_path)
+    
+    if manifest is not None:
+        inputs = {"members": members, "stroke_counts": stroke_count_cache.fingerprint()}
+        manifest.record("extract", inputs,
+                        outputs=extract_output_fingerprints(output_path, search_index_path,
+                                                            graph_path),
+                        defaulted=defaulted)
+        manifest.save()
+    
+    staging.discard()
+    if owns_cache:
+        stroke_count_cache.close()
     
     return kanji_list
 
 
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Extract kanji data from Heisig RTK Index ZIP files.")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="maximum concurrent KanjiVG requests (default: 8)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="maximum KanjiVG requests per second (default: 10)")
+    parser.add_argument("--kanjivg-archive", type=Path, metavar="PATH",
+                        help="read stroke counts from a local KanjiVG release .zip/.tar.gz instead of the network")
+    parser.add_argument("--kanjivg-url", default=KANJIVG_BASE_URL, metavar="URL",
+                        help="base URL of the KanjiVG kanji/ directory (default: GitHub)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild even if the build manifest says the output is up to date")
+    parser.add_argument("--refresh", action="store_true",
+                        help="revalidate cached stroke counts not checked for 30 days (implies --force); "
+                             "counts without stored validators need a full download, at most 100 per run")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its last checkpoint")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit with an error if validation finds errors in the output")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    # The later stages are imported here rather than at the top, so that
+    # `python -m scripts extract` does not load them
+    from build_data_packs import build_data_packs
+    from build_quiz_tables import QUIZ_TABLES_FILE, build_quiz_tables
+    from build_stroke_bundles import STROKE_BUNDLE_DIR, build_stroke_bundles, collect_strokes
+    from build_stroke_features import SIMILAR_KANJI_FILE, build_stroke_features
+    from course_codec import KANJI_DICTIONARY_FILE, update_kanji_dictionary
+    from validate_kanji_data import VALIDATION_REPORT_FILE, print_validation_summary, run_validation
+
     # Look for all available ZIP files
     zip_files = [
         Path("heisig-rtk-index.zip"),
@@ -197,18 +324,83 @@ def main():
     
     output_file = Path("public/data/kanji.json")
     
-    print("🚀 Starting kanji data extraction...\n")
-    kanji_data = extract_kanji_data(zip_files, output_file)
+    manifest = BuildManifest()
+    if args.force or args.refresh:
+        manifest.invalidate("extract")
     
-    print(f"\n✅ Successfully extracted {len(kanji_data)} kanji characters")
-    print(f"📁 Output saved to: {output_file}")
+    print("🚀 Starting kanji data extraction...\n")
+    with profile_session(args, "extract_kanji_data.py") as metrics:
+        try:
+            kanji_data = extract_kanji_data(zip_files, output_file,
+                                            max_workers=args.workers, rate=args.rate,
+                                            kanjivg_archive=args.kanjivg_archive,
+                                            manifest=manifest, lessons_zip=zip_files[1],
+                                            kanjivg_url=args.kanjivg_url, metrics=metrics,
+                                            refresh=args.refresh, resume=args.resume)
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted. Run again with --resume to continue from the last checkpoint")
+            sys.exit(130)
+        
+        print(f"\n✅ Successfully extracted {len(kanji_data)} kanji characters")
+        print(f"📁 Output saved to: {output_file}")
+        
+        # Split into per-lesson data packs for the client
+        with metrics.stage("data_packs"):
+            pack_manifest = build_data_packs(output_file, zip_files[1], manifest=manifest)
+        if pack_manifest:
+            metrics.wrote("data_packs", sum(shard["bytes"] for shard in pack_manifest["shards"]))
+            print(f"📦 Wrote {len(pack_manifest['shards'])} per-lesson data packs")
+        
+        # Stroke-order bundles from the stripped SVGs the extraction kept, and
+        # visual neighbors from the same strokes for the quiz distractors
+        try:
+            with StrokeCountCache() as cache:
+                with metrics.stage("stroke_bundles"):
+                    collect_strokes([entry['kanji'] for entry in kanji_data], cache, args.kanjivg_archive,
+                                    args.workers, args.rate, base_url=args.kanjivg_url)
+                    bundle_manifest = build_stroke_bundles(output_file, zip_files[1], cache,
+                                                           manifest=manifest)
+                with metrics.stage("stroke_features"):
+                    features = build_stroke_features(output_file, cache, manifest=manifest)
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Interrupted. The SVGs fetched so far are cached; run again to finish {STROKE_BUNDLE_DIR}")
+            sys.exit(130)
+        if bundle_manifest:
+            metrics.wrote("stroke_bundles", sum(bundle["bytes"] for bundle in bundle_manifest["bundles"]))
+            print(f"✍️  Wrote {len(bundle_manifest['bundles'])} stroke bundles to {STROKE_BUNDLE_DIR}")
+        if features:
+            print(f"📐 Wrote visual neighbors to {SIMILAR_KANJI_FILE}")
+        
+        # Distractor and lesson-bucket tables for the quiz
+        with metrics.stage("quiz_tables"):
+            quiz_tables = build_quiz_tables(output_file, zip_files[1], manifest=manifest,
+                                            similar_path=SIMILAR_KANJI_FILE)
+        if quiz_tables:
+            metrics.wrote("quiz_tables", QUIZ_TABLES_FILE)
+            print(f"🎯 Wrote quiz tables for {len(quiz_tables['distractors'])} kanji")
+        
+        # Append new kanji to the course-code dictionary (existing codes never change)
+        with metrics.stage("kanji_dictionary"):
+            dictionary = update_kanji_dictionary(kanji_data)
+        metrics.wrote("kanji_dictionary", KANJI_DICTIONARY_FILE)
+        print(f"📖 Kanji dictionary v{dictionary['version']}: {len(dictionary['kanji'])} kanji")
+        
+        # Check the output against the cache, the frame lists and the manual tables
+        with metrics.stage("validate"):
+            report = run_validation(output_file, zip_files, zip_files[1])
+        metrics.count("validation_errors", report["summary"]["errors"])
+        print()
+        print_validation_summary(report)
+        print(f"📋 Validation report saved to: {VALIDATION_REPORT_FILE}")
+        
+        # Show sample entries
+        if kanji_data:
+            print("\n📊 Sample entries:")
+            for entry in kanji_data[:3]:
+                print(f"  {entry['heisig_number']}: {entry['kanji']} ({entry['strokeCount']} strokes) - {entry['keyword']}")
     
-    # Show sample entries
-    if kanji_data:
-        print("\n📊 Sample entries:")
-        for entry in kanji_data[:3]:
-            print(f"  {entry['heisig_number']}: {entry['kanji']} ({entry['strokeCount']} strokes) - {entry['keyword']}")
-
+    if args.strict and report["summary"]["errors"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+NDJSON staging file with checkpoints for long extraction runs.
+Finished kanji entries are appended one JSON object per line; every few
+hundred rows the file is fsynced and a checkpoint records the ZIP member
+and row offset reached, so an interrupted run can pick up from there.
+"""
+
+import json
+import os
+from pathlib import Path
+
+STAGING_FILE = Path("scripts/.extract_staging.ndjson")
+CHECKPOINT_VERSION = 1
+# Rows between checkpoints (and per stroke-count fetch batch)
+CHECKPOINT_EVERY = 200
+
+
+def fsync_write_json(path, data):
+    """Write JSON to `path` atomically and make it durable."""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+class ExtractStaging:
+    """
+    Append-only NDJSON staging file plus its checkpoint.
+
+    A checkpoint holds a hash of the input fingerprints, the position of
+    the last staged row ({"zip", "member", "row"}), the number of entries
+    and bytes staged up to that point and the characters that fell back to
+    a default stroke count. Anything written after the last checkpoint is discarded
+    on resume, so a crash mid-line never leaves a torn entry behind.
+    """
+
+    def __init__(self, path=STAGING_FILE):
+        self.path = Path(path)
+        self.checkpoint_path = self.path.with_suffix(".checkpoint.json")
+        self._file = None
+
+    def load_checkpoint(self, inputs):
+        """
+        Return the last checkpoint if it was made from the same `inputs`
+        and the staging file still covers it, else None.
+        """
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            staged_bytes = self.path.stat().st_size
+        except (FileNotFoundError, ValueError):
+            return None
+        if (checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint.get("inputs") != inputs
+                or staged_bytes < checkpoint.get("bytes", 0)):
+            return None
+        return checkpoint
+
+    def open(self, checkpoint=None):
+        """Start a fresh staging file, or continue right after `checkpoint`."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if checkpoint is None:
+            self.checkpoint_path.unlink(missing_ok=True)
+            self._file = open(self.path, 'wb')
+        else:
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(checkpoint["bytes"])
+            self._file.seek(checkpoint["bytes"])
+
+    def append(self, entry):
+        """Stage one finished entry."""
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+        self._file.write(line.encode('utf-8'))
+
+    def checkpoint(self, inputs, position, entries, defaulted):
+        """Make every staged entry durable, then record how far the run got."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        fsync_write_json(self.checkpoint_path, {
+            "version": CHECKPOINT_VERSION,
+            "inputs": inputs,
+            **position,
+            "entries": entries,
+            "bytes": self._file.tell(),
+            "defaulted": defaulted,
+        })
+
+    def close(self):
+        """Close the staging file (staged entries stay on disk)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def iter_entries(self):
+        """Yield every staged entry in the order it was written."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def discard(self):
+        """Remove the staging file and checkpoint after a finished build."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+        self.checkpoint_path.unlink(missing_ok=True)
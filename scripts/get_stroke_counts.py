@@ -4,37 +4,26 @@ Fetch stroke count data from KanjiVG or use cached data.
 This script will try to use web resources or bundled data.
 """
 
-import json
-import urllib.request
-import xml.etree.ElementTree as ET
-
 def get_kanjivg_stroke_count(kanji_char):
     """
     Fetch stroke count from KanjiVG GitHub repository.
     KanjiVG SVG files contain path elements, one per stroke.
     """
+    # Imported here so modules that only want STROKE_COUNT_DB stay quick to load
+    import urllib.request
+    from kanjivg_svg import count_svg_strokes, kanjivg_svg_url
+
     # KanjiVG uses unicode hex codes for filenames
-    unicode_hex = f"{ord(kanji_char):05x}"
-    url = f"https://raw.githubusercontent.com/KanjiVG/kanjivg/master/kanji/{unicode_hex}.svg"
+    url = kanjivg_svg_url(kanji_char)
     
     try:
         with urllib.request.urlopen(url, timeout=5) as response:
             svg_data = response.read().decode('utf-8')
             
-        # Parse SVG and count path elements (each path = one stroke)
-        root = ET.fromstring(svg_data)
-        # Count all path elements in the SVG
-        # KanjiVG uses namespace
-        namespaces = {'svg': 'http://www.w3.org/2000/svg'}
-        paths = root.findall('.//svg:path', namespaces)
-        
-        # If no namespace, try without
-        if not paths:
-            paths = root.findall('.//path')
-        
-        return len(paths)
+        # Count stroke paths the same way as the fetcher and the archive reader
+        return count_svg_strokes(svg_data)
     except Exception as e:
-        print(f"  Warning: Could not fetch KanjiVG data for {kanji_char} ({unicode_hex}): {e}")
+        print(f"  Warning: Could not fetch KanjiVG data for {kanji_char} ({url}): {e}")
         return None
 
 # Create a comprehensive stroke count database
@@ -72,11 +61,17 @@ def get_stroke_count(kanji_char, use_web=False):
     # Default estimate based on complexity
     return 10
 
-def save_stroke_count_db(filename='scripts/stroke_count_cache.json'):
-    """Save the stroke count database to a file."""
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(STROKE_COUNT_DB, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(STROKE_COUNT_DB)} stroke counts to {filename}")
+def save_stroke_count_db():
+    """Merge the stroke count database into the shared stroke count cache."""
+    from stroke_cache import StrokeCountCache
+
+    with StrokeCountCache() as cache:
+        for kanji_char, count in STROKE_COUNT_DB.items():
+            if kanji_char not in cache:
+                cache[kanji_char] = count
+        cache.commit()
+        cache.export_json()
+        print(f"Saved {len(STROKE_COUNT_DB)} stroke counts to {cache.path}")
 
 if __name__ == '__main__':
     # Test
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Schema detection and merging for the Heisig index files.
+Every CSV/TSV member of the index ZIPs is sniffed from its first row:
+files with a header are read by column name, the headerless RTK frame
+lists (INDEX_VOL1.csv, INDEX_MINMAL.csv) by position, and anything else
+(LESSONS.csv, primitive tables) is skipped. Rows are projected onto the
+fields the pipeline uses and merged in one pass with a hash join on the
+character, each field taking its value from the best source that has one.
+Rows are read lazily, but the join holds one record per character until
+the last source has been read.
+"""
+
+import csv
+import io
+import re
+import zipfile
+
+# Sources in the order they are read; the first one decides kanji order (and so ids)
+SCHEMA_ORDER = ("kanji_index", "frame_list")
+
+# Which sources may supply each field, best first. "keywords" is the union of all sources.
+FIELD_PRECEDENCE = {
+    "keyword": ("kanji_index", "frame_list"),
+    "heisig_number": ("kanji_index", "frame_list"),
+    "primitives": ("kanji_index",),
+    "on_reading": ("kanji_index",),
+    "kun_reading": ("kanji_index",),
+    "stroke_count": ("frame_list",),
+}
+
+# Headerless frame lists: frame, kanji, primitive image, keyword, -, stroke count, primitive flag, -
+FRAME_LIST_COLUMNS = {"frame": 0, "kanji": 1, "keyword": 3, "stroke_count": 5, "primitive": 6}
+FRAME_LIST_WIDTH = 7
+FRAME = re.compile(r'^(\d+|P-[\d.]+)$')
+
+
+def parse_primitives(components):
+    """Split a components field on semicolons or commas."""
+    primitives = []
+    if components:
+        # Split on semicolon or comma and clean up
+        separators = [';', ',']
+        for sep in separators:
+            if sep in components:
+                primitives = [p.strip() for p in components.split(sep) if p.strip()]
+                break
+        if not primitives:
+            primitives = [components.strip()]
+    return primitives
+
+
+def split_readings(value):
+    """Split a semicolon-separated reading field into a list."""
+    return [r.strip() for r in value.split(';') if r.strip()]
+
+
+def normalize_row(row):
+    """
+    Turn one header-keyed index row into a record with kanji, keyword,
+    heisig_number and primitives, plus the keyword variants and readings
+    used for search. Returns None for rows without a kanji.
+    """
+    def field(*names):
+        # Try multiple field names; short rows leave missing fields as None
+        for name in names:
+            value = (row.get(name) or '').strip()
+            if value:
+                return value
+        return ''
+
+    kanji_char = field('kanji')
+    if not kanji_char:
+        return None
+
+    return {
+        "kanji": kanji_char,
+        # Prefer 6th edition keyword
+        "keyword": field('keyword_6th_ed', 'keyword_5th_ed', 'keyword'),
+        "heisig_number": field('index', 'id_6th_ed', 'id_5th_ed'),
+        "primitives": parse_primitives(field('components', 'primitives')),
+        "keywords": [k for k in (field('keyword_5th_ed'), field('keyword_6th_ed'), field('keyword')) if k],
+        "on_reading": split_readings(field('on_reading')),
+        "kun_reading": split_readings(field('kun_reading')),
+    }
+
+
+def normalize_frame_row(row):
+    """
+    Project one row of a headerless frame list. Returns None for rows
+    without a kanji and for primitive frames (P-xxx), which are not kanji.
+    """
+    def column(name):
+        index = FRAME_LIST_COLUMNS[name]
+        return row[index].strip() if index < len(row) else ''
+
+    kanji_char = column('kanji')
+    if not kanji_char or column('primitive') or not column('frame').isdigit():
+        return None
+    keyword = column('keyword')
+    stroke_count = column('stroke_count')
+    return {
+        "kanji": kanji_char,
+        "keyword": keyword,
+        "heisig_number": column('frame'),
+        "keywords": [keyword] if keyword else [],
+        "stroke_count": int(stroke_count) if stroke_count.isdigit() else None,
+    }
+
+
+def sniff_schema(first_row):
+    """
+    Name the schema of a file from its first row: "kanji_index" for a
+    header with a kanji column, "frame_list" for a headerless RTK frame
+    list, or None for files that are not kanji indexes.
+    """
+    header = [name.strip() for name in first_row]
+    if 'kanji' in header:
+        return "kanji_index"
+    if (len(first_row) >= FRAME_LIST_WIDTH and FRAME.match(first_row[0].strip())
+            and first_row[FRAME_LIST_COLUMNS['stroke_count']].strip().isdigit()):
+        return "frame_list"
+    return None
+
+
+def iter_source_rows(zip_ref, file_name, delimiter, schema):
+    """Yield (1-based data row number, projected record) for one member of a known schema."""
+    with zip_ref.open(file_name) as raw_file:
+        with io.TextIOWrapper(raw_file, encoding='utf-8', newline='') as data_file:
+            if schema == "kanji_index":
+                rows = (normalize_row(row) for row in csv.DictReader(data_file, delimiter=delimiter))
+            else:
+                rows = (normalize_frame_row(row) for row in csv.reader(data_file, delimiter=delimiter))
+            for row_number, record in enumerate(rows, start=1):
+                if record is not None:
+                    yield row_number, record
+
+
+def plan_sources(zip_paths, verbose=True):
+    """
+    Sniff every CSV/TSV member of the ZIP files and return the kanji
+    sources as (zip_path, file_name, delimiter, schema), in read order:
+    by SCHEMA_ORDER, then in the order the files were found.
+    """
+    sources = []
+    for zip_path in zip_paths:
+        if not zip_path.exists():
+            print(f"⚠️  Warning: {zip_path} not found, skipping...")
+            continue
+
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for file_name in zip_ref.namelist():
+                if not (file_name.endswith('.tsv') or file_name.endswith('.csv')):
+                    continue
+
+                # Determine delimiter based on file extension
+                delimiter = '\t' if file_name.endswith('.tsv') else ','
+                with zip_ref.open(file_name) as raw_file:
+                    with io.TextIOWrapper(raw_file, encoding='utf-8', newline='') as data_file:
+                        first_row = next(csv.reader(data_file, delimiter=delimiter), [])
+                schema = sniff_schema(first_row)
+                if schema is None:
+                    if verbose:
+                        print(f"  ⏭️  Skipping {file_name} (not a kanji index)")
+                    continue
+                if verbose:
+                    print(f"  🔍 {file_name}: {schema}")
+                sources.append((zip_path, file_name, delimiter, schema))
+
+    sources.sort(key=lambda source: SCHEMA_ORDER.index(source[3]))
+    return sources
+
+
+def empty_record(kanji_char):
+    """A merged record before any source has filled it."""
+    return {"kanji": kanji_char, "keyword": "", "heisig_number": "", "primitives": [],
+            "keywords": [], "on_reading": [], "kun_reading": [], "stroke_count": None}
+
+
+def merge_index_sources(zip_paths, verbose=True):
+    """
+    Merge every kanji source in the ZIP files into one record per character.
+
+    A single pass over all rows joins them on the character in a dict.
+    A field is taken from the first source in FIELD_PRECEDENCE that has a
+    value for it; between files of the same schema the file read first wins.
+    Keyword variants are collected from every source. Records are yielded
+    as (position, record) pairs in the order their characters were first
+    seen, where position is the {"zip", "member", "row"} of that first row.
+    Progress is printed unless `verbose` is False.
+
+    This is not a streaming merge: any later source may still fill in a
+    field, so nothing is yielded until every row has been read, and memory
+    grows with the number of distinct characters and the keyword variants
+    they collect (not with the number of rows).
+    """
+    merged = {}
+    ranks = {}
+    for zip_path, file_name, delimiter, schema in plan_sources(zip_paths, verbose):
+        if verbose:
+            print(f"  📄 Reading {file_name}")
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for row_number, record in iter_source_rows(zip_ref, file_name, delimiter, schema):
+                kanji_char = record["kanji"]
+                entry = merged.get(kanji_char)
+                if entry is None:
+                    position = {"zip": zip_path.name, "member": file_name, "row": row_number}
+                    entry = merged[kanji_char] = (position, empty_record(kanji_char))
+                    ranks[kanji_char] = {}
+                target, field_ranks = entry[1], ranks[kanji_char]
+
+                for field, sources in FIELD_PRECEDENCE.items():
+                    value = record.get(field)
+                    if schema not in sources or value in (None, "", []):
+                        continue
+                    rank = sources.index(schema)
+                    if rank < field_ranks.get(field, len(sources)):
+                        target[field] = value
+                        field_ranks[field] = rank
+                for keyword in record.get("keywords", ()):
+                    if keyword not in target["keywords"]:
+                        target["keywords"].append(keyword)
+    # Precedence is settled; drop it before the caller starts building on the records
+    del ranks
+    yield from merged.values()
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+Fixed-record binary store of the kanji entries for maintenance tools.
+scripts/kanji_store.bin holds one fixed-size record per kanji, a direct
+id index and open-addressing hash indexes by character and Heisig
+number, all memory-mapped, so lookups are O(1) and numeric field updates
+are written in place. Strings live in a heap at the end of the file.
+kanji.json is imported when the store is missing or stale and is only
+written back by export_json(). Heisig numbers are not unique in the
+data, so lookups by Heisig number return every matching record.
+"""
+
+import argparse
+import json
+import math
+import mmap
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+from build_manifest import fingerprint_file, load_json_file
+
+KANJI_FILE = Path("public/data/kanji.json")
+KANJI_STORE_FILE = Path("scripts/kanji_store.bin")
+STORE_MAGIC = b"KSTR"
+STORE_VERSION = 2
+
+# Record fields and how they are stored; keys not listed here go to `extra`.
+# u32/i32/f64 are updated in place, str/json point into the string heap.
+FIELDS = (
+    ("id", "u32"),
+    ("kanji", "str"),
+    ("keyword", "str"),
+    ("heisig_number", "str"),
+    ("strokeCount", "i32"),
+    ("primitives", "json"),
+    ("user_story", "str"),
+    ("last_reviewed", "json"),
+    ("ease_factor", "f64"),
+)
+# Fields the indexes are built on; changing them needs a re-import
+KEY_FIELDS = ("id", "kanji", "heisig_number")
+
+FIELD_FORMATS = {"u32": "I", "i32": "i", "f64": "d", "str": "II", "json": "II"}
+NULL_I32 = -2 ** 31
+NULL_LENGTH = 0xFFFFFFFF
+EMPTY_SLOT = 0xFFFFFFFF
+# The heap grows by at least this much when an update does not fit
+HEAP_GROWTH = 64 * 1024
+
+# magic, version, flags, record count, id index size, hash table size, metadata ref, heap end
+HEADER = struct.Struct("<4sHHIIIIIQ")
+# Per-record: the FIELDS, then the key-order layout number, a bit per f64 field
+# that holds an int (so 2 stays 2 rather than coming back as 2.0) and the `extra` ref
+RECORD = struct.Struct("<" + "".join(FIELD_FORMATS[kind] for _, kind in FIELDS) + "HBII")
+SLOT = struct.Struct("<I")
+FLAG_DIRTY = 1
+
+
+def fnv1a(text):
+    """32-bit FNV-1a hash of a string, stable across runs (unlike hash())."""
+    value = 0x811C9DC5
+    for byte in text.encode('utf-8'):
+        value = ((value ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return value
+
+
+def field_offsets():
+    """Byte offset of every field (and the layout/extra slots) inside a record."""
+    offsets = {}
+    offset = 0
+    for name, kind in FIELDS:
+        offsets[name] = offset
+        offset += struct.calcsize("<" + FIELD_FORMATS[kind])
+    offsets["_layout"] = offset
+    offsets["_ints"] = offset + 2
+    offsets["_extra"] = offset + 3
+    return offsets
+
+
+FIELD_OFFSETS = field_offsets()
+FIELD_KINDS = dict(FIELDS)
+# Bit of each f64 field in a record's int flags
+INT_BITS = {name: 1 << bit for bit, name in enumerate(name for name, kind in FIELDS if kind == "f64")}
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def build_store(kanji_list, path=KANJI_STORE_FILE, source=None):
+    """
+    Write a new store for `kanji_list`. `source` is the fingerprint of the
+    kanji.json it came from, used to tell when the store is stale.
+    """
+    heap = bytearray()
+    layouts = []
+    layout_of = {}
+
+    def heap_ref(data):
+        offset = len(heap)
+        heap.extend(data)
+        return offset, len(data)
+
+    def encode(kind, value):
+        if kind == "u32":
+            return (value,)
+        if kind == "i32":
+            return (NULL_I32 if value is None else value,)
+        if kind == "f64":
+            return (math.nan if value is None else value,)
+        if value is None:
+            return 0, NULL_LENGTH
+        text = value if kind == "str" else json.dumps(value, ensure_ascii=False)
+        return heap_ref(text.encode('utf-8'))
+
+    records = bytearray()
+    for entry in kanji_list:
+        keys = tuple(entry)
+        if keys not in layout_of:
+            layout_of[keys] = len(layouts)
+            layouts.append(list(keys))
+        values = []
+        for name, kind in FIELDS:
+            values.extend(encode(kind, entry.get(name)))
+        extra = {key: value for key, value in entry.items() if key not in FIELD_KINDS}
+        values.append(layout_of[keys])
+        values.append(sum(bit for name, bit in INT_BITS.items() if is_int(entry.get(name))))
+        values.extend(encode("json", extra) if extra else (0, NULL_LENGTH))
+        records += RECORD.pack(*values)
+
+    count = len(kanji_list)
+    id_size = max((entry['id'] for entry in kanji_list), default=0) + 1
+    hash_size = 1 << max(4, (count * 2 - 1).bit_length())
+    id_index = [EMPTY_SLOT] * id_size
+    kanji_index = [EMPTY_SLOT] * hash_size
+    heisig_index = [EMPTY_SLOT] * hash_size
+    for slot, entry in enumerate(kanji_list):
+        id_index[entry['id']] = slot
+        for table, key in ((kanji_index, entry['kanji']), (heisig_index, entry.get('heisig_number'))):
+            if not key:
+                continue
+            bucket = fnv1a(key) & (hash_size - 1)
+            while table[bucket] != EMPTY_SLOT:
+                bucket = (bucket + 1) & (hash_size - 1)
+            table[bucket] = slot
+
+    metadata = json.dumps({"layouts": layouts, "source": source}, ensure_ascii=False).encode('utf-8')
+    metadata_ref = heap_ref(metadata)
+    body = records
+    for table in (id_index, kanji_index, heisig_index):
+        body += struct.pack(f"<{len(table)}I", *table)
+    heap_start = HEADER.size + len(body)
+    header = HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, count, id_size, hash_size,
+                         metadata_ref[0], metadata_ref[1], heap_start + len(heap))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+        f.write(heap)
+    tmp_path.replace(path)
+
+
+class KanjiStore:
+    """
+    Memory-mapped kanji records with O(1) lookups and in-place updates.
+
+    Records are addressed by slot (their position in kanji.json); the
+    slot_of_* methods find one by id or character, slots_of_heisig all
+    records with a Heisig number. Numeric
+    fields are overwritten in place; string and list fields are appended to
+    the heap and their reference updated. The first update marks the store
+    dirty until the next export_json().
+    """
+
+    def __init__(self, path=KANJI_STORE_FILE):
+        self.path = Path(path)
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        (magic, version, self._flags, self._count, self._id_size, self._hash_size,
+         metadata_offset, metadata_length, self._heap_end) = HEADER.unpack_from(self._map, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a version {STORE_VERSION} kanji store")
+        self._records = HEADER.size
+        self._id_index = self._records + self._count * RECORD.size
+        self._kanji_index = self._id_index + self._id_size * SLOT.size
+        self._heisig_index = self._kanji_index + self._hash_size * SLOT.size
+        self._heap = self._heisig_index + self._hash_size * SLOT.size
+        self._metadata_ref = (metadata_offset, metadata_length)
+        self._metadata = json.loads(self._text(metadata_offset, metadata_length))
+        self._layouts = [tuple(keys) for keys in self._metadata["layouts"]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def dirty(self):
+        """True if the store has updates that are not in kanji.json yet."""
+        return bool(self._flags & FLAG_DIRTY)
+
+    @property
+    def source(self):
+        """Fingerprint of the kanji.json the store was imported from or last exported to."""
+        return self._metadata["source"]
+
+    def _text(self, offset, length):
+        start = self._heap + offset
+        return self._map[start:start + length].decode('utf-8')
+
+    def _probe(self, table, name, key):
+        """Every slot whose `name` equals `key`, in slot order."""
+        if not key:
+            return []
+        mask = self._hash_size - 1
+        bucket = fnv1a(key) & mask
+        slots = []
+        # Equal keys share a probe sequence, which ends at the first empty bucket
+        while True:
+            (slot,) = SLOT.unpack_from(self._map, table + bucket * SLOT.size)
+            if slot == EMPTY_SLOT:
+                return sorted(slots)
+            if self.field(slot, name) == key:
+                slots.append(slot)
+            bucket = (bucket + 1) & mask
+
+    def slot_of_id(self, kanji_id):
+        """Slot of the record with this id, or None."""
+        if not 0 <= kanji_id < self._id_size:
+            return None
+        (slot,) = SLOT.unpack_from(self._map, self._id_index + kanji_id * SLOT.size)
+        return None if slot == EMPTY_SLOT else slot
+
+    def slot_of_kanji(self, kanji_char):
+        """Slot of the record for this character, or None."""
+        slots = self._probe(self._kanji_index, "kanji", kanji_char)
+        return slots[0] if slots else None
+
+    def slots_of_heisig(self, heisig_number):
+        """
+        Slots of every record with this Heisig number (compared as a
+        string), in slot order. Frames can repeat in kanji.json (see the
+        frame_duplicate check in validate_kanji_data.py), so this may
+        return more than one slot, or none.
+        """
+        return self._probe(self._heisig_index, "heisig_number", str(heisig_number))
+
+    def _record_offset(self, slot):
+        if not 0 <= slot < self._count:
+            raise IndexError(f"no kanji record in slot {slot}")
+        return self._records + slot * RECORD.size
+
+    def _extra(self, base):
+        offset, length = struct.unpack_from("<II", self._map, base + FIELD_OFFSETS["_extra"])
+        return {} if length == NULL_LENGTH else json.loads(self._text(offset, length))
+
+    def field(self, slot, name):
+        """Value of one field of a record (None if the record does not have it)."""
+        base = self._record_offset(slot)
+        kind = FIELD_KINDS.get(name)
+        if kind is None:
+            return self._extra(base).get(name)
+        values = struct.unpack_from("<" + FIELD_FORMATS[kind], self._map, base + FIELD_OFFSETS[name])
+        if kind == "u32":
+            return values[0]
+        if kind == "i32":
+            return None if values[0] == NULL_I32 else values[0]
+        if kind == "f64":
+            if math.isnan(values[0]):
+                return None
+            (ints,) = struct.unpack_from("<B", self._map, base + FIELD_OFFSETS["_ints"])
+            return int(values[0]) if ints & INT_BITS[name] else values[0]
+        offset, length = values
+        if length == NULL_LENGTH:
+            return None
+        text = self._text(offset, length)
+        return text if kind == "str" else json.loads(text)
+
+    def record(self, slot):
+        """One record as the dict it is in kanji.json (same key order)."""
+        (layout,) = struct.unpack_from("<H", self._map,
+                                       self._record_offset(slot) + FIELD_OFFSETS["_layout"])
+        return {name: self.field(slot, name) for name in self._layouts[layout]}
+
+    def __iter__(self):
+        for slot in range(self._count):
+            yield self.record(slot)
+
+    def _append_heap(self, data):
+        """Append bytes to the string heap, growing the file if needed; returns (offset, length)."""
+        end = self._heap_end + len(data)
+        if end > len(self._map):
+            self._map.close()
+            self._file.truncate(max(end, self._heap_end + HEAP_GROWTH))
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map[self._heap_end:end] = data
+        offset = self._heap_end - self._heap
+        self._heap_end = end
+        return offset, len(data)
+
+    def _write_header(self, metadata_changed=False):
+        if metadata_changed:
+            self._metadata["layouts"] = [list(keys) for keys in self._layouts]
+            metadata = json.dumps(self._metadata, ensure_ascii=False).encode('utf-8')
+            self._metadata_ref = self._append_heap(metadata)
+        HEADER.pack_into(self._map, 0, STORE_MAGIC, STORE_VERSION, self._flags, self._count,
+                         self._id_size, self._hash_size, *self._metadata_ref, self._heap_end)
+
+    def set_field(self, slot, name, value):
+        """
+        Update one field of a record in place. Key fields (id, kanji,
+        heisig_number) are indexed and cannot be changed; re-import instead.
+        """
+        if name in KEY_FIELDS:
+            raise ValueError(f"{name} is an indexed key field and cannot be updated in place")
+        base = self._record_offset(slot)
+        kind = FIELD_KINDS.get(name)
+        if kind == "i32" and value is not None and not isinstance(value, int):
+            raise ValueError(f"{name} must be an integer or None")
+        if kind == "f64" and value is not None and not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number or None")
+
+        # A key the record did not have is added at the end, as dict assignment would
+        (layout,) = struct.unpack_from("<H", self._map, base + FIELD_OFFSETS["_layout"])
+        metadata_changed = False
+        if name not in self._layouts[layout]:
+            keys = self._layouts[layout] + (name,)
+            if keys not in self._layouts:
+                self._layouts.append(keys)
+                metadata_changed = True
+            struct.pack_into("<H", self._map, base + FIELD_OFFSETS["_layout"],
+                             self._layouts.index(keys))
+
+        if kind is None:
+            extra = self._extra(base)
+            extra[name] = value
+            data = json.dumps(extra, ensure_ascii=False).encode('utf-8')
+            # Append first: growing the heap replaces self._map
+            ref = self._append_heap(data)
+            struct.pack_into("<II", self._map, base + FIELD_OFFSETS["_extra"], *ref)
+        elif kind == "u32":
+            struct.pack_into("<I", self._map, base + FIELD_OFFSETS[name], value)
+        elif kind == "i32":
+            struct.pack_into("<i", self._map, base + FIELD_OFFSETS[name],
+                             NULL_I32 if value is None else value)
+        elif kind == "f64":
+            struct.pack_into("<d", self._map, base + FIELD_OFFSETS[name],
+                             math.nan if value is None else value)
+            (ints,) = struct.unpack_from("<B", self._map, base + FIELD_OFFSETS["_ints"])
+            ints = ints | INT_BITS[name] if is_int(value) else ints & ~INT_BITS[name]
+            struct.pack_into("<B", self._map, base + FIELD_OFFSETS["_ints"], ints)
+        else:
+            if value is None:
+                ref = (0, NULL_LENGTH)
+            else:
+                text = value if kind == "str" else json.dumps(value, ensure_ascii=False)
+                ref = self._append_heap(text.encode('utf-8'))
+            struct.pack_into("<II", self._map, base + FIELD_OFFSETS[name], *ref)
+
+        self._flags |= FLAG_DIRTY
+        self._write_header(metadata_changed)
+
+    def export_json(self, path=KANJI_FILE):
+        """Write every record to `path` as kanji.json (atomically) and mark the store clean."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self), f, ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+        self._metadata["source"] = fingerprint_file(path)
+        self._flags &= ~FLAG_DIRTY
+        self._write_header(metadata_changed=True)
+        self.flush()
+
+    def flush(self):
+        """Make all updates durable."""
+        self._map.flush()
+
+    def close(self):
+        """Flush and unmap the store."""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+
+def open_store(kanji_path=KANJI_FILE, path=KANJI_STORE_FILE):
+    """
+    Open the store, importing `kanji_path` first if the store is missing,
+    unreadable or older than the file. Raises ValueError if kanji.json
+    changed while the store still holds updates that were never exported.
+    """
+    source = fingerprint_file(kanji_path)
+    if path.exists():
+        try:
+            store = KanjiStore(path)
+        except (ValueError, struct.error):
+            store = None
+        if store is not None:
+            if store.source == source:
+                return store
+            dirty = store.dirty
+            store.close()
+            if dirty:
+                raise ValueError(f"{kanji_path} changed while {path} has updates that were not "
+                                 f"exported; export them first or delete {path} to discard them")
+
+    _, kanji_list = load_json_file(kanji_path)
+    build_store(kanji_list, path, source)
+    return KanjiStore(path)
+
+
+def find_slots(store, key):
+    """Slots for a character, an id (#123) or a Heisig number (which may repeat)."""
+    if key.startswith("#") and key[1:].isdigit():
+        slot = store.slot_of_id(int(key[1:]))
+        return [] if slot is None else [slot]
+    slot = store.slot_of_kanji(key)
+    return store.slots_of_heisig(key) if slot is None else [slot]
+
+
+def check_round_trip(kanji_path=KANJI_FILE):
+    """
+    Import `kanji_path` into a fresh store in a temporary directory, check
+    that exporting it gives the same list back and that every Heisig
+    number finds all of its records. Then add a key no record has and set
+    an int ease_factor, and check both read back unchanged through field()
+    and export_json().
+    Returns a list of failure messages (empty if all is well).
+    """
+    _, kanji_list = load_json_file(kanji_path)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_path = Path(tmp_dir) / "kanji_store.bin"
+        export_path = Path(tmp_dir) / "kanji.json"
+        build_store(kanji_list, store_path)
+        with KanjiStore(store_path) as store:
+            store.export_json(export_path)
+            with open(export_path, 'r', encoding='utf-8') as f:
+                if json.load(f) != kanji_list:
+                    failures.append("export of an unmodified store differs from the input")
+            slots_by_frame = {}
+            for slot, entry in enumerate(kanji_list):
+                if entry.get('heisig_number'):
+                    slots_by_frame.setdefault(entry['heisig_number'], []).append(slot)
+            for frame, slots in slots_by_frame.items():
+                if store.slots_of_heisig(frame) != slots:
+                    failures.append(f"Heisig number {frame} finds slots "
+                                    f"{store.slots_of_heisig(frame)} instead of {slots}")
+
+            # A fresh store's file ends at the heap end, so this grows the heap
+            store.set_field(0, "check_note", "round trip")
+            if store.field(0, "check_note") != "round trip":
+                failures.append("a new key does not read back through field()")
+            store.set_field(0, "ease_factor", 3)
+            if repr(store.field(0, "ease_factor")) != "3":
+                failures.append("an int ease_factor does not read back as an int")
+            store.export_json(export_path)
+            with open(export_path, 'r', encoding='utf-8') as f:
+                exported = json.load(f)
+            expected = {**kanji_list[0], "ease_factor": 3, "check_note": "round trip"}
+            if json.dumps(exported[0]) != json.dumps(expected):
+                failures.append("a new key or an int ease_factor does not survive export_json()")
+            if exported[1:] != kanji_list[1:]:
+                failures.append("updating one record changed other records")
+    return failures
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Inspect, patch and export the binary kanji store.")
+    parser.add_argument("keys", nargs="*", metavar="KEY",
+                        help="records to show: a character, a Heisig number or #id")
+    parser.add_argument("--set", nargs=2, action="append", default=[], metavar=("FIELD", "JSON"),
+                        help="set FIELD to a JSON value on every KEY (repeatable)")
+    parser.add_argument("--export", action="store_true",
+                        help=f"write the store back to {KANJI_FILE}")
+    parser.add_argument("--rebuild", action="store_true",
+                        help=f"re-import {KANJI_FILE}, discarding updates that were not exported")
+    parser.add_argument("--check", action="store_true",
+                        help=f"round-trip {KANJI_FILE} through a temporary store and report differences")
+    args = parser.parse_args()
+
+    if not KANJI_FILE.exists():
+        print("❌ Error: kanji.json not found")
+        return
+    if args.check:
+        failures = check_round_trip()
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            sys.exit(1)
+        print("✅ Store round trip matches kanji.json")
+        return
+    if args.rebuild:
+        KANJI_STORE_FILE.unlink(missing_ok=True)
+
+    try:
+        store = open_store()
+    except ValueError as error:
+        print(f"❌ Error: {error}")
+        return
+
+    with store:
+        state = "with unexported updates" if store.dirty else "in sync with kanji.json"
+        print(f"🗄️  {KANJI_STORE_FILE}: {len(store)} records, "
+              f"{KANJI_STORE_FILE.stat().st_size / 1024:.0f} KB, {state}")
+        for key in args.keys:
+            slots = find_slots(store, key)
+            if not slots:
+                print(f"  ⚠️  No record for {key}")
+            elif len(slots) > 1:
+                print(f"  ⚠️  {len(slots)} records share Heisig number {key}")
+            for slot in slots:
+                for name, value in args.set:
+                    store.set_field(slot, name, json.loads(value))
+                print(f"  {json.dumps(store.record(slot), ensure_ascii=False)}")
+        if args.export:
+            store.export_json()
+            print(f"💾 Exported {len(store)} records to {KANJI_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Read stroke counts straight from a downloaded KanjiVG release archive.
+Supports .zip and .tar(.gz/.bz2/.xz) releases without extracting them,
+so stroke counts can be built on machines with no network access.
+"""
+
+import re
+import tarfile
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from kanjivg_svg import is_stroke_number, is_stroke_path, stroke_number_position
+
+# Matches kanji/04e00.svg but not variants such as kanji/04e00-Kaisho.svg
+KANJI_SVG_NAME = re.compile(r'(?:^|/)kanji/([0-9a-f]{4,6})\.svg$')
+
+
+def kanji_from_member_name(name):
+    """Return the character a KanjiVG member describes, or None."""
+    match = KANJI_SVG_NAME.search(name)
+    if not match:
+        return None
+    return chr(int(match.group(1), 16))
+
+
+def count_strokes_iterparse(svg_file):
+    """
+    Stream-parse a KanjiVG SVG and count its stroke paths, exactly as
+    kanjivg_svg.count_svg_strokes does.
+    Returns the number of strokes, or None if the SVG has no paths.
+    """
+    count = 0
+    for _, elem in ET.iterparse(svg_file, events=('end',)):
+        if is_stroke_path(elem):
+            count += 1
+        elem.clear()
+    return count or None
+
+
+def read_strokes_iterparse(svg_file):
+    """
+    Stream-parse a KanjiVG SVG into stripped stroke data.
+    Returns {"d": [...], "n": [[x, y], ...]} like kanjivg_svg.parse_svg_strokes,
+    or None if the SVG has no paths.
+    """
+    strokes = []
+    numbers = []
+    for _, elem in ET.iterparse(svg_file, events=('end',)):
+        if is_stroke_path(elem):
+            strokes.append(elem.get('d'))
+        elif is_stroke_number(elem):
+            position = stroke_number_position(elem.get('transform'))
+            if position:
+                numbers.append(position)
+        elem.clear()
+    return {"d": strokes, "n": numbers} if strokes else None
+
+
+def iter_archive_svgs(archive_path):
+    """
+    Yield (kanji_char, file_object) for every base kanji SVG in an archive.
+    Tarballs are read as a stream, so compressed releases need one pass only.
+    """
+    archive_path = Path(archive_path)
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                kanji_char = kanji_from_member_name(info.filename)
+                if kanji_char is None or info.is_dir():
+                    continue
+                with zip_ref.open(info) as svg_file:
+                    yield kanji_char, svg_file
+        return
+
+    with tarfile.open(archive_path, 'r|*') as tar_ref:
+        for member in tar_ref:
+            if not member.isfile():
+                continue
+            kanji_char = kanji_from_member_name(member.name)
+            if kanji_char is None:
+                continue
+            svg_file = tar_ref.extractfile(member)
+            if svg_file is None:
+                continue
+            with svg_file:
+                yield kanji_char, svg_file
+
+
+def load_stroke_counts_from_archive(archive_path, cache, wanted=None, keep_strokes=False):
+    """
+    Fill `cache` with stroke counts from a KanjiVG release archive.
+
+    If `wanted` is given, only those characters are parsed; everything else
+    in the archive is skipped without being decompressed by the XML parser.
+    With `keep_strokes`, stripped stroke paths are stored too (via
+    cache.set_strokes). Returns the number of characters added to the cache.
+    """
+    added = 0
+    for kanji_char, svg_file in iter_archive_svgs(archive_path):
+        if wanted is not None and kanji_char not in wanted:
+            continue
+        if kanji_char in cache and (not keep_strokes or cache.has_strokes(kanji_char)):
+            continue
+        try:
+            if keep_strokes:
+                strokes = read_strokes_iterparse(svg_file)
+                count = len(strokes["d"]) if strokes else None
+            else:
+                count = count_strokes_iterparse(svg_file)
+        except ET.ParseError:
+            continue
+        if count is not None:
+            if kanji_char not in cache:
+                added += 1
+            cache[kanji_char] = count
+            if keep_strokes:
+                cache.set_strokes(kanji_char, strokes)
+    return added
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Concurrent stroke-count fetcher for KanjiVG SVG files.
+Runs lookups on a bounded thread pool behind an adaptive token-bucket
+rate limiter, with exponential backoff that honors Retry-After. Requests
+reuse keep-alive connections, refreshes are conditional (ETag /
+Last-Modified), and missing characters are negatively cached.
+"""
+
+import gzip
+import http.client
+import queue
+import threading
+import time
+import random
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from build_metrics import BuildMetrics
+from kanjivg_svg import KANJIVG_BASE_URL, count_svg_strokes, kanjivg_svg_url, parse_svg_strokes
+
+# HTTP statuses that mean "slow down and try again" rather than "not found"
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+# How long a failed lookup is remembered: a 404 is a real answer, a lookup
+# that ran out of retries is probably a transient outage
+NEGATIVE_TTL = 7 * 24 * 3600
+TRANSIENT_NEGATIVE_TTL = 3600
+# --refresh revalidates cached counts last checked longer ago than this
+REVALIDATE_AFTER = 30 * 24 * 3600
+# Counts imported from the legacy JSON cache have no validators, so --refresh
+# must download their whole SVG; at most this many are refreshed per run
+UNVALIDATED_REFRESH_LIMIT = 100
+
+# Errors that mean a kept-alive connection was closed under us
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                           ConnectionResetError, BrokenPipeError)
+
+# Outcome of one HTTP request: status, body, ETag, Last-Modified, Retry-After
+Response = namedtuple("Response", "status body etag last_modified retry_after")
+# Outcome of one character lookup, handed back to the thread that owns the cache
+Lookup = namedtuple("Lookup", "count strokes response")
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date).
+    Returns the delay in seconds, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections, one pool per host.
+
+    Each request borrows an idle connection (or opens one), reads the whole
+    response and returns the connection unless the server asked to close
+    it. A request on a reused connection that the server already closed is
+    replayed once on a fresh connection.
+    """
+
+    def __init__(self, max_per_host=8, timeout=10, metrics=None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.metrics = metrics if metrics is not None else BuildMetrics()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, key):
+        with self._lock:
+            if key not in self._idle:
+                self._idle[key] = queue.LifoQueue(maxsize=self.max_per_host)
+            return self._idle[key]
+
+    def _connect(self, scheme, host, port):
+        self.metrics.count("http_connections_opened")
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def request(self, url, headers=None):
+        """GET `url` and return a Response. Raises OSError/HTTPException on network errors."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = {"Accept-Encoding": "gzip", **(headers or {})}
+        idle = self._queue(key)
+
+        for attempt in range(2):
+            try:
+                conn, reused = idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(*key), False
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                try:
+                    idle.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+            if response.getheader("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return Response(response.status, body, response.getheader("ETag"),
+                            response.getheader("Last-Modified"),
+                            response.getheader("Retry-After"))
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for idle in pools:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with additive-increase/multiplicative-decrease
+    rate adaptation. Throttled responses halve the rate; successes slowly
+    raise it back towards the configured maximum.
+    """
+
+    def __init__(self, rate=10.0, capacity=None, min_rate=0.5):
+        self.max_rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.rate = self.max_rate
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, cancelled=None):
+        """
+        Block until a token is available, then consume it. Returns False
+        without a token if `cancelled` (a threading.Event) is set meanwhile.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                else:
+                    wait = (1.0 - self._tokens) / self.rate
+            if cancelled is None:
+                time.sleep(wait)
+            elif cancelled.wait(wait):
+                return False
+
+    def on_success(self):
+        """Additively raise the rate after a successful request."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttle(self, retry_after=None):
+        """Halve the rate and, if the server asked, pause every worker."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+
+class StrokeCountFetcher:
+    """
+    Fetch KanjiVG stroke counts for many characters at once.
+
+    Lookups run on a thread pool of `max_workers`; every request first takes
+    a token from a shared TokenBucket. Failed requests back off
+    exponentially (with jitter), using Retry-After when the server sends it.
+    Only the calling thread writes to `cache`, so plain dicts are safe.
+
+    With `keep_strokes`, the stripped stroke paths of every downloaded SVG
+    are kept as well (via cache.set_strokes). With `require_strokes`,
+    characters whose count is cached but whose strokes are not are fetched
+    again. Both need a StrokeCountCache rather than a plain dict.
+
+    Requests share a keep-alive ConnectionPool. With a StrokeCountCache,
+    every download also stores its ETag/Last-Modified, and failed lookups
+    are remembered for `negative_ttl` seconds (or TRANSIENT_NEGATIVE_TTL
+    when retries ran out) instead of being fetched again on every run.
+    With `refresh`, cached counts last checked more than `revalidate_after`
+    seconds ago are revalidated with conditional requests; a 304 keeps the
+    cached count. Counts without stored validators can only be refreshed by
+    a full download, so at most `unvalidated_limit` of them are refreshed
+    per fetcher and the rest wait for a later run.
+
+    The pool stays open across fetch_many calls; close() the fetcher (or
+    use it as a context manager) when done.
+
+    Request latencies, retries, rate-limit waits and backoff sleeps are
+    recorded on `metrics` (a BuildMetrics).
+    """
+
+    def __init__(self, cache, max_workers=8, rate=10.0, retry_count=3,
+                 base_url=KANJIVG_BASE_URL, timeout=10, backoff_base=0.5,
+                 backoff_max=30.0, keep_strokes=False, require_strokes=False, metrics=None,
+                 refresh=False, revalidate_after=REVALIDATE_AFTER, negative_ttl=NEGATIVE_TTL,
+                 unvalidated_limit=UNVALIDATED_REFRESH_LIMIT):
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else BuildMetrics()
+        self.refresh = refresh
+        self.revalidate_after = revalidate_after
+        self.unvalidated_limit = unvalidated_limit
+        self.unvalidated_refreshes = 0
+        self.negative_ttl = negative_ttl
+        # Plain dict caches have nowhere to keep validators or misses
+        self.http_cache = hasattr(cache, "mark_missing")
+        self.keep_strokes = keep_strokes or require_strokes
+        self.require_strokes = require_strokes
+        self.max_workers = max_workers
+        self.retry_count = retry_count
+        self.base_url = base_url
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate=rate)
+        self.pool = ConnectionPool(max_per_host=max_workers, timeout=timeout, metrics=self.metrics)
+        # Set on Ctrl-C so workers stop waiting for tokens and backoff sleeps
+        self._cancelled = threading.Event()
+
+    def close(self):
+        """Close the kept-alive connections."""
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        delay = self.backoff_base * (2 ** attempt)
+        return min(self.backoff_max, delay * random.uniform(0.5, 1.5))
+
+    def _download(self, kanji_char, validators=None):
+        url = kanjivg_svg_url(kanji_char, self.base_url)
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        start = time.perf_counter()
+        try:
+            return self.pool.request(url, headers)
+        finally:
+            self.metrics.observe_latency("http", time.perf_counter() - start)
+
+    def _fetch(self, kanji_char, validators=None):
+        """
+        Request the SVG for one character, retrying transient errors.
+        Returns the final Response, or None if every attempt hit a network error.
+        """
+        metrics = self.metrics
+        response = None
+        for attempt in range(self.retry_count):
+            with metrics.timer("rate_limit_wait"):
+                acquired = self.bucket.acquire(self._cancelled)
+            if not acquired:
+                return response
+            metrics.count("http_requests")
+            if attempt:
+                metrics.count("http_retries")
+            retry_after = None
+            try:
+                response = self._download(kanji_char, validators)
+            except (OSError, http.client.HTTPException):
+                metrics.count("http_network_errors")
+                response = None
+            else:
+                metrics.count(f"http_{response.status}")
+                if response.status not in RETRYABLE_STATUSES:
+                    # Success, 304, or 404 and friends that will not change on retry
+                    self.bucket.on_success()
+                    return response
+                retry_after = parse_retry_after(response.retry_after)
+                if response.status in THROTTLE_STATUSES:
+                    metrics.count("http_throttled")
+                    self.bucket.on_throttle(retry_after)
+
+            if attempt < self.retry_count - 1:
+                with metrics.timer("backoff_sleep"):
+                    if self._cancelled.wait(self._backoff_delay(attempt, retry_after)):
+                        return response
+
+        metrics.count("http_gave_up")
+        return response
+
+    def fetch_svg(self, kanji_char):
+        """
+        Download the KanjiVG SVG for one character, retrying transient errors.
+        Returns the SVG bytes, or None if unavailable.
+        """
+        response = self._fetch(kanji_char)
+        return response.body if response is not None and response.status == 200 else None
+
+    def fetch_one(self, kanji_char):
+        """
+        Fetch the stroke count for one character without touching the cache.
+        Returns the number of strokes, or None if unavailable.
+        """
+        return self._lookup(kanji_char).count
+
+    def _lookup(self, kanji_char, validators=None):
+        """Fetch and parse one character. Returns a Lookup."""
+        response = self._fetch(kanji_char, validators)
+        if response is None or response.status != 200:
+            return Lookup(None, None, response)
+        try:
+            with self.metrics.timer("svg_parse"):
+                if self.keep_strokes:
+                    strokes = parse_svg_strokes(response.body)
+                    return Lookup((len(strokes["d"]) if strokes else None), strokes, response)
+                return Lookup(count_svg_strokes(response.body), None, response)
+        except ET.ParseError:
+            self.metrics.count("svg_parse_errors")
+            return Lookup(None, None, response)
+
+    def _is_done(self, kanji_char):
+        if kanji_char not in self.cache:
+            return False
+        return not self.require_strokes or self.cache.has_strokes(kanji_char)
+
+    def _needs_revalidation(self, kanji_char):
+        """True if --refresh should ask the server whether a cached SVG changed."""
+        if not (self.refresh and self.http_cache):
+            return False
+        validators = self.cache.get_validators(kanji_char)
+        if validators is not None:
+            return time.time() - validators["checked_at"] > self.revalidate_after
+        # No validators: only a full download can tell, so ration those
+        if self.unvalidated_refreshes >= self.unvalidated_limit:
+            self.metrics.count("revalidations_deferred")
+            return False
+        self.unvalidated_refreshes += 1
+        return True
+
+    def _store(self, kanji_char, lookup):
+        """Write one lookup's outcome to the cache. Returns the resulting count."""
+        response = lookup.response
+        if response is not None and response.status == 304:
+            # Unchanged upstream: keep the cached count, just note the check
+            self.metrics.count("revalidated_unchanged")
+            self.cache.set_validators(kanji_char, response.etag, response.last_modified)
+            return self.cache.get(kanji_char)
+
+        count = lookup.count
+        if count is None:
+            # Keep a count we already had if only the strokes were missing
+            count = self.cache.get(kanji_char)
+        if lookup.count is not None:
+            self.cache[kanji_char] = lookup.count
+            if self.http_cache:
+                self.cache.set_validators(kanji_char, response.etag, response.last_modified)
+        elif count is None and self.http_cache:
+            definitive = response is not None and response.status not in RETRYABLE_STATUSES
+            self.cache.mark_missing(kanji_char, response.status if response else None,
+                                    self.negative_ttl if definitive else TRANSIENT_NEGATIVE_TTL)
+        if lookup.strokes is not None:
+            self.cache.set_strokes(kanji_char, lookup.strokes)
+        return count
+
+    def fetch_many(self, kanji_chars, progress=None):
+        """
+        Fetch stroke counts for every character not already cached.
+
+        Returns a dict mapping each requested character to its stroke count
+        (or None). Successful lookups are stored in the cache. `progress`, if
+        given, is called as progress(done, total) after each network lookup.
+        """
+        results = {}
+        pending = []
+        counts = {"cache_hits": 0, "cache_misses": 0, "negative_cache_hits": 0, "revalidations": 0}
+        for kanji_char in kanji_chars:
+            if kanji_char in results:
+                continue
+            if self._is_done(kanji_char):
+                results[kanji_char] = self.cache[kanji_char]
+                if self._needs_revalidation(kanji_char):
+                    counts["revalidations"] += 1
+                    pending.append((kanji_char, self.cache.get_validators(kanji_char) or {}))
+                else:
+                    counts["cache_hits"] += 1
+            elif self.http_cache and self.cache.is_missing(kanji_char):
+                results[kanji_char] = None
+                counts["negative_cache_hits"] += 1
+            else:
+                results[kanji_char] = None
+                counts["cache_misses"] += 1
+                pending.append((kanji_char, None))
+
+        for name, value in counts.items():
+            self.metrics.count(name, value)
+        if not pending:
+            return results
+
+        self._cancelled.clear()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._lookup, c, validators): c
+                       for c, validators in pending}
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    kanji_char = futures[future]
+                    results[kanji_char] = self._store(kanji_char, future.result())
+                    if progress:
+                        progress(done, len(pending))
+            except KeyboardInterrupt:
+                # Drop the queued lookups instead of letting the executor drain them;
+                # running ones give up at their next wait
+                self._cancelled.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        return results
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Where KanjiVG keeps its SVG files and how to read them.
+Shared by the network fetcher and the offline archive reader, and kept
+free of HTTP imports so archive-only runs start quickly.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+KANJIVG_BASE_URL = "https://raw.githubusercontent.com/KanjiVG/kanjivg/master/kanji"
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+# Stroke-number labels are positioned with transform="matrix(1 0 0 1 x y)"
+MATRIX_TRANSLATE = re.compile(r'matrix\(\s*1\s+0\s+0\s+1\s+([-\d.]+)\s+([-\d.]+)\s*\)')
+
+
+def kanjivg_svg_url(kanji_char, base_url=KANJIVG_BASE_URL):
+    """Build the KanjiVG SVG URL for a character."""
+    unicode_hex = f"{ord(kanji_char):05x}"
+    return f"{base_url.rstrip('/')}/{unicode_hex}.svg"
+
+
+def is_stroke_path(elem):
+    """
+    True if an element is one stroke: a <path> (with or without the SVG
+    namespace) that has path data. Every stroke reader counts with this.
+    """
+    return elem.tag in (SVG_NS + 'path', 'path') and bool(elem.get('d'))
+
+
+def is_stroke_number(elem):
+    """True if an element is a stroke-number <text> label."""
+    return elem.tag in (SVG_NS + 'text', 'text')
+
+
+def count_svg_strokes(svg_data):
+    """
+    Count stroke paths in a KanjiVG SVG document.
+    Returns the number of strokes, or None if the SVG has no paths.
+    """
+    root = ET.fromstring(svg_data)
+    count = sum(1 for elem in root.iter() if is_stroke_path(elem))
+    return count or None
+
+
+def stroke_number_position(transform):
+    """Return [x, y] of a KanjiVG stroke-number label, or None."""
+    match = MATRIX_TRANSLATE.match(transform or '')
+    if not match:
+        return None
+    return [round(float(match.group(1)), 2), round(float(match.group(2)), 2)]
+
+
+def parse_svg_strokes(svg_data):
+    """
+    Strip a KanjiVG SVG down to what the stroke-order animation needs.
+    Returns {"d": [path data per stroke], "n": [[x, y] per stroke number]},
+    or None if the SVG has no paths.
+    """
+    root = ET.fromstring(svg_data)
+    strokes = [p.get('d') for p in root.iter() if is_stroke_path(p)]
+    if not strokes:
+        return None
+    numbers = []
+    for text in root.iter():
+        if is_stroke_number(text):
+            position = stroke_number_position(text.get('transform'))
+            if position:
+                numbers.append(position)
+    return {"d": strokes, "n": numbers}
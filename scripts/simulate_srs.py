@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Simulate the SRS review load of a course before the term starts.
+Replays calculateNextReview from lib/srsAlgorithm.ts, vectorized with
+NumPy over every (student, card) pair, one day at a time. New cards
+follow a lesson plan taken from schedule.md or LESSONS.csv, and the
+projected daily reviews per student are reported week by week so
+overload weeks stand out.
+
+Requires NumPy. `--check` cross-checks the port against the TypeScript
+implementation (through node, when it is installed).
+"""
+
+import argparse
+import json
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # optional, only this tool needs it
+    np = None
+
+from build_data_packs import load_lesson_boundaries
+
+SRS_ALGORITHM_FILE = Path("lib/srsAlgorithm.ts")
+SCHEDULE_FILE = Path("schedule.md")
+LESSONS_ZIP = Path("heisig-rtk-index-4.zip")
+
+RATINGS = ('again', 'hard', 'good', 'easy')
+AGAIN, HARD, GOOD, EASY = range(len(RATINGS))
+
+# Defaults of calculateNextReview for a card without review data
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MAX_EASE = 2.5
+
+# Rating probabilities for a first review and for later reviews
+NEW_CARD_RATINGS = (0.20, 0.15, 0.55, 0.10)
+REVIEW_RATINGS = (0.08, 0.12, 0.65, 0.15)
+
+SCHEDULE_WEEK = re.compile(r'^###\s+\S*\s*Week\s+(\d+)')
+SCHEDULE_FRAMES = re.compile(r'^\*\*RTK Book \d+: Frames (\d+)\s*[–-]\s*(\d+)\*\*')
+
+
+def js_round(values):
+    """Math.round: halves round up (toward +infinity), unlike numpy.round."""
+    return np.floor(values + 0.5)
+
+
+def next_review(ease, interval, repetitions, lapses, ratings):
+    """
+    Vectorized calculateNextReview. Every argument is an array of the same
+    shape (ratings are AGAIN/HARD/GOOD/EASY codes); returns the new
+    (ease, interval, repetitions, lapses) arrays.
+    """
+    again = ratings == AGAIN
+    hard = ratings == HARD
+    good = ratings == GOOD
+    easy = ratings == EASY
+
+    new_repetitions = np.where(again, 0, np.where(good | easy, repetitions + 1, repetitions))
+    new_lapses = lapses + again
+    new_ease = np.where(again, np.maximum(MIN_EASE, ease - 0.2),
+                        np.where(hard, np.maximum(MIN_EASE, ease - 0.15),
+                                 np.where(easy, np.minimum(MAX_EASE, ease + 0.15), ease)))
+
+    good_interval = np.where(new_repetitions == 1, 1,
+                             np.where(new_repetitions == 2, 6, js_round(interval * ease)))
+    # 'easy' multiplies by the already increased ease factor
+    easy_interval = np.where(new_repetitions == 1, 4,
+                             np.where(new_repetitions == 2, 10, js_round(interval * new_ease * 1.3)))
+    new_interval = np.where(again, 1,
+                            np.where(hard, np.maximum(1, js_round(interval * 1.2)),
+                                     np.where(good, good_interval, easy_interval)))
+    return new_ease, new_interval.astype(interval.dtype), new_repetitions, new_lapses
+
+
+def next_review_scalar(state, rating):
+    """Line-by-line port of calculateNextReview for one card (the reference)."""
+    ease, interval, repetitions, lapses = state
+    if rating == 'again':
+        repetitions = 0
+        lapses += 1
+        interval = 1
+        ease = max(MIN_EASE, ease - 0.2)
+    elif rating == 'hard':
+        ease = max(MIN_EASE, ease - 0.15)
+        interval = max(1, int(np.floor(interval * 1.2 + 0.5)))
+    elif rating == 'good':
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = int(np.floor(interval * ease + 0.5))
+    elif rating == 'easy':
+        repetitions += 1
+        ease = min(MAX_EASE, ease + 0.15)
+        if repetitions == 1:
+            interval = 4
+        elif repetitions == 2:
+            interval = 10
+        else:
+            interval = int(np.floor(interval * ease * 1.3 + 0.5))
+    return ease, interval, repetitions, lapses
+
+
+def load_schedule_plan(path=SCHEDULE_FILE):
+    """[(week, first_frame, last_frame), ...] from the course schedule (TBD weeks are skipped)."""
+    plan = []
+    week = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            week_match = SCHEDULE_WEEK.match(line)
+            if week_match:
+                week = int(week_match.group(1))
+                continue
+            frames_match = SCHEDULE_FRAMES.match(line.strip())
+            if frames_match and week is not None:
+                plan.append((week, int(frames_match.group(1)), int(frames_match.group(2))))
+    return plan
+
+
+def load_lessons_plan(zip_path=LESSONS_ZIP, lessons_per_week=3, weeks=15):
+    """[(week, first_frame, last_frame), ...] taking `lessons_per_week` LESSONS.csv lessons a week."""
+    plan = []
+    first_frame = 1
+    lessons = load_lesson_boundaries(zip_path)
+    for start in range(0, min(len(lessons), lessons_per_week * weeks), lessons_per_week):
+        last_frame = lessons[min(start + lessons_per_week, len(lessons)) - 1][1]
+        plan.append((start // lessons_per_week + 1, first_frame, last_frame))
+        first_frame = last_frame + 1
+    return plan
+
+
+def introduction_days(plan, study_days=5):
+    """
+    Day on which each card (frame 1..N) is first studied. A week's frames
+    are spread evenly over its first `study_days` days. Frames outside the
+    plan are never introduced (-1).
+    """
+    last_frame = max((last for _, _, last in plan), default=0)
+    days = np.full(last_frame, -1, dtype=np.int32)
+    for week, first, last in plan:
+        count = last - first + 1
+        days[first - 1:last] = (week - 1) * 7 + (np.arange(count) * study_days) // count
+    return days
+
+
+def simulate(plan, students=40, weeks=15, study_days=5, skip_rate=0.1, seed=0):
+    """
+    Simulate `students` following `plan` for `weeks` weeks.
+
+    Every day each student reviews all due cards (new cards on their
+    introduction day count as a first review), except on days they skip
+    with probability `skip_rate`; overdue cards wait for the next day.
+    Students differ in how often they fail a card. Returns a
+    (students, days) array of reviews done per day.
+    """
+    rng = np.random.default_rng(seed)
+    introduced = introduction_days(plan, study_days)
+    cards = len(introduced)
+    days = weeks * 7
+    shape = (students, cards)
+
+    ease = np.full(shape, DEFAULT_EASE)
+    interval = np.zeros(shape, dtype=np.int32)
+    repetitions = np.zeros(shape, dtype=np.int32)
+    lapses = np.zeros(shape, dtype=np.int32)
+    due = np.broadcast_to(np.where(introduced >= 0, introduced, days), shape).copy()
+    reviews = np.zeros((students, days), dtype=np.int32)
+
+    # Per-student difficulty: scales the chance of 'again'
+    difficulty = rng.uniform(0.5, 1.5, size=(students, 1))
+    new_cdf = np.cumsum(NEW_CARD_RATINGS)
+    review_cdf = np.cumsum(REVIEW_RATINGS)
+
+    for day in range(days):
+        studying = rng.random((students, 1)) >= skip_rate
+        mask = (due <= day) & studying
+        if not mask.any():
+            continue
+        draws = rng.random(shape)
+        first = repetitions == 0
+        again_bias = np.where(first, new_cdf[0], review_cdf[0]) * (difficulty - 1.0)
+        cdf = np.where(first[..., None], new_cdf, review_cdf)
+        cdf = np.concatenate([cdf[..., :1] + again_bias[..., None], cdf[..., 1:]], axis=-1)
+        ratings = (draws[..., None] >= cdf).sum(axis=-1).clip(0, EASY)
+
+        updated = next_review(ease, interval, repetitions, lapses, ratings)
+        ease, interval, repetitions, lapses = (np.where(mask, new, old) for new, old in
+                                               zip(updated, (ease, interval, repetitions, lapses)))
+        due = np.where(mask, day + interval, due)
+        reviews[:, day] = mask.sum(axis=1)
+    return reviews
+
+
+def weekly_load(reviews, plan, max_daily=60):
+    """Summarize a (students, days) review array week by week."""
+    new_cards = {week: last - first + 1 for week, first, last in plan}
+    report = []
+    for week in range(reviews.shape[1] // 7):
+        block = reviews[:, week * 7:(week + 1) * 7]
+        daily_mean = block.mean(axis=0)
+        per_student = block.mean(axis=1)
+        report.append({
+            "week": week + 1,
+            "newCards": new_cards.get(week + 1, 0),
+            "meanDaily": round(float(daily_mean.mean()), 1),
+            "p90Daily": round(float(np.percentile(per_student, 90)), 1),
+            "peakDay": int(block.max()),
+            "overloaded": bool(np.percentile(per_student, 90) > max_daily),
+        })
+    return report
+
+
+def print_weekly_load(report, max_daily):
+    """Print the weekly load table."""
+    print(f"\n{'week':>4} {'new':>5} {'mean/day':>9} {'p90/day':>8} {'peak':>6}")
+    for week in report:
+        flag = f"  ⚠️  over {max_daily}/day" if week["overloaded"] else ""
+        print(f"{week['week']:>4} {week['newCards']:>5} {week['meanDaily']:>9} "
+              f"{week['p90Daily']:>8} {week['peakDay']:>6}{flag}")
+
+
+def typescript_calculate_next_review(source_path=SRS_ALGORITHM_FILE):
+    """
+    JavaScript for calculateNextReview, cut out of the TypeScript source
+    and stripped of its type annotations, or None if it cannot be found.
+    """
+    source = Path(source_path).read_text(encoding='utf-8')
+    match = re.search(r'export function calculateNextReview\(.*?\n}\n', source, re.S)
+    if not match:
+        return None
+    function = match.group(0).replace('export ', '', 1)
+    function = re.sub(r'\):\s*ReviewData\s*{', ') {', function)
+    return re.sub(r':\s*(?:ReviewData|Rating)(?:\s*\|\s*null)?', '', function)
+
+
+def run_typescript_sequences(sequences, source_path=SRS_ALGORITHM_FILE):
+    """Replay rating sequences through the TypeScript implementation with node."""
+    function = typescript_calculate_next_review(source_path)
+    if function is None or shutil.which("node") is None:
+        return None
+    script = function + """
+let input = '';
+process.stdin.on('data', chunk => input += chunk);
+process.stdin.on('end', () => {
+  const out = JSON.parse(input).map(seq => {
+    let data = null;
+    return seq.map(rating => {
+      data = calculateNextReview(data, rating);
+      return [data.easeFactor, data.interval, data.repetitions, data.lapses];
+    });
+  });
+  process.stdout.write(JSON.stringify(out));
+});
+"""
+    result = subprocess.run(["node", "-e", script], input=json.dumps(sequences),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def check_against_reference(count=2000, length=15, seed=0):
+    """
+    Replay random rating sequences through the vectorized port, the scalar
+    port and (if node is installed) lib/srsAlgorithm.ts itself.
+    Returns the number of mismatching steps.
+    """
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, len(RATINGS), size=(count, length))
+    # Long runs of 'good'/'easy' reach the ease-multiplied intervals and their rounding
+    codes[:count // 4] = rng.choice([GOOD, EASY], size=(count // 4, length))
+    sequences = [[RATINGS[c] for c in row] for row in codes]
+
+    ease = np.full(count, DEFAULT_EASE)
+    interval = np.zeros(count, dtype=np.int64)
+    repetitions = np.zeros(count, dtype=np.int64)
+    lapses = np.zeros(count, dtype=np.int64)
+    vectorized = []
+    for step in range(length):
+        ease, interval, repetitions, lapses = next_review(ease, interval, repetitions, lapses,
+                                                          codes[:, step])
+        vectorized.append(np.stack([ease, interval, repetitions, lapses], axis=1))
+    vectorized = np.stack(vectorized, axis=1)
+
+    scalar = []
+    for sequence in sequences:
+        state = (DEFAULT_EASE, 0, 0, 0)
+        steps = []
+        for rating in sequence:
+            state = next_review_scalar(state, rating)
+            steps.append(state)
+        scalar.append(steps)
+    references = {"scalar port": np.array(scalar, dtype=np.float64)}
+
+    typescript = run_typescript_sequences(sequences)
+    if typescript is None:
+        print("  ℹ️  node not found, skipped the TypeScript cross-check")
+    else:
+        references["lib/srsAlgorithm.ts"] = np.array(typescript, dtype=np.float64)
+
+    mismatches = 0
+    for name, reference in references.items():
+        # Ease factors must match to the last bit, like the TypeScript doubles
+        wrong = np.argwhere((reference != vectorized).any(axis=2))
+        mismatches += len(wrong)
+        status = "✓" if not len(wrong) else "❌"
+        print(f"  {status} {count}x{length} reviews vs {name}: {len(wrong)} mismatching steps")
+        for sequence, step in wrong[:3]:
+            print(f"      {sequences[sequence][:step + 1]} -> {vectorized[sequence, step].tolist()}"
+                  f" expected {reference[sequence, step].tolist()}")
+    return mismatches
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Simulate the SRS review load of a course.")
+    parser.add_argument("--plan", choices=("schedule", "lessons"), default="schedule",
+                        help="take new frames from schedule.md or LESSONS.csv (default: schedule)")
+    parser.add_argument("--lessons-per-week", type=int, default=3,
+                        help="LESSONS.csv lessons per week with --plan lessons (default: 3)")
+    parser.add_argument("--students", type=int, default=40, help="roster size (default: 40)")
+    parser.add_argument("--weeks", type=int, default=15, help="term length in weeks (default: 15)")
+    parser.add_argument("--study-days", type=int, default=5,
+                        help="days per week over which new frames are spread (default: 5)")
+    parser.add_argument("--skip-rate", type=float, default=0.1,
+                        help="chance a student skips reviews on a given day (default: 0.1)")
+    parser.add_argument("--max-daily", type=int, default=60,
+                        help="flag weeks where the 90th percentile student exceeds this many reviews a day")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--output", type=Path, metavar="PATH", help="also write the weekly report as JSON")
+    parser.add_argument("--check", action="store_true",
+                        help="cross-check the vectorized algorithm against lib/srsAlgorithm.ts and exit")
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ Error: NumPy is required (pip install numpy)")
+        return
+
+    if args.check:
+        print("🔬 Cross-checking calculateNextReview...")
+        if check_against_reference():
+            raise SystemExit(1)
+        print("✅ Vectorized SRS matches the reference")
+        return
+
+    if args.plan == "schedule":
+        plan = load_schedule_plan()
+    else:
+        plan = load_lessons_plan(lessons_per_week=args.lessons_per_week, weeks=args.weeks)
+    if not plan:
+        print("❌ Error: lesson plan is empty")
+        return
+
+    print(f"🗓️  Simulating {args.students} students over {args.weeks} weeks "
+          f"({plan[-1][2]} frames from {args.plan})...")
+    start = time.perf_counter()
+    reviews = simulate(plan, args.students, args.weeks, args.study_days, args.skip_rate, args.seed)
+    print(f"  ✓ Simulated {reviews.sum():,} reviews in {time.perf_counter() - start:.2f}s")
+
+    report = weekly_load(reviews, plan, args.max_daily)
+    print_weekly_load(report, args.max_daily)
+    overloaded = [week["week"] for week in report if week["overloaded"]]
+    if overloaded:
+        print(f"\n⚠️  Overloaded weeks: {', '.join(map(str, overloaded))}")
+    else:
+        print("\n✅ No week exceeds the daily review budget")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"plan": args.plan, "students": args.students, "weeks": report}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"📁 Report saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Shared stroke-count cache backed by a local SQLite database.
+
+Inserts are buffered in memory (O(1)) and flushed in short atomic
+transactions, so a crash never corrupts previously committed counts.
+The database runs in WAL mode, which lets several pipeline processes read
+and write it at the same time. It also keeps the HTTP validators (ETag,
+Last-Modified) of every downloaded SVG, for conditional refreshes, and a
+negative cache of characters KanjiVG does not have. The legacy stroke_count_cache.json file is
+imported once, the first time the database is created.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import time
+from pathlib import Path
+
+STROKE_COUNT_CACHE_DB = Path("scripts/stroke_count_cache.sqlite3")
+LEGACY_CACHE_FILE = Path("scripts/stroke_count_cache.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stroke_counts (
+    kanji TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stroke_paths (
+    kanji TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS http_validators (
+    kanji TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stroke_misses (
+    kanji TEXT PRIMARY KEY,
+    status INTEGER,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class StrokeCountCache:
+    """
+    Dict-like stroke-count cache shared by all data scripts.
+
+    Reads see committed rows from every process plus this process's
+    uncommitted writes. Writes are flushed every `commit_every` inserts and
+    on commit()/close(); the WAL is checkpointed every `compact_every`
+    flushes to keep the database file small. HTTP validators and negative
+    cache entries are buffered and flushed the same way.
+    """
+
+    def __init__(self, path=STROKE_COUNT_CACHE_DB, legacy_json=LEGACY_CACHE_FILE,
+                 commit_every=50, compact_every=20):
+        self.path = Path(path)
+        self.commit_every = commit_every
+        self.compact_every = compact_every
+        self._pending = {}
+        self._pending_strokes = {}
+        self._pending_validators = {}
+        self._pending_misses = {}
+        self._flushes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        if legacy_json is not None:
+            self._import_legacy_json(Path(legacy_json))
+
+    def _import_legacy_json(self, legacy_path):
+        """Import the old JSON cache exactly once, even with concurrent processes."""
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except FileNotFoundError:
+            legacy = {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not import {legacy_path}: {e}")
+            legacy = {}
+
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have won the race while we were reading
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                conn.executemany(
+                    "INSERT OR IGNORE INTO stroke_counts (kanji, count, updated_at) VALUES (?, ?, ?)",
+                    ((k, int(v), now) for k, v in legacy.items() if isinstance(v, int)))
+                conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                             (str(legacy_path),))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __contains__(self, kanji_char):
+        return self.get(kanji_char) is not None
+
+    def __getitem__(self, kanji_char):
+        count = self.get(kanji_char)
+        if count is None:
+            raise KeyError(kanji_char)
+        return count
+
+    def __setitem__(self, kanji_char, count):
+        self._pending[kanji_char] = int(count)
+        # A character that was found is no longer missing
+        self._pending_misses[kanji_char] = None
+        if len(self._pending) >= self.commit_every:
+            self.commit()
+
+    def __len__(self):
+        (committed,) = self._conn.execute("SELECT COUNT(*) FROM stroke_counts").fetchone()
+        if not self._pending:
+            return committed
+        placeholders = ",".join("?" * len(self._pending))
+        (overlap,) = self._conn.execute(
+            f"SELECT COUNT(*) FROM stroke_counts WHERE kanji IN ({placeholders})",
+            tuple(self._pending)).fetchone()
+        return committed + len(self._pending) - overlap
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def get(self, kanji_char, default=None):
+        if kanji_char in self._pending:
+            return self._pending[kanji_char]
+        row = self._conn.execute("SELECT count FROM stroke_counts WHERE kanji = ?",
+                                 (kanji_char,)).fetchone()
+        return row[0] if row else default
+
+    def items(self):
+        return self.to_dict().items()
+
+    def to_dict(self):
+        """Return every cached stroke count as a plain dict, ordered by character."""
+        counts = dict(self._conn.execute("SELECT kanji, count FROM stroke_counts"))
+        counts.update(self._pending)
+        # Sorted so the committed JSON snapshot does not churn with SQLite row order
+        return dict(sorted(counts.items()))
+
+    def has_strokes(self, kanji_char):
+        """True if stripped stroke paths are stored for this character."""
+        if kanji_char in self._pending_strokes:
+            return True
+        return self._conn.execute("SELECT 1 FROM stroke_paths WHERE kanji = ?",
+                                  (kanji_char,)).fetchone() is not None
+
+    def get_strokes(self, kanji_char):
+        """Return stored {"d": [...], "n": [...]} stroke data, or None."""
+        if kanji_char in self._pending_strokes:
+            return self._pending_strokes[kanji_char]
+        row = self._conn.execute("SELECT data FROM stroke_paths WHERE kanji = ?",
+                                 (kanji_char,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_strokes(self, kanji_char, strokes):
+        """Store stripped stroke paths (see kanjivg_svg.parse_svg_strokes)."""
+        self._pending_strokes[kanji_char] = strokes
+        if len(self._pending_strokes) >= self.commit_every:
+            self.commit()
+
+    def get_validators(self, kanji_char):
+        """Return {"etag", "last_modified", "checked_at"} of the last download, or None."""
+        if kanji_char in self._pending_validators:
+            return self._pending_validators[kanji_char]
+        row = self._conn.execute(
+            "SELECT etag, last_modified, checked_at FROM http_validators WHERE kanji = ?",
+            (kanji_char,)).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "checked_at": row[2]}
+
+    def set_validators(self, kanji_char, etag, last_modified):
+        """Store the ETag/Last-Modified of a download (or a 304 revalidation)."""
+        self._pending_validators[kanji_char] = {
+            "etag": etag, "last_modified": last_modified, "checked_at": time.time()}
+        if len(self._pending_validators) >= self.commit_every:
+            self.commit()
+
+    def is_missing(self, kanji_char):
+        """True if a recent lookup found no SVG and its negative entry has not expired."""
+        if kanji_char in self._pending_misses:
+            miss = self._pending_misses[kanji_char]
+            return miss is not None and miss[1] > time.time()
+        row = self._conn.execute("SELECT expires_at FROM stroke_misses WHERE kanji = ?",
+                                 (kanji_char,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def mark_missing(self, kanji_char, status, ttl):
+        """Remember for `ttl` seconds that a lookup failed (HTTP `status`, or None)."""
+        self._pending_misses[kanji_char] = (status, time.time() + ttl)
+        if len(self._pending_misses) >= self.commit_every:
+            self.commit()
+
+    def fingerprint(self):
+        """Content hash of every cached stroke count, for build manifests."""
+        digest = hashlib.sha1()
+        for kanji_char, count in sorted(self.to_dict().items()):
+            digest.update(f"{kanji_char}\t{count}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def strokes_fingerprint(self):
+        """Content hash of every stored stroke path, for build manifests."""
+        self.commit()
+        digest = hashlib.sha1()
+        for kanji_char, data in self._conn.execute(
+                "SELECT kanji, data FROM stroke_paths ORDER BY kanji"):
+            digest.update(f"{kanji_char}\t{data}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def commit(self):
+        """Atomically write buffered stroke counts and paths to the database."""
+        if not (self._pending or self._pending_strokes or self._pending_validators
+                or self._pending_misses):
+            return
+        now = time.time()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # updated_at only moves when a count really changes, so export_json can skip
+            conn.executemany(
+                "INSERT INTO stroke_counts (kanji, count, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (kanji) DO UPDATE SET count = excluded.count, updated_at = excluded.updated_at "
+                "WHERE count != excluded.count",
+                ((k, v, now) for k, v in self._pending.items()))
+            conn.executemany(
+                "INSERT OR REPLACE INTO stroke_paths (kanji, data) VALUES (?, ?)",
+                ((k, json.dumps(v, separators=(',', ':'))) for k, v in self._pending_strokes.items()))
+            conn.executemany(
+                "INSERT OR REPLACE INTO http_validators (kanji, etag, last_modified, checked_at) "
+                "VALUES (?, ?, ?, ?)",
+                ((k, v["etag"], v["last_modified"], v["checked_at"])
+                 for k, v in self._pending_validators.items()))
+            conn.executemany(
+                "DELETE FROM stroke_misses WHERE kanji = ?",
+                ((k,) for k, v in self._pending_misses.items() if v is None))
+            conn.executemany(
+                "INSERT OR REPLACE INTO stroke_misses (kanji, status, expires_at) VALUES (?, ?, ?)",
+                ((k, v[0], v[1]) for k, v in self._pending_misses.items() if v is not None))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._pending.clear()
+        self._pending_strokes.clear()
+        self._pending_validators.clear()
+        self._pending_misses.clear()
+
+        self._flushes += 1
+        if self.compact_every and self._flushes % self.compact_every == 0:
+            self.compact()
+
+    def compact(self):
+        """Fold the write-ahead log back into the main database file."""
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def export_json(self, path=LEGACY_CACHE_FILE, force=False):
+        """
+        Write the cache out as JSON, replacing the file atomically, unless
+        no stroke count changed since the last export to `path`. Each call
+        writes its own temporary file (created with the umask, like any new
+        file), so processes exporting at the same time never share one; the
+        last rename wins. Returns True if the file was written.
+        """
+        path = Path(path)
+        self.commit()
+        key = f"json_exported:{path}"
+        changed_at = str(self._conn.execute("SELECT MAX(updated_at) FROM stroke_counts").fetchone()[0])
+        exported = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if not force and path.exists() and exported is not None and exported[0] == changed_at:
+            return False
+
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, changed_at))
+        return True
+
+    def close(self):
+        """Commit pending writes, compact, and close the database."""
+        if self._conn is None:
+            return
+        self.commit()
+        self.compact()
+        self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Validate the generated kanji data against every other source we have.
+Stroke counts are compared with the stroke-count cache, the counts
+printed in the RTK frame lists and the hand-written tables in
+get_stroke_counts.py and stroke_counts.py. Frame numbers are checked for
+duplicates and gaps, component names for ones that are neither a kanji
+keyword nor a primitive, and ids for duplicates, gaps and order. Every
+finding goes into a structured JSON report; errors fail the run.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+from build_manifest import load_json_file
+from build_component_graph import component_key, load_primitive_frames, resolve_components
+from get_stroke_counts import STROKE_COUNT_DB
+from index_sources import merge_index_sources
+from stroke_counts import BASIC_STROKES
+
+VALIDATION_REPORT_FILE = Path("scripts/validation-report.json")
+VALIDATION_REPORT_VERSION = 1
+STROKE_CACHE_SNAPSHOT = Path("scripts/stroke_count_cache.json")
+# What extraction and add_stroke_counts.py write when no count was found
+DEFAULT_STROKE_COUNT = 10
+
+ERROR = "error"
+WARNING = "warning"
+CHECK_SEVERITY = {
+    "stroke_missing": ERROR,
+    "stroke_mismatch": ERROR,
+    "stroke_unconfirmed": WARNING,
+    "stroke_sources_disagree": WARNING,
+    "frame_not_numeric": ERROR,
+    "frame_duplicate": ERROR,
+    "frame_gap": WARNING,
+    "unknown_primitive": WARNING,
+    "id_duplicate": ERROR,
+    "id_gap": WARNING,
+    "id_order": WARNING,
+}
+
+
+def load_stroke_sources(index_zips=(), cache_path=STROKE_CACHE_SNAPSHOT):
+    """
+    Stroke counts from every source besides kanji.json, as
+    {source name: {kanji: count}}. Sources that are not available are left out.
+    """
+    sources = {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            sources["cache"] = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pass
+    zips = [path for path in index_zips if path.exists()]
+    if zips:
+        sources["frame_list"] = {record["kanji"]: record["stroke_count"]
+                                 for _, record in merge_index_sources(zips, verbose=False)
+                                 if record["stroke_count"]}
+    sources["get_stroke_counts.py"] = STROKE_COUNT_DB
+    sources["stroke_counts.py"] = BASIC_STROKES
+    return sources
+
+
+def number_ranges(numbers):
+    """Collapse sorted integers into [first, last] ranges."""
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ranges
+
+
+def validate_kanji_data(kanji_list, stroke_sources, primitives=None):
+    """
+    Check every entry against the other sources, using per-field columns
+    built once, and return the list of issues. Each issue has a `check`, its `severity` and either
+    the entry it is about (id, kanji, heisig_number) with the field values
+    that disagree, the unknown component with the ids using it, or a
+    first/last range for gaps. `primitives` are the primitive
+    frames from primitives/INPUT.csv; without them only kanji keywords
+    count as known components.
+    """
+    issues = []
+
+    def issue(check, entry=None, **details):
+        found = {"check": check, "severity": CHECK_SEVERITY[check]}
+        if entry is not None:
+            found.update(id=entry.get('id'), kanji=entry.get('kanji'),
+                         heisig_number=entry.get('heisig_number'))
+        found.update(details)
+        issues.append(found)
+
+    # Columns shared by the checks below
+    ids = [entry.get('id') for entry in kanji_list]
+    frames = [entry.get('heisig_number') or '' for entry in kanji_list]
+    counts = [entry.get('strokeCount') for entry in kanji_list]
+
+    # Stroke counts: kanji.json against the cache, the frame lists and the manual tables
+    for entry, count in zip(kanji_list, counts):
+        known = {name: source[entry['kanji']] for name, source in stroke_sources.items()
+                 if entry['kanji'] in source}
+        if not isinstance(count, int) or isinstance(count, bool) or count <= 0:
+            issue("stroke_missing", entry, value=count, sources=known)
+            continue
+        if "cache" in known and known["cache"] != count:
+            issue("stroke_mismatch", entry, value=count, sources=known)
+        elif count == DEFAULT_STROKE_COUNT and count not in known.values():
+            issue("stroke_unconfirmed", entry, value=count, sources=known)
+        if len(set(known.values())) > 1:
+            issue("stroke_sources_disagree", entry, value=count, sources=known)
+
+    # Frame numbers: numeric (get_sort_key files anything else under 99999), unique, no gaps
+    entries_by_frame = {}
+    for entry, frame in zip(kanji_list, frames):
+        number = frame.split('-')[-1]
+        if not number.isdigit():
+            issue("frame_not_numeric", entry, value=frame)
+            continue
+        entries_by_frame.setdefault(int(number), []).append(entry)
+    for frame, entries in sorted(entries_by_frame.items()):
+        if len(entries) > 1:
+            for entry in entries:
+                issue("frame_duplicate", entry, value=frame,
+                      others=[other['id'] for other in entries if other is not entry])
+    if entries_by_frame:
+        missing = [frame for frame in range(1, max(entries_by_frame) + 1)
+                   if frame not in entries_by_frame]
+        for first, last in number_ranges(missing):
+            issue("frame_gap", first=first, last=last)
+
+    # Components: every name must be some kanji's keyword or a primitive
+    docs = [(entry['id'], {"keyword": entry.get('keyword', ''), "heisig_number": frame})
+            for entry, frame in zip(kanji_list, frames)]
+    definitions = resolve_components(docs, primitives or [])
+    unknown = {}
+    for entry in kanji_list:
+        for name in entry.get('primitives', []):
+            if component_key(name) not in definitions:
+                unknown.setdefault(component_key(name), []).append(entry['id'])
+    for name, used_by in sorted(unknown.items(), key=lambda item: (-len(item[1]), item[0])):
+        issue("unknown_primitive", component=name, used_by=sorted(set(used_by)))
+
+    # Ids: unique, 1..N without holes, ascending in frame order
+    entries_by_id = {}
+    for entry, kanji_id in zip(kanji_list, ids):
+        entries_by_id.setdefault(kanji_id, []).append(entry)
+    for kanji_id, entries in entries_by_id.items():
+        if len(entries) > 1:
+            for entry in entries:
+                issue("id_duplicate", entry, value=kanji_id)
+    numeric_ids = sorted(kanji_id for kanji_id in entries_by_id if isinstance(kanji_id, int))
+    if numeric_ids:
+        missing = sorted(set(range(1, numeric_ids[-1] + 1)) - set(numeric_ids))
+        for first, last in number_ranges(missing):
+            issue("id_gap", first=first, last=last)
+    previous = None
+    for entry, kanji_id in zip(kanji_list, ids):
+        if isinstance(kanji_id, int):
+            if previous is not None and kanji_id < previous['id']:
+                issue("id_order", entry, value=kanji_id, previous=previous['id'])
+            previous = entry
+
+    return issues
+
+
+def build_report(kanji_data, issues, stroke_sources, seconds):
+    """The JSON report: a hash of the validated kanji.json, per-check counts and all issues."""
+    checks = {}
+    for found in issues:
+        checks[found["check"]] = checks.get(found["check"], 0) + 1
+    return {
+        "version": VALIDATION_REPORT_VERSION,
+        "kanji": hashlib.sha256(kanji_data).hexdigest()[:16],
+        "sources": {name: len(source) for name, source in stroke_sources.items()},
+        "seconds": round(seconds, 3),
+        "summary": {
+            "errors": sum(1 for found in issues if found["severity"] == ERROR),
+            "warnings": sum(1 for found in issues if found["severity"] == WARNING),
+            "checks": checks,
+        },
+        "issues": issues,
+    }
+
+
+def run_validation(kanji_path, index_zips=(), lessons_zip=None, report_path=VALIDATION_REPORT_FILE):
+    """Validate `kanji_path`, write the report to `report_path` and return it."""
+    start = time.perf_counter()
+    kanji_data, kanji_list = load_json_file(kanji_path)
+    stroke_sources = load_stroke_sources(index_zips)
+    primitives = load_primitive_frames(lessons_zip) if lessons_zip and lessons_zip.exists() else []
+    issues = validate_kanji_data(kanji_list, stroke_sources, primitives)
+    report = build_report(kanji_data, issues, stroke_sources, time.perf_counter() - start)
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = report_path.with_suffix(report_path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(report_path)
+    return report
+
+
+def print_validation_summary(report, limit=3):
+    """Print per-check counts with a few examples of each."""
+    summary = report["summary"]
+    status = "❌" if summary["errors"] else ("⚠️ " if summary["warnings"] else "✅")
+    print(f"{status} Validation: {summary['errors']} errors, {summary['warnings']} warnings "
+          f"({report['seconds'] * 1000:.0f} ms)")
+    for check, count in summary["checks"].items():
+        print(f"  {CHECK_SEVERITY[check]:<7} {check}: {count}")
+        examples = [found for found in report["issues"] if found["check"] == check][:limit]
+        for found in examples:
+            if "kanji" in found:
+                details = {key: value for key, value in found.items()
+                           if key not in ("check", "severity", "id", "kanji", "heisig_number")}
+                print(f"    {found['kanji']} (id {found['id']}, #{found['heisig_number']}): "
+                      f"{json.dumps(details, ensure_ascii=False)}")
+            elif "component" in found:
+                print(f"    '{found['component']}' (used by {len(found['used_by'])} kanji)")
+            else:
+                print(f"    {found['first']}-{found['last']}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Validate public/data/kanji.json against all sources.")
+    parser.add_argument("--report", type=Path, default=VALIDATION_REPORT_FILE, metavar="PATH",
+                        help=f"where to write the JSON report (default: {VALIDATION_REPORT_FILE})")
+    parser.add_argument("--examples", type=int, default=3, metavar="N",
+                        help="examples to print per check (default: 3)")
+    parser.add_argument("--warnings-as-errors", action="store_true",
+                        help="also fail when there are only warnings")
+    args = parser.parse_args()
+
+    kanji_file = Path("public/data/kanji.json")
+    index_zips = [Path("heisig-rtk-index.zip"), Path("heisig-rtk-index-4.zip")]
+
+    if not kanji_file.exists():
+        print("❌ Error: kanji.json not found")
+        sys.exit(1)
+
+    report = run_validation(kanji_file, index_zips, index_zips[1], args.report)
+    print_validation_summary(report, limit=args.examples)
+    print(f"📁 Report saved to: {args.report}")
+
+    summary = report["summary"]
+    if summary["errors"] or (args.warnings_as_errors and summary["warnings"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
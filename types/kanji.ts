@@ -15,6 +15,77 @@ export interface Kanji {
   ease_factor: number;
 }
 
+// One per-lesson data pack listed in /data/lessons/manifest.json
+export interface KanjiShard {
+  name: string;
+  lesson: number | null;
+  firstFrame: number | null;
+  lastFrame: number | null;
+  count: number;
+  url: string;
+  bytes: number;
+  sha256: string;
+}
+
+// Manifest of per-lesson data packs
+export interface KanjiShardManifest {
+  version: number;
+  total: number;
+  shards: KanjiShard[];
+  idRuns: [number, number][]; // [first kanji id, shard index (-1 for none)], sorted by id
+}
+
+// Prebuilt inverted search index (/data/search-index.json)
+export interface KanjiSearchIndex {
+  version: number;
+  normalize: { from: string; to: string; strip: string };
+  terms: string[]; // sorted, for prefix lookups
+  postings: number[][]; // delta-encoded kanji ids, parallel to terms
+}
+
+// Prebuilt component graph (/data/components.json)
+export interface KanjiComponentGraph {
+  version: number;
+  components: string[]; // sorted component names
+  resolves: number[]; // kanji id each component stands for (0 if none), parallel to components
+  introducedFrame: number[]; // frame a component is introduced at (0 if unknown)
+  uses: number[][]; // delta-encoded component indices per kanji (index = kanji id - 1)
+  usedBy: number[][]; // delta-encoded kanji ids per component
+  closure: number[][]; // like uses, including components of components
+  closureUsedBy: number[][]; // like usedBy, including indirect uses
+}
+
+// Prebuilt quiz tables (/data/quiz-tables.json)
+export interface KanjiQuizTables {
+  version: number;
+  kanji: string; // hash of the kanji.json the tables were built from
+  reasons: { strokes: number; primitives: number; keyword: number; lesson: number; shape: number }; // reason bits
+  buckets: { name: string; lesson: number | null; ids: number[] }[]; // delta-encoded kanji ids per lesson
+  distractors: number[][]; // (candidate id << 5) | reason bits, best first (index = kanji id - 1)
+}
+
+// Append-only kanji dictionary for compact course codes (code = index + 1)
+export interface KanjiDictionary {
+  version: number;
+  kanji: string; // one character per code
+  ids: number[]; // current kanji id per code (0 = no longer in the data)
+  frames: number[]; // RTK frame number per code (0 = none)
+  phrases: string[]; // course-text fragments replaced by bytes 0x01..0x1F
+}
+
+// Stripped KanjiVG strokes: path data and stroke-number positions
+export interface StrokeData {
+  d: string[];
+  n: [number, number][];
+}
+
+// Manifest of self-hosted stroke-order bundles (/data/strokes/manifest.json)
+export interface StrokeBundleManifest {
+  version: number;
+  bundles: { name: string; lesson: number | null; url: string; bytes: number; sha256: string }[];
+  index: { [kanji: string]: [number, number, number] }; // [bundle, byte offset, byte length]
+}
+
 // Spaced Repetition System (SRS) data
 export interface ReviewData {
   easeFactor: number;